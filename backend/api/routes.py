@@ -1,24 +1,96 @@
 """
 API Routes per il frontend
 """
+import asyncio
+import os
 from fastapi import APIRouter, HTTPException, status
-from typing import List
+from typing import List, Optional
 
 from api.schemas import (
     CreateGameRequest, RegisterPlayerRequest, SubmitCommitmentRequest,
-    RequestVariationRequest, ComputeVariationRequest, SubmitFinalChoiceRequest,
+    RequestVariationRequest, ComputeVariationRequest, EncryptedVariationRequest, BatchVariationRequest,
+    SubmitFinalChoiceRequest,
     DeriveNumbersRequest, GenerateZKProofCommitmentRequest, GenerateZKProofFinalRequest,
     GameResponse, PlayerResponse, TransactionResponse,
-    DeriveNumbersResponse, VariationResponse, XPFBalanceResponse, ErrorResponse
+    DeriveNumbersResponse, VariationResponse, EncryptedVariationResponse, BatchVariationResponse,
+    XPFBalanceResponse, ErrorResponse,
+    ReceiptResponse, InclusionProofResponse, EventLogResponse,
+    JoinQueueRequest, MatchTicketResponse
 )
 from core.game_manager import GameManager
+from core.async_game_manager import AsyncGameManager
+from core.sharding import ShardRouter
+from core.matchmaking import Matchmaker
+from blockchain.rpc_ledger import JsonRpcLedger
+from blockchain.smart_contract import SmartContract
 from crypto.number_derivation import derive_numbers_from_seed
 from crypto.crypto_engine import CryptoEngine
-from models.game_models import Game, Player
+from crypto.homomorphic import HomomorphicEngine
+from crypto.key_pool import KeyPool
+from models.game_models import Game, Player, MatchStatus, MatchTicket
 
 # Inizializza Game Manager (singleton per la demo)
-game_manager = GameManager()
+# BLOCK_INTERVAL > 0 attiva il block producer in background (le route non aspettano il mining)
+# LEDGER_RPC_URL usa un nodo JSON-RPC remoto al posto della chain simulata
+# GAME_SHARDS > 1 distribuisce i giochi su più processi worker (un core ciascuno)
+ledger_rpc_url = os.getenv("LEDGER_RPC_URL")
+ledger_options = {
+    "pool_size": int(os.getenv("LEDGER_RPC_POOL_SIZE", "4")),
+    "batch_size": int(os.getenv("LEDGER_RPC_BATCH_SIZE", "100"))
+}
+manager_options = dict(
+    block_interval=float(os.getenv("BLOCK_INTERVAL", "0")) or None,
+    max_block_txs=int(os.getenv("MAX_BLOCK_TXS", "500")),
+    block_gas_limit=int(os.getenv("BLOCK_GAS_LIMIT", "30000000")),
+    mempool_size=int(os.getenv("MEMPOOL_SIZE", "10000")),
+    chain_dir=os.getenv("CHAIN_DATA_DIR") or None,
+    prune_depth=int(os.getenv("PRUNE_DEPTH", "0")) or None,
+    memory_budget_bytes=int(os.getenv("CHAIN_MEMORY_BUDGET", "0")) or None,
+    archive_dir=os.getenv("CHAIN_ARCHIVE_DIR") or None,
+    vrf_latency=float(os.getenv("VRF_LATENCY", "0.5")),
+    vrf_batch_window=float(os.getenv("VRF_BATCH_WINDOW", "0")),
+    db_path=os.getenv("GAME_DB_PATH") or None,
+    completed_ttl=float(os.getenv("COMPLETED_GAME_TTL", "0")) or None,
+    max_hot_completed=int(os.getenv("MAX_HOT_COMPLETED_GAMES", "0")) or None,
+    game_archive_dir=os.getenv("GAME_ARCHIVE_DIR") or None,
+    archive_cache_size=int(os.getenv("GAME_ARCHIVE_CACHE", "256")),
+    registration_timeout=float(os.getenv("REGISTRATION_TIMEOUT", "0")) or None,
+    commitment_timeout=float(os.getenv("COMMITMENT_TIMEOUT", "0")) or None,
+    playing_timeout=float(os.getenv("PLAYING_TIMEOUT", "0")) or None,
+    timeout_tick=float(os.getenv("PHASE_TIMEOUT_TICK", "1"))
+)
+game_shards = int(os.getenv("GAME_SHARDS", "1"))
+if game_shards > 1:
+    game_manager = ShardRouter(
+        shards=game_shards,
+        ledger_rpc_url=ledger_rpc_url,
+        ledger_options=ledger_options,
+        **manager_options
+    )
+else:
+    game_manager = GameManager(
+        ledger=JsonRpcLedger(ledger_rpc_url, **ledger_options) if ledger_rpc_url else None,
+        **manager_options
+    )
+# Le route async non bloccano l'event loop: il lavoro pesante gira nel pool della facade
+async_manager = AsyncGameManager(
+    game_manager,
+    max_workers=int(os.getenv("GAME_WORKERS", "8"))
+)
+# I giocatori entrano in coda; i giochi si formano appena un bucket è pieno
+matchmaker = Matchmaker(
+    game_manager,
+    max_players=int(os.getenv("MATCH_PLAYERS", "3")),
+    skill_bucket_size=int(os.getenv("MATCH_SKILL_BUCKET", "0")) or None,
+    xpf_bucket_size=int(os.getenv("MATCH_XPF_BUCKET", "0")) or None
+)
 crypto_engine = CryptoEngine()
+# Coppie RSA pre-generate da processi worker (avviati allo startup dell'app)
+key_pool = KeyPool(
+    target=int(os.getenv("KEY_POOL_SIZE", "32")),
+    low_watermark=int(os.getenv("KEY_POOL_LOW_WATERMARK", "8")),
+    workers=int(os.getenv("KEY_POOL_WORKERS", "1"))
+)
 
 router = APIRouter()
 
@@ -35,7 +107,8 @@ def convert_game_to_response(game: Game) -> GameResponse:
         function_bias=game.function_bias,
         winner=game.winner,
         winning_output=game.winning_output,
-        created_at=game.created_at.isoformat()
+        created_at=game.created_at.isoformat(),
+        phase_deadline=game.phase_deadline.isoformat() if game.phase_deadline else None
     )
 
 
@@ -59,7 +132,7 @@ def convert_player_to_response(player: Player) -> PlayerResponse:
 async def create_game(request: CreateGameRequest):
     """Crea un nuovo gioco"""
     try:
-        game = game_manager.create_game(max_players=request.max_players)
+        game = await async_manager.create_game(max_players=request.max_players)
         return convert_game_to_response(game)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -68,16 +141,16 @@ async def create_game(request: CreateGameRequest):
 @router.get("/game/{game_id}", response_model=GameResponse)
 async def get_game(game_id: str):
     """Ottieni stato di un gioco"""
-    game = game_manager.get_game(game_id)
+    game = await async_manager.get_game(game_id)
     if not game:
         raise HTTPException(status_code=404, detail="Game not found")
     return convert_game_to_response(game)
 
 
-@router.get("/game/active/current", response_model=GameResponse)
+@router.get("/game/active/current", response_model=GameResponse, deprecated=True)
 async def get_active_game():
-    """Ottieni il gioco attivo corrente"""
-    game = game_manager.get_active_game()
+    """Ottieni l'ultimo gioco creato (usa /matchmaking/join per entrare in un gioco)"""
+    game = await async_manager.get_active_game()
     if not game:
         raise HTTPException(status_code=404, detail="No active game")
     return convert_game_to_response(game)
@@ -86,17 +159,65 @@ async def get_active_game():
 @router.get("/games/all", response_model=List[GameResponse])
 async def get_all_games():
     """Ottieni tutti i giochi"""
-    games = game_manager.get_all_games()
+    games = await async_manager.get_all_games()
     return [convert_game_to_response(g) for g in games]
 
 
+# ==================== MATCHMAKING ====================
+
+def convert_ticket_to_response(ticket: MatchTicket) -> MatchTicketResponse:
+    return MatchTicketResponse(
+        player_address=ticket.player_address,
+        status=ticket.status.value,
+        bucket=ticket.bucket,
+        game_id=ticket.game_id,
+        error=ticket.error
+    )
+
+
+@router.post("/matchmaking/join", response_model=MatchTicketResponse)
+async def join_queue(request: JoinQueueRequest, wait: float = 0):
+    """
+    Entra in coda di matchmaking
+
+    Con `wait` (secondi, max 30) la risposta attende che il gioco sia formato;
+    altrimenti il ticket si controlla con GET /matchmaking/{player_address}.
+    """
+    try:
+        ticket = await async_manager.run(matchmaker.enqueue, request.player_address, request.skill)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    deadline = asyncio.get_running_loop().time() + min(wait, 30.0)
+    while ticket.status == MatchStatus.QUEUED and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.05)
+    return convert_ticket_to_response(ticket)
+
+
+@router.get("/matchmaking/{player_address}", response_model=MatchTicketResponse)
+async def get_ticket(player_address: str):
+    """Stato del ticket di matchmaking (game_id quando MATCHED)"""
+    ticket = matchmaker.get_ticket(player_address)
+    if not ticket:
+        raise HTTPException(status_code=404, detail="Player not in matchmaking")
+    return convert_ticket_to_response(ticket)
+
+
+@router.delete("/matchmaking/{player_address}")
+async def leave_queue(player_address: str):
+    """Esce dalla coda di matchmaking"""
+    if not matchmaker.cancel(player_address):
+        raise HTTPException(status_code=404, detail="Player not queued")
+    return {"cancelled": True}
+
+
 # ==================== PLAYER MANAGEMENT ====================
 
 @router.post("/game/{game_id}/register", response_model=PlayerResponse)
 async def register_player(game_id: str, request: RegisterPlayerRequest):
     """Registra un giocatore in un gioco"""
     try:
-        player = game_manager.register_player(game_id, request.player_address)
+        player = await async_manager.register_player(game_id, request.player_address)
         return convert_player_to_response(player)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -105,7 +226,7 @@ async def register_player(game_id: str, request: RegisterPlayerRequest):
 @router.get("/player/{player_address}/xpf", response_model=XPFBalanceResponse)
 async def get_player_xpf(player_address: str):
     """Ottieni balance XPF di un giocatore"""
-    balance = game_manager.get_player_xpf(player_address)
+    balance = await async_manager.get_player_xpf(player_address)
     return XPFBalanceResponse(address=player_address, balance=balance)
 
 
@@ -125,7 +246,22 @@ async def derive_numbers(request: DeriveNumbersRequest):
 async def generate_keypair():
     """Genera coppia di chiavi (helper per client)"""
     try:
-        public_key, private_key = crypto_engine.generate_keypair()
+        # Dal pool in microsecondi; nel pool di thread (attesa breve o fallback) se è vuoto
+        keypair = key_pool.get_nowait() or await async_manager.run(key_pool.get)
+        public_key, private_key = keypair
+        return {
+            "public_key": public_key,
+            "private_key": private_key
+        }
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/crypto/generate-paillier-keypair")
+async def generate_paillier_keypair():
+    """Genera coppia di chiavi Paillier per le variazioni cifrate (helper per client)"""
+    try:
+        public_key, private_key = await async_manager.run(HomomorphicEngine.generate_keypair)
         return {
             "public_key": public_key,
             "private_key": private_key
@@ -138,7 +274,8 @@ async def generate_keypair():
 async def generate_zk_proof_commitment(request: GenerateZKProofCommitmentRequest):
     """Genera ZK proof per commitment (helper per client)"""
     try:
-        proof = crypto_engine.generate_zk_proof_commitment(
+        proof = await async_manager.run(
+            crypto_engine.generate_zk_proof_commitment,
             request.seed_player,
             request.numbers,
             request.encrypted_numbers,
@@ -153,7 +290,8 @@ async def generate_zk_proof_commitment(request: GenerateZKProofCommitmentRequest
 async def generate_zk_proof_final(request: GenerateZKProofFinalRequest):
     """Genera ZK proof per submission finale (helper per client)"""
     try:
-        proof = crypto_engine.generate_zk_proof_final(
+        proof = await async_manager.run(
+            crypto_engine.generate_zk_proof_final,
             request.seed_player,
             request.seed_function,
             request.output_declared,
@@ -170,7 +308,7 @@ async def generate_zk_proof_final(request: GenerateZKProofFinalRequest):
 async def submit_commitment(game_id: str, request: SubmitCommitmentRequest):
     """Sottometti commitment"""
     try:
-        commitment = game_manager.submit_commitment(
+        commitment = await async_manager.submit_commitment(
             game_id=game_id,
             player_address=request.player_address,
             public_key=request.public_key,
@@ -193,7 +331,7 @@ async def submit_commitment(game_id: str, request: SubmitCommitmentRequest):
 async def request_variation(game_id: str, request: RequestVariationRequest):
     """Richiedi generazione variazione"""
     try:
-        result = game_manager.request_variation(game_id, request.player_address)
+        result = await async_manager.request_variation(game_id, request.player_address)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -203,34 +341,74 @@ async def request_variation(game_id: str, request: RequestVariationRequest):
 async def compute_variation(game_id: str, request: ComputeVariationRequest):
     """Calcola variazione (server-side con dati cifrati)"""
     try:
-        result = game_manager.compute_variation(
+        result = await async_manager.compute_variation(
             game_id=game_id,
             player_address=request.player_address,
             current_numbers=request.current_numbers
         )
 
-        # Aggiungi XPF remaining
-        xpf = game_manager.get_player_xpf(request.player_address)
-
         return VariationResponse(
             variation_index=result["variation_index"],
             output=result["output"],
             encrypted_state=result["encrypted_state"],
             new_numbers=result["new_numbers"],
             deltas=result["deltas"],
-            xpf_remaining=xpf
+            xpf_remaining=result["xpf_remaining"]
         )
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/game/{game_id}/variation/compute-encrypted", response_model=EncryptedVariationResponse)
+async def compute_variation_encrypted(game_id: str, request: EncryptedVariationRequest):
+    """Calcola variazione sui numeri cifrati con Paillier (il server non li vede in chiaro)"""
+    try:
+        result = await async_manager.compute_variation_encrypted(
+            game_id=game_id,
+            player_address=request.player_address,
+            encrypted_state=request.encrypted_state
+        )
+        return EncryptedVariationResponse(**result)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/game/{game_id}/variation/batch", response_model=BatchVariationResponse)
+async def batch_variations(game_id: str, request: BatchVariationRequest):
+    """Richiedi e calcola `count` variazioni in una chiamata (ognuna parte dalla precedente)"""
+    try:
+        result = await async_manager.request_variations(
+            game_id=game_id,
+            player_address=request.player_address,
+            current_numbers=request.current_numbers,
+            count=request.count
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    variations = result["variations"]
+    return BatchVariationResponse(
+        variations=[
+            VariationResponse(
+                **variation,
+                # Balance che avrebbe visto la chiamata singola dopo questa variazione
+                xpf_remaining=result["xpf_remaining"]
+                + (len(variations) - 1 - i) * SmartContract.XPF_VARIATION_COST
+            )
+            for i, variation in enumerate(variations)
+        ],
+        tx_hash=result["tx_hash"],
+        xpf_remaining=result["xpf_remaining"]
+    )
+
+
 # ==================== FINAL SUBMISSION ====================
 
 @router.post("/game/{game_id}/submit-final", response_model=TransactionResponse)
 async def submit_final_choice(game_id: str, request: SubmitFinalChoiceRequest):
     """Sottometti scelta finale"""
     try:
-        submission = game_manager.submit_final_choice(
+        submission = await async_manager.submit_final_choice(
             game_id=game_id,
             player_address=request.player_address,
             output_declared=request.output_declared,
@@ -248,6 +426,44 @@ async def submit_final_choice(game_id: str, request: SubmitFinalChoiceRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# ==================== BLOCKCHAIN ====================
+
+@router.get("/tx/{tx_hash}/receipt", response_model=ReceiptResponse)
+async def get_receipt(tx_hash: str):
+    """Ricevuta di una transazione minata"""
+    receipt = await async_manager.run(game_manager.blockchain.get_receipt, tx_hash)
+    if not receipt:
+        raise HTTPException(status_code=404, detail="Receipt not found")
+    return ReceiptResponse(**receipt.model_dump())
+
+
+@router.get("/tx/{tx_hash}/proof", response_model=InclusionProofResponse)
+async def get_inclusion_proof(tx_hash: str):
+    """Merkle proof di inclusione di una transazione nel suo blocco"""
+    proof = await async_manager.run(game_manager.blockchain.get_inclusion_proof, tx_hash)
+    if not proof:
+        raise HTTPException(status_code=404, detail="Transaction not found")
+    return InclusionProofResponse(**proof.model_dump())
+
+
+@router.get("/logs", response_model=List[EventLogResponse])
+async def get_logs(
+    from_block: int = 0,
+    to_block: Optional[int] = None,
+    function_name: Optional[str] = None,
+    game_id: Optional[str] = None,
+    player: Optional[str] = None
+):
+    """Cerca gli eventi on-chain per funzione, gioco e giocatore (stile eth_getLogs)"""
+    logs = await async_manager.run(
+        game_manager.blockchain.get_logs,
+        from_block=from_block,
+        to_block=to_block,
+        topics=[function_name, game_id, player]
+    )
+    return [EventLogResponse(**log.model_dump()) for log in logs]
+
+
 # ==================== HEALTH CHECK ====================
 
 @router.get("/health")
@@ -255,6 +471,8 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "ok",
-        "active_games": len(game_manager.games),
-        "blockchain_height": game_manager.blockchain.current_block_number
+        "active_games": await async_manager.count_games(),
+        "queued_players": matchmaker.queued_count,
+        "key_pool": key_pool.stats(),
+        **await async_manager.chain_status()
     }
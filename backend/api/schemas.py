@@ -1,8 +1,11 @@
 """
 API Request/Response Schemas per il frontend
 """
-from typing import List, Optional
-from pydantic import BaseModel
+from typing import Dict, List, Optional
+from pydantic import BaseModel, conint, conlist, constr
+
+from blockchain.smart_contract import SmartContract
+from crypto.paillier import KEY_SIZE
 
 
 # ==================== REQUEST SCHEMAS ====================
@@ -31,6 +34,18 @@ class ComputeVariationRequest(BaseModel):
     current_numbers: List[int]
 
 
+class EncryptedVariationRequest(BaseModel):
+    player_address: str
+    # Numeri cifrati con la chiave Paillier del commitment (< n², al più KEY_SIZE / 2 cifre hex)
+    encrypted_state: conlist(constr(min_length=1, max_length=KEY_SIZE // 2), min_length=10, max_length=10)
+
+
+class BatchVariationRequest(BaseModel):
+    player_address: str
+    current_numbers: conlist(int, min_length=10, max_length=10)  # Come derive_numbers_from_seed
+    count: conint(ge=1, le=SmartContract.MAX_VARIATIONS)
+
+
 class SubmitFinalChoiceRequest(BaseModel):
     player_address: str
     output_declared: int
@@ -39,6 +54,11 @@ class SubmitFinalChoiceRequest(BaseModel):
     zk_proof: str
 
 
+class JoinQueueRequest(BaseModel):
+    player_address: str
+    skill: Optional[int] = None
+
+
 class DeriveNumbersRequest(BaseModel):
     seed_player: str
 
@@ -66,6 +86,35 @@ class TransactionResponse(BaseModel):
     status: str
 
 
+class ReceiptResponse(BaseModel):
+    tx_hash: str
+    block_number: int
+    block_hash: str
+    transaction_index: int
+    gas_used: int
+    cumulative_gas_used: int
+    status: str
+
+
+class InclusionProofResponse(BaseModel):
+    tx_hash: str
+    block_number: int
+    block_hash: str
+    merkle_root: str
+    transaction_index: int
+    transaction_count: int
+    proof: List[str]
+
+
+class EventLogResponse(BaseModel):
+    address: str
+    topics: List[str]
+    data: Dict
+    tx_hash: str
+    block_number: int
+    log_index: int
+
+
 class PlayerResponse(BaseModel):
     address: str
     xpf_balance: int
@@ -88,6 +137,15 @@ class GameResponse(BaseModel):
     winner: Optional[str] = None
     winning_output: Optional[int] = None
     created_at: str
+    phase_deadline: Optional[str] = None
+
+
+class MatchTicketResponse(BaseModel):
+    player_address: str
+    status: str  # QUEUED, MATCHED, FAILED, CANCELLED
+    bucket: str
+    game_id: Optional[str] = None
+    error: Optional[str] = None
 
 
 class DeriveNumbersResponse(BaseModel):
@@ -103,6 +161,20 @@ class VariationResponse(BaseModel):
     xpf_remaining: int
 
 
+class EncryptedVariationResponse(BaseModel):
+    variation_index: int
+    encrypted_state: List[str]
+    encrypted_output: str  # Enc(F) senza modulo: il client decifra e applica % 10000
+    deltas: List[int]
+    xpf_remaining: int
+
+
+class BatchVariationResponse(BaseModel):
+    variations: List[VariationResponse]
+    tx_hash: str
+    xpf_remaining: int
+
+
 class XPFBalanceResponse(BaseModel):
     address: str
     balance: int
@@ -0,0 +1,895 @@
+"""
+Benchmark Script - Misura throughput e latenze del backend in-process
+Esegui: python benchmark.py [scenario ...]   (senza argomenti: tutti)
+"""
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+from utils.clock import SystemClock, VirtualClock, set_clock
+
+# Tutte le attese simulate (mining, latenza VRF) diventano istantanee
+set_clock(VirtualClock())
+
+from core.game_manager import GameManager  # noqa: E402
+from blockchain.mock_blockchain import MockBlockchain  # noqa: E402
+from blockchain.rpc_ledger import JsonRpcLedger  # noqa: E402
+from blockchain.rpc_server import LedgerRPCServer  # noqa: E402
+from crypto.number_derivation import derive_numbers_from_seed  # noqa: E402
+
+
+def print_section(title):
+    print("\n" + "=" * 60)
+    print(f"  {title}")
+    print("=" * 60)
+
+
+def start_game(manager: GameManager, max_players: int = 3, public_key: str = "bench_public_key"):
+    """Crea una partita e la porta in PLAYING; ritorna (game_id, giocatori, numeri)"""
+    game = manager.create_game(max_players=max_players)
+    game_id = game.game_id
+    players = [f"0xBench{i}_{game_id}" for i in range(max_players)]
+
+    for address in players:
+        manager.register_player(game_id, address)
+    manager.oracle.join()  # VRF evaso in background
+
+    numbers = {}
+    for address in players:
+        seed = game.get_player(address).seed_player
+        numbers[address] = derive_numbers_from_seed(seed)
+        manager.submit_commitment(
+            game_id, address,
+            public_key=public_key,
+            encrypted_numbers=[f"enc_{n}" for n in numbers[address]],
+            zk_proof="0x" + "0" * 64
+        )
+
+    return game_id, players, numbers
+
+
+def play_full_game(manager: GameManager, max_players: int = 3, variations: int = 9) -> str:
+    """Gioca una partita completa in-process, ritorna il game_id"""
+    game_id, players, numbers = start_game(manager, max_players)
+
+    for address in players:
+        current = numbers[address]
+        best = 0
+        for _ in range(variations):
+            manager.request_variation(game_id, address)
+            result = manager.compute_variation(game_id, address, current)
+            current = result["new_numbers"]
+            best = max(best, result["output"])
+        manager.submit_final_choice(
+            game_id, address,
+            output_declared=best,
+            encrypted_state_hash="0xbench",
+            variations_count=variations,
+            zk_proof="0x" + "1" * 64
+        )
+
+    return game_id
+
+
+# ==================== SCENARI ====================
+
+def bench_full_games(games: int = 1000):
+    """Partite complete al secondo con clock virtuale"""
+    print_section(f"PARTITE COMPLETE ({games}, clock virtuale)")
+    manager = GameManager()
+
+    start = time.perf_counter()
+    for _ in range(games):
+        play_full_game(manager)
+    elapsed = time.perf_counter() - start
+
+    print(f"Partite: {games} in {elapsed:.2f}s -> {games / elapsed:.0f} partite/s")
+    print(f"Altezza chain: {manager.blockchain.current_block_number}")
+
+
+def bench_tx_memory(count: int = 20000, block_txs: int = 50):
+    """Memoria per tx residente (record + blocco + indice) e tempo di creazione"""
+    print_section(f"MEMORIA PER TX ({count} tx, blocchi da {block_txs})")
+    chain = MockBlockchain(mining_delay=0)
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    for i in range(count):
+        chain.create_transaction(
+            f"0xBench{i % 3}", "requestVariation",
+            {"game_id": f"game_{i // 40:016x}", "variation_number": i % 10, "cost": 10}
+        )
+        if i % block_txs == block_txs - 1:
+            chain.mine_block()
+    chain.mine_block()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    print(f"Byte per tx: {used / count:.0f}")
+    print(f"Creazione + mining: {count / elapsed:.0f} tx/s")
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def bench_registration(games: int = 50, max_players: int = 3):
+    """Latenza di register_player con clock reale: l'ultimo iscritto non aspetta il VRF"""
+    print_section(f"LATENZA REGISTRAZIONE ({games} partite, clock reale)")
+    # Block producer in background: la latenza misurata non include il mining
+    manager = GameManager(block_interval=0.05, clock=SystemClock())
+
+    others, last = [], []
+    for _ in range(games):
+        game = manager.create_game(max_players=max_players)
+        for i in range(max_players):
+            start = time.perf_counter()
+            manager.register_player(game.game_id, f"0xReg{i}_{game.game_id}")
+            (last if i == max_players - 1 else others).append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    manager.oracle.join()
+    drained = time.perf_counter() - start
+    manager.close()
+
+    for label, samples in (("Altri iscritti", others), ("Ultimo iscritto", last)):
+        print(f"{label}: p50 {percentile(samples, 0.5) * 1e3:.2f}ms, "
+              f"max {max(samples) * 1e3:.2f}ms")
+    print(f"VRF evasi in background (coda svuotata dopo altri {drained:.2f}s)")
+
+
+def bench_rpc(calls: int = 2000, txs: int = 5000):
+    """Round-trip JSON-RPC verso lo stand-in locale: chiamate singole, sync, pipeline"""
+    print_section(f"LEDGER JSON-RPC (stand-in locale, {txs} tx)")
+    server = LedgerRPCServer(MockBlockchain(mempool_size=txs * 3)).start()
+
+    ledger = JsonRpcLedger(server.url, pipeline=False)
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        ledger.call("ledger_current")
+        latencies.append(time.perf_counter() - start)
+    print(f"Round-trip: p50 {percentile(latencies, 0.5) * 1e6:.0f}µs, "
+          f"p99 {percentile(latencies, 0.99) * 1e6:.0f}µs")
+
+    for label, client in (
+        ("Submit sincrono", ledger),
+        ("Submit pipelined", JsonRpcLedger(server.url, pipeline=True))
+    ):
+        start = time.perf_counter()
+        for i in range(txs):
+            client.create_transaction(f"0xBench{i % 3}", "requestVariation", {"game_id": "bench", "i": i})
+        client.flush()
+        elapsed = time.perf_counter() - start
+        print(f"{label}: {txs / elapsed:.0f} tx/s")
+        client.mine_block()
+        client.close()
+
+    server.stop()
+
+
+def bench_vrf_batch(games: int = 500, max_players: int = 3):
+    """Partite avviate al secondo quando molte lobby si riempiono insieme"""
+    print_section(f"VRF A BATCH ({games} lobby piene insieme)")
+    clock = VirtualClock()
+
+    for label, max_batch in (("Una richiesta per blocco", 1), ("Batch", 256)):
+        manager = GameManager(clock=clock, vrf_max_batch=max_batch)
+        manager.oracle.pause()
+        for _ in range(games):
+            game = manager.create_game(max_players=max_players)
+            for i in range(max_players):
+                manager.register_player(game.game_id, f"0xVrf{i}_{game.game_id}")
+
+        height = manager.blockchain.current_block_number
+        chain_start = clock.time()
+        start = time.perf_counter()
+        manager.oracle.resume()
+        manager.oracle.join()
+        elapsed = time.perf_counter() - start
+        chain_time = clock.time() - chain_start
+        blocks = manager.blockchain.current_block_number - height
+
+        print(f"{label}: {games / elapsed:.0f} partite avviate/s (CPU), "
+              f"{blocks} blocchi, {games / chain_time:.0f} partite avviate/s "
+              f"in tempo chain (mining {manager.blockchain.mining_delay}s/blocco)")
+        manager.close()
+
+
+def bench_async_routes(variations: int = 50, games: int = 6, probes_interval: float = 0.005):
+    """p99 di GET /game/{id} mentre `variations` richieste di variazione sono in volo"""
+    print_section(f"ROUTE ASYNC (GET /game con {variations} variazioni in volo, clock reale)")
+    import httpx
+    from fastapi import FastAPI
+    from api import routes
+    from core.async_game_manager import AsyncGameManager
+
+    # Mining reale (0.1s a blocco): è il lavoro bloccante che le route devono scaricare
+    manager = GameManager(clock=SystemClock(), vrf_latency=0.0)
+    started = [start_game(manager) for _ in range(games)]
+    routes.game_manager = manager
+    routes.async_manager = AsyncGameManager(manager)
+
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+    requests = [
+        (game_id, address)
+        for game_id, players, _ in started
+        for address in players
+        for _ in range(3)
+    ][:variations]
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def variation(game_id, address):
+                response = await client.post(
+                    f"/api/game/{game_id}/variation/request",
+                    json={"player_address": address}
+                )
+                response.raise_for_status()
+
+            # Sonde a orari fissi dal lancio delle variazioni: la latenza parte
+            # dall'orario previsto, quindi conta anche l'event loop bloccato
+            latencies = []
+            probe_game = started[0][0]
+            (await client.get(f"/api/game/{probe_game}")).raise_for_status()  # Warm-up
+            origin = time.perf_counter()
+            in_flight = asyncio.gather(*(variation(g, a) for g, a in requests))
+            await asyncio.sleep(0)  # Le variazioni partono prima delle sonde
+            while not in_flight.done():
+                scheduled = origin + len(latencies) * probes_interval
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                response = await client.get(f"/api/game/{probe_game}")
+                latencies.append(time.perf_counter() - scheduled)
+                response.raise_for_status()
+            await in_flight
+            return latencies
+
+    start = time.perf_counter()
+    latencies = asyncio.run(run())
+    elapsed = time.perf_counter() - start
+    routes.async_manager.close()
+    manager.close()
+
+    print(f"Variazioni: {len(requests)} in {elapsed:.2f}s")
+    print(f"GET /game/{{id}}: {len(latencies)} richieste, p50 {percentile(latencies, 0.5) * 1e3:.2f}ms, "
+          f"p99 {percentile(latencies, 0.99) * 1e3:.2f}ms, max {max(latencies) * 1e3:.2f}ms")
+
+
+def bench_game_store(games: int = 500, in_flight: int = 2000):
+    """Costo del write-behind SQLite sulle partite e tempo di ripresa dei giochi in corso"""
+    print_section(f"GAME STORE SQLITE ({games} partite, {in_flight} giochi in corso al riavvio)")
+    import tempfile
+
+    def run(db_path):
+        manager = GameManager(db_path=db_path)
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(games):
+            game_id, players, numbers = start_game(manager)
+            for address in players:
+                began = time.perf_counter()
+                manager.request_variation(game_id, address)
+                latencies.append(time.perf_counter() - began)
+        elapsed = time.perf_counter() - start
+        return manager, elapsed, latencies
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, "games.db")
+        for label, path in (("Solo memoria", None), ("SQLite write-behind", db_path)):
+            manager, elapsed, latencies = run(path)
+            print(f"{label}: {games / elapsed:.0f} partite avviate/s, request_variation "
+                  f"p50 {percentile(latencies, 0.5) * 1e6:.0f}us p99 {percentile(latencies, 0.99) * 1e6:.0f}us")
+            if manager.store:
+                manager.store.flush()
+                mutations = games * 10  # create + 3 register + 3 commit + 3 variazioni
+                print(f"  {manager.store.flushes} flush, {manager.store.rows_written} righe scritte "
+                      f"per ~{mutations} mutazioni")
+            manager.close()
+
+        # Riavvio con molti giochi in corso
+        manager = GameManager(db_path=db_path)
+        for _ in range(in_flight - games):
+            start_game(manager)
+        manager.close()
+
+        start = time.perf_counter()
+        manager = GameManager(db_path=db_path)
+        elapsed = time.perf_counter() - start
+        resumed = sum(1 for game in manager.get_all_games() if game.status.value == "PLAYING")
+        manager.close()
+        print(f"Ripresa: {resumed} giochi in corso ricaricati in {elapsed * 1e3:.0f}ms")
+
+
+def bench_sharding(games: int = 300, clients: int = 16, shard_counts=(1, 2, 4)):
+    """Partite complete al secondo attraverso il router, al variare del numero di shard"""
+    print_section(f"SHARDING ({games} partite, {clients} client, {os.cpu_count()} core)")
+    import threading
+    from collections import defaultdict
+    from concurrent.futures import ThreadPoolExecutor
+    from core.sharding import ShardRouter
+    from models.game_models import GameState
+
+    fulfilled = defaultdict(threading.Event)
+
+    def on_event(game_id: str, event: dict):
+        if event["type"] == "randomness_fulfilled":
+            fulfilled[game_id].set()
+
+    def play(manager):
+        game_id = manager.create_game(max_players=3).game_id
+        players = [f"0xShard{i}_{game_id}" for i in range(3)]
+        for address in players:
+            manager.register_player(game_id, address)
+        # VRF evaso dall'oracolo dello shard: si aspetta l'evento, senza interrogare lo shard
+        while not fulfilled[game_id].wait(0.05):
+            if manager.get_game_status(game_id) == GameState.RANDOMNESS_FULFILLED:
+                break
+        game = manager.get_game(game_id)
+        for player in game.players:
+            numbers = derive_numbers_from_seed(player.seed_player)
+            manager.submit_commitment(
+                game_id, player.address,
+                public_key="bench_public_key",
+                encrypted_numbers=[f"enc_{n}" for n in numbers],
+                zk_proof="0x" + "0" * 64
+            )
+        for player in game.players:
+            current = derive_numbers_from_seed(player.seed_player)
+            best = 0
+            for _ in range(9):
+                manager.request_variation(game_id, player.address)
+                result = manager.compute_variation(game_id, player.address, current)
+                current = result["new_numbers"]
+                best = max(best, result["output"])
+            manager.submit_final_choice(game_id, player.address, best, "0xbench", 9, "0x" + "1" * 64)
+
+    def run(manager) -> float:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(lambda _: play(manager), range(games)))
+        return games / (time.perf_counter() - start)
+
+    manager = GameManager(vrf_latency=0)
+    manager.subscribe(on_event)
+    baseline = run(manager)
+    manager.close()
+    print(f"In-process: {baseline:.0f} partite/s")
+
+    for shards in shard_counts:
+        router = ShardRouter(shards=shards, clock=VirtualClock(), vrf_latency=0)
+        router.subscribe(on_event)
+        rate = run(router)
+        completed = sum(1 for game in router.get_all_games() if game.status.value == "COMPLETED")
+        latencies = []
+        for i in range(1000):
+            began = time.perf_counter()
+            router.get_player_xpf(f"0xProbe{i}")
+            latencies.append(time.perf_counter() - began)
+        router.close()
+        print(f"{shards} shard: {rate:.0f} partite/s ({rate / baseline:.2f}x), {completed} completate, "
+              f"round-trip IPC p50 {percentile(latencies, 0.5) * 1e6:.0f}us")
+
+
+def bench_eviction(games: int = 2000, max_hot: int = 100):
+    """Memoria del set caldo e latenze di get_game con i conclusi spostati nell'archivio"""
+    print_section(f"ARCHIVIO GIOCHI CONCLUSI ({games} partite, max {max_hot} conclusi in memoria)")
+    import tempfile
+
+    def timed(fn, repeat: int) -> float:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat
+
+    with tempfile.TemporaryDirectory() as directory:
+        for label, options in (
+            ("Tutto in memoria", {}),
+            ("Con archivio", {"max_hot_completed": max_hot, "game_archive_dir": directory})
+        ):
+            gc.collect()
+            tracemalloc.start()
+            manager = GameManager(**options)
+            game_ids = [play_full_game(manager) for _ in range(games)]
+            manager.create_game()  # Trigger dell'ultimo giro di eviction
+            gc.collect()
+            used = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+
+            # Costo di /games/all: serializzare ogni gioco in memoria
+            all_games = timed(lambda: [game.model_dump() for game in manager.get_all_games()], 3)
+            hot = timed(lambda: manager.get_game(game_ids[-1]), 1000)
+            print(f"{label}: {len(manager.games)} giochi in memoria, {used / 2**20:.1f} MiB totali "
+                  f"(chain inclusa), /games/all {all_games * 1e3:.1f}ms, get_game caldo {hot * 1e6:.1f}us")
+            if manager.game_archive:
+                archive = manager.game_archive
+                cold_ids = iter(game_ids[:archive.cache_size * 2])
+                cold = timed(lambda: manager.get_game(next(cold_ids)), archive.cache_size)
+                cached = timed(lambda: manager.get_game(game_ids[0]), 1000)
+                print(f"  archivio: {len(archive)} giochi, {archive.bytes_written / 2**20:.1f} MiB su disco "
+                      f"({archive.bytes_raw / archive.bytes_written:.1f}x), get_game freddo {cold * 1e6:.0f}us, "
+                      f"da cache LRU {cached * 1e6:.1f}us")
+            manager.close()
+
+
+def bench_matchmaking(players: int = 3000, clients: int = 32, buckets: int = 10, depths=(1_000, 10_000, 100_000)):
+    """Giochi formati dalla coda di matchmaking vs giocatori che corrono sulla lobby unica"""
+    print_section(f"MATCHMAKING ({players} giocatori, {clients} client, {buckets} bucket di skill)")
+    from concurrent.futures import ThreadPoolExecutor
+    from core.matchmaking import Matchmaker
+
+    # Prima: ognuno legge il gioco attivo e prova a registrarsi, creandone uno se è pieno
+    manager = GameManager(vrf_latency=0)
+    retries = []
+
+    def race(index: int):
+        address = f"0xRace{index}"
+        attempts = 0
+        while True:
+            game = manager.get_active_game()
+            if game is None or game.status.value != "REGISTERING":
+                game = manager.create_game(max_players=3)
+            try:
+                manager.register_player(game.game_id, address)
+                break
+            except ValueError:
+                attempts += 1
+        retries.append(attempts)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        list(pool.map(race, range(players)))
+    elapsed = time.perf_counter() - start
+    games = manager.get_all_games()
+    partial = sum(1 for game in games if not game.is_full())
+    print(f"Lobby unica: {players / elapsed:.0f} giocatori/s, {sum(retries)} tentativi falliti, "
+          f"{len(games)} giochi di cui {partial} non pieni")
+    manager.close()
+
+    # Dopo: coda per bucket, i gruppi completi diventano giochi
+    manager = GameManager(vrf_latency=0)
+    matchmaker = Matchmaker(manager, max_players=3, skill_bucket_size=100)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        tickets = list(pool.map(
+            lambda index: matchmaker.enqueue(f"0xQueue{index}", skill=(index % buckets) * 100),
+            range(players)
+        ))
+    elapsed = time.perf_counter() - start
+    games = manager.get_all_games()
+    mixed = sum(1 for game in games if len({matchmaker.get_ticket(p.address).bucket for p in game.players}) > 1)
+    matched = sum(1 for ticket in tickets if ticket.game_id)
+    print(f"Matchmaking: {players / elapsed:.0f} giocatori/s, {matched} assegnati, {len(games)} giochi "
+          f"({sum(1 for game in games if game.is_full())} pieni, {mixed} con bucket misti), "
+          f"{matchmaker.queued_count} in attesa")
+    manager.close()
+
+    # Costo di enqueue/cancel con molti giocatori in attesa nello stesso bucket
+    for depth in depths:
+        matchmaker = Matchmaker(None, max_players=depth * 2)
+        for index in range(depth):
+            matchmaker.enqueue(f"0xWait{index}")
+        samples = []
+        for index in range(1000):
+            began = time.perf_counter()
+            matchmaker.enqueue(f"0xProbe{index}")
+            matchmaker.cancel(f"0xProbe{index}")
+            samples.append(time.perf_counter() - began)
+        print(f"  {depth} in attesa: enqueue+cancel p50 {percentile(samples, 0.5) * 1e6:.1f}us, "
+              f"p99 {percentile(samples, 0.99) * 1e6:.1f}us")
+
+
+def bench_timeouts(pending=(1_000, 100_000, 300_000), games: int = 1000):
+    """Costo della timer wheel con molte scadenze pendenti e giochi chiusi per timeout"""
+    print_section(f"TIMEOUT DI FASE (timer wheel, {games} giochi con un giocatore AFK)")
+    import random
+    from utils.timer_wheel import TimerWheel
+    from models.game_models import GameState, PlayerStatus
+
+    for count in pending:
+        clock = VirtualClock()
+        wheel = TimerWheel(tick=1.0, clock=clock)
+        deadlines = [clock.time() + random.uniform(1, 3600) for _ in range(count)]
+        start = time.perf_counter()
+        for key, deadline in enumerate(deadlines):
+            wheel.schedule(key, deadline)
+        scheduled = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for key in range(0, count, 2):
+            wheel.cancel(key)
+        cancelled = time.perf_counter() - start
+
+        fired = 0
+        start = time.perf_counter()
+        for _ in range(3600):
+            clock.advance(1.0)
+            fired += len(wheel.advance())
+        swept = time.perf_counter() - start
+        print(f"  {count:>7} pendenti: schedule {scheduled / count * 1e6:.2f}us, "
+              f"cancel {cancelled / (count / 2) * 1e6:.2f}us, "
+              f"avanzamento {swept / 3600 * 1e6:.1f}us/tick ({fired} scaduti)")
+
+    # Ogni gioco arriva in PLAYING; il terzo giocatore non sottomette mai
+    # (ogni blocco avanza il clock virtuale: la scadenza deve superare tutto il setup)
+    clock = VirtualClock()
+    manager = GameManager(vrf_latency=0, clock=clock, playing_timeout=86400, timeout_tick=60)
+    game_ids = []
+    for _ in range(games):
+        game_id, players, _ = start_game(manager)
+        for address in players[:2]:
+            manager.submit_final_choice(
+                game_id, address,
+                output_declared=1,
+                encrypted_state_hash="0xbench",
+                variations_count=0,
+                zk_proof="0x" + "1" * 64
+            )
+        game_ids.append(game_id)
+    stuck = sum(1 for game_id in game_ids if manager.get_game(game_id).status == GameState.PLAYING)
+
+    clock.advance(86400 + 60)
+    start = time.perf_counter()
+    expired = manager.expire_timeouts()
+    elapsed = time.perf_counter() - start
+    settled = [manager.get_game(game_id) for game_id in game_ids]
+    completed = sum(1 for game in settled if game.status == GameState.COMPLETED and game.winner)
+    timed_out = sum(1 for game in settled for p in game.players if p.status == PlayerStatus.TIMED_OUT)
+    print(f"In PLAYING prima della scadenza: {stuck}; dopo: {completed} conclusi con vincitore, "
+          f"{timed_out} giocatori TIMED_OUT, {expired} scadenze in {elapsed * 1000:.0f}ms "
+          f"({elapsed / max(expired, 1) * 1e6:.0f}us/gioco)")
+    manager.close()
+
+
+def bench_variations(games: int = 2, variations: int = 9, rounds: int = 100):
+    """9 variazioni: coppie request/compute via HTTP contro una sola chiamata batch"""
+    print_section(f"VARIAZIONI A BATCH ({variations} per giocatore)")
+    import httpx
+    from fastapi import FastAPI
+    from api import routes
+    from core.async_game_manager import AsyncGameManager
+    from crypto.number_derivation import calculate_validation_function
+
+    # Mining reale (0.1s a blocco): ogni tx delle chiamate singole aspetta il suo blocco
+    manager = GameManager(clock=SystemClock(), vrf_latency=0.0)
+    started = [start_game(manager) for _ in range(games)]
+    routes.game_manager = manager
+    routes.async_manager = AsyncGameManager(manager)
+    app = FastAPI()
+    app.include_router(routes.router, prefix="/api")
+
+    async def sequential(client, game_id, address, numbers):
+        for _ in range(variations):
+            response = await client.post(f"/api/game/{game_id}/variation/request", json={"player_address": address})
+            response.raise_for_status()
+            response = await client.post(
+                f"/api/game/{game_id}/variation/compute",
+                json={"player_address": address, "current_numbers": numbers}
+            )
+            response.raise_for_status()
+            numbers = response.json()["new_numbers"]
+        return 2 * variations
+
+    async def batched(client, game_id, address, numbers):
+        response = await client.post(
+            f"/api/game/{game_id}/variation/batch",
+            json={"player_address": address, "current_numbers": numbers, "count": variations}
+        )
+        response.raise_for_status()
+        return 1
+
+    async def run(play, game_id, players, numbers):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            blocks = manager.blockchain.current_block_number
+            start = time.perf_counter()
+            calls = 0
+            for address in players:
+                calls += await play(client, game_id, address, numbers[address])
+            elapsed = time.perf_counter() - start
+            return elapsed, calls, manager.blockchain.current_block_number - blocks
+
+    for (game_id, players, numbers), (label, play) in zip(started, [("Singole", sequential), ("Batch", batched)]):
+        elapsed, calls, blocks = asyncio.run(run(play, game_id, players, numbers))
+        print(f"{label}: {elapsed / len(players) * 1000:.0f}ms per giocatore, "
+              f"{calls // len(players)} chiamate HTTP, {blocks // len(players)} blocchi")
+
+    # Stesso risultato delle chiamate singole: XPF, indici, output e catena dei numeri
+    sequential_game, batched_game = (manager.get_game(game_id) for game_id, _, _ in started)
+    for single, batch in zip(sequential_game.players, batched_game.players):
+        assert (single.xpf_balance, single.xpf_spent, single.variations_requested, len(single.variations)) == \
+            (batch.xpf_balance, batch.xpf_spent, batch.variations_requested, len(batch.variations))
+        assert [v.variation_index for v in single.variations] == [v.variation_index for v in batch.variations]
+    routes.async_manager.close()
+    manager.close()
+
+    # In-process con clock virtuale: costo puro del calcolo
+    manager = GameManager(vrf_latency=0)
+    samples = {"Singole": [], "Batch": []}
+    for _ in range(rounds):
+        game_id, addresses, numbers = start_game(manager)
+        for index, address in enumerate(addresses):
+            current = numbers[address]
+            start = time.perf_counter()
+            if index % 2:
+                result = manager.request_variations(game_id, address, current, variations)
+                samples["Batch"].append(time.perf_counter() - start)
+                game = manager.get_game(game_id)
+                for variation in result["variations"]:
+                    assert variation["output"] == calculate_validation_function(
+                        variation["new_numbers"], game.function_coefficients, game.function_bias
+                    )
+                    assert all(abs(new - old) <= 20 for new, old in zip(variation["new_numbers"], current))
+                    current = variation["new_numbers"]
+            else:
+                for _ in range(variations):
+                    manager.request_variation(game_id, address)
+                    current = manager.compute_variation(game_id, address, current)["new_numbers"]
+                samples["Singole"].append(time.perf_counter() - start)
+    for label, values in samples.items():
+        print(f"  In-process {label.lower()}: p50 {percentile(values, 0.5) * 1e6:.0f}us per giocatore")
+    manager.close()
+
+
+def bench_key_pool(burst: int = 16, target: int = 24, workers: int = 8):
+    """Latenza di un burst di /crypto/generate-keypair: generazione inline vs pool pre-generato"""
+    print_section(f"POOL CHIAVI RSA (burst di {burst} richieste, {workers} thread)")
+    from concurrent.futures import ThreadPoolExecutor
+    from crypto.crypto_engine import CryptoEngine
+    from crypto.key_pool import KeyPool
+
+    def timed(fn):
+        start = time.perf_counter()
+        fn()
+        return time.perf_counter() - start
+
+    # Prima: ogni richiesta genera la propria chiave nel pool di thread delle route
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        inline = list(pool.map(lambda _: timed(CryptoEngine.generate_keypair), range(burst)))
+
+    key_pool = KeyPool(target=target, low_watermark=target // 4, workers=1)
+    start = time.perf_counter()
+    key_pool.start()
+    while key_pool.depth < target:
+        time.sleep(0.05)
+    warmup = time.perf_counter() - start
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pooled = list(pool.map(lambda _: timed(key_pool.get), range(burst)))
+    stats = key_pool.stats()
+    key_pool.close()
+
+    for label, samples in (("Inline", inline), ("Pool", pooled)):
+        print(f"{label}: p50 {percentile(samples, 0.5) * 1e3:.3f}ms, p99 {percentile(samples, 0.99) * 1e3:.3f}ms, "
+              f"max {max(samples) * 1e3:.3f}ms")
+    print(f"Riempimento iniziale: {target} chiavi in {warmup:.1f}s; refill_rate {stats['refill_rate']}/s, "
+          f"servite {stats['served']}, fallback {stats['fallbacks']}, profondità {stats['depth']}")
+
+
+def bench_cipher_cache(numbers: int = 10, rounds: int = 50):
+    """Costo per numero di cifratura/decifratura RSA-OAEP: parsing per numero, cache, batch, operazione nuda"""
+    print_section(f"CACHE DEI CIPHER RSA ({rounds} giocatori x {numbers} numeri, chiave 2048 bit)")
+    import base64
+    from Crypto.Cipher import PKCS1_OAEP
+    from Crypto.PublicKey import RSA
+    from crypto.crypto_engine import CryptoEngine
+
+    public_key, private_key = CryptoEngine.generate_keypair()
+    values = list(range(100, 100 + numbers))
+
+    def per_number(fn):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        return (time.perf_counter() - start) / (rounds * numbers)
+
+    # Prima: import_key e nuovo cipher per ogni numero
+    def uncached_encrypt():
+        return [
+            base64.b64encode(PKCS1_OAEP.new(RSA.import_key(public_key)).encrypt(str(v).encode())).decode()
+            for v in values
+        ]
+
+    ciphertexts = uncached_encrypt()
+
+    def uncached_decrypt():
+        return [
+            int(PKCS1_OAEP.new(RSA.import_key(private_key)).decrypt(base64.b64decode(c)).decode())
+            for c in ciphertexts
+        ]
+
+    raw_encrypt = PKCS1_OAEP.new(RSA.import_key(public_key))
+    raw_decrypt = PKCS1_OAEP.new(RSA.import_key(private_key))
+    CryptoEngine.cipher_cache().clear()
+    rows = [
+        ("Parsing per numero", uncached_encrypt, uncached_decrypt),
+        ("Cache, un numero alla volta",
+         lambda: [CryptoEngine.encrypt_number(v, public_key) for v in values],
+         lambda: [CryptoEngine.decrypt_number(c, private_key) for c in ciphertexts]),
+        ("Batch", lambda: CryptoEngine.encrypt_numbers(values, public_key),
+         lambda: CryptoEngine.decrypt_numbers(ciphertexts, private_key)),
+        ("Operazione RSA nuda", lambda: [raw_encrypt.encrypt(str(v).encode()) for v in values],
+         lambda: [raw_decrypt.decrypt(base64.b64decode(c)) for c in ciphertexts]),
+    ]
+    for label, encrypt, decrypt in rows:
+        print(f"  {label:<28} cifra {per_number(encrypt) * 1e6:8.1f}us  decifra {per_number(decrypt) * 1e6:8.1f}us")
+
+    assert CryptoEngine.decrypt_numbers(CryptoEngine.encrypt_numbers(values, public_key), private_key) == values
+    cache = CryptoEngine.cipher_cache()
+    print(f"Cache: {cache.hits} hit, {cache.misses} miss")
+
+
+def bench_paillier(variations: int = 9, rounds: int = 20):
+    """Variazioni calcolate sui cifrati Paillier: costo per variazione, decifratura CRT, pool di casualità"""
+    print_section(f"PAILLIER ({variations} variazioni cifrate per giocatore, chiave 2048 bit)")
+    from crypto.homomorphic import HomomorphicEngine, _private_key, _public_key
+    from crypto.number_derivation import calculate_validation_function
+
+    start = time.perf_counter()
+    public_key, private_key = HomomorphicEngine.generate_keypair()
+    print(f"Generazione chiavi: {(time.perf_counter() - start) * 1000:.0f}ms")
+    public, private = _public_key(public_key), _private_key(private_key)
+    public.randomness.fill()
+
+    def timed(fn, count=rounds):
+        start = time.perf_counter()
+        for _ in range(count):
+            fn()
+        return (time.perf_counter() - start) / count * 1000
+
+    # Cifratura: r^n dal pool contro calcolo al momento
+    print(f"Cifratura con pool: {timed(lambda: public.encrypt(500, public.randomness._values[0])):.2f}ms  "
+          f"senza pool: {timed(lambda: public.encrypt(500, public.random_factor()), 5):.2f}ms")
+
+    # Decifratura: CRT su p², q² contro L(c^λ mod n²)·μ mod n
+    ciphertext = public.encrypt(123)
+    n, n_square = public.n, public.n_square
+    lam = (private.p - 1) * (private.q - 1)
+    mu = pow(lam, -1, n)
+    assert (pow(ciphertext, lam, n_square) - 1) // n * mu % n == private.decrypt(ciphertext) == 123
+    print(f"Decifratura CRT: {timed(lambda: private.decrypt(ciphertext)):.2f}ms  "
+          f"senza CRT: {timed(lambda: (pow(ciphertext, lam, n_square) - 1) // n * mu % n):.2f}ms")
+
+    # Variazioni end to end nel GameManager: il server non vede mai i numeri
+    manager = GameManager(vrf_latency=0.0)
+    game_id, players, numbers = start_game(manager, public_key=public_key)
+    game = manager.get_game(game_id)
+    latencies = []
+    for address in players:
+        state = HomomorphicEngine.encrypt_numbers(numbers[address], public_key)
+        plain = numbers[address]
+        for _ in range(variations):
+            manager.request_variation(game_id, address)
+            start = time.perf_counter()
+            result = manager.compute_variation_encrypted(game_id, address, state)
+            latencies.append(time.perf_counter() - start)
+            state = result["encrypted_state"]
+            plain = [x + d for x, d in zip(plain, result["deltas"])]
+            # Stesso output del calcolo in chiaro sui numeri decifrati
+            assert HomomorphicEngine.decrypt_numbers(state, private_key) == plain
+            assert HomomorphicEngine.decrypt_output(result["encrypted_output"], private_key) == \
+                calculate_validation_function(plain, game.function_coefficients, game.function_bias)
+
+    latencies.sort()
+    print(f"Variazione cifrata (delta + F + ri-randomizzazione): p50 {latencies[len(latencies) // 2] * 1000:.2f}ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f}ms  su {len(latencies)}")
+    print(f"Pool di casualità: {public.randomness.hits} hit, {public.randomness.misses} miss")
+    manager.close()
+
+
+def bench_threshold(games: int = 1000, players: int = 3, variations: int = 9):
+    """Decifratura 4-di-5 degli output di tutte le variazioni: uno alla volta vs batch con pesi in cache"""
+    outputs = games * players * variations
+    print_section(f"SHAMIR 4/5 ({outputs} output: {games} giochi x {players} giocatori x {variations} variazioni)")
+    import random
+    from crypto import threshold
+    from crypto.number_derivation import calculate_validation_function
+
+    secret, shares = threshold.generate_shared_key()
+    rng = random.Random(7)
+    coefficients = [rng.randrange(100) for _ in range(10)]
+    bias = rng.randrange(1001)
+    states = [[rng.randrange(1001) for _ in range(10)] for _ in range(outputs)]
+
+    # Output di F calcolati sui cifrati, poi decifrati parzialmente da 4 detentori su 5
+    ciphertexts = [
+        threshold.linear_combination([threshold.encrypt(x, secret) for x in state], coefficients, bias)
+        for state in states
+    ]
+    holders = shares[1:]
+    partials = {index: threshold.partial_decrypt(ciphertexts, (index, value)) for index, value in holders}
+
+    def one_by_one():
+        # Pesi ricalcolati per ogni output, come una ricostruzione isolata
+        result = []
+        for k, (_, b) in enumerate(ciphertexts):
+            threshold.lagrange_weights.cache_clear()
+            mask = threshold.reconstruct_secret([(index, partials[index][k]) for index, _ in holders])
+            result.append((b - mask) % threshold.PRIME)
+        return result
+
+    rows = [("Uno alla volta", one_by_one), ("Batch, pesi in cache", lambda: threshold.combine(ciphertexts, partials))]
+    results = []
+    for label, fn in rows:
+        start = time.perf_counter()
+        results.append(fn())
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<22} {elapsed * 1000:8.1f}ms  ({elapsed / outputs * 1e6:.2f}us per output)")
+
+    expected = [calculate_validation_function(state, coefficients, bias) for state in states]
+    assert all([value % 10000 for value in result] == expected for result in results)
+    assert threshold.reconstruct_secret(shares[:4]) == threshold.reconstruct_secret(shares[1:]) == secret
+    print(f"Pesi di Lagrange: {threshold.lagrange_weights.cache_info().hits} hit in cache")
+
+
+def bench_validation_array(count: int = 1_000_000):
+    """F su un milione di vettori: funzione scalare contro NumPy int64"""
+    print_section(f"VALUTAZIONE DI F IN BATCH ({count} vettori)")
+    import numpy as np
+    from crypto.number_derivation import calculate_validation_function, calculate_validation_function_array
+
+    rng = np.random.default_rng(7)
+    states = rng.integers(0, 1001, size=(count, 10), dtype=np.int64)
+    # Anche fuori range e negativi (stati del percorso cifrato non limitati)
+    states[: count // 10] = rng.integers(-2000, 3000, size=(count // 10, 10))
+    coefficients = [int(c) for c in rng.integers(0, 100, size=10)]
+    bias = 537
+    rows = states.tolist()
+
+    timings = []
+    for label, fn in [
+        ("Scalare", lambda: [calculate_validation_function(row, coefficients, bias) for row in rows]),
+        ("NumPy int64", lambda: calculate_validation_function_array(states, coefficients, bias)),
+    ]:
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        timings.append(result)
+        print(f"  {label:<20} {elapsed * 1000:8.0f}ms  ({count / elapsed / 1e6:.1f}M vettori/s)")
+
+    scalar, array = timings
+    assert scalar == array.tolist()
+    # Modulo grande: ramo con riduzione per colonna, confrontato con gli interi di Python
+    big = 2**31 - 1
+    big_coefficients = [big - 1 - c for c in coefficients]
+    assert calculate_validation_function_array(states[:10_000], big_coefficients, bias, big).tolist() == \
+        [calculate_validation_function(row, big_coefficients, bias, big) for row in rows[:10_000]]
+    print("Output identici alla funzione scalare")
+
+
+SCENARIOS = {
+    "games": bench_full_games,
+    "tx_memory": bench_tx_memory,
+    "rpc": bench_rpc,
+    "registration": bench_registration,
+    "vrf_batch": bench_vrf_batch,
+    "async_routes": bench_async_routes,
+    "game_store": bench_game_store,
+    "sharding": bench_sharding,
+    "eviction": bench_eviction,
+    "matchmaking": bench_matchmaking,
+    "timeouts": bench_timeouts,
+    "variations": bench_variations,
+    "key_pool": bench_key_pool,
+    "cipher_cache": bench_cipher_cache,
+    "paillier": bench_paillier,
+    "threshold": bench_threshold,
+    "validation_array": bench_validation_array,
+}
+
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(SCENARIOS)
+    for name in selected:
+        if name not in SCENARIOS:
+            print(f"Scenario sconosciuto: {name} (disponibili: {', '.join(SCENARIOS)})")
+            sys.exit(1)
+        SCENARIOS[name]()
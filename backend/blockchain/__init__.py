@@ -1,5 +1,11 @@
 from .mock_blockchain import MockBlockchain
 from .vrf_simulator import VRFSimulator
 from .smart_contract import SmartContract
+from .block_store import BlockStore
+from .tx_record import TxRecord
+from .ledger import LedgerBackend
+from .rpc_ledger import JsonRpcLedger
+from .rpc_server import LedgerRPCServer
 
-__all__ = ["MockBlockchain", "VRFSimulator", "SmartContract"]
+__all__ = ["MockBlockchain", "VRFSimulator", "SmartContract", "BlockStore", "TxRecord",
+           "LedgerBackend", "JsonRpcLedger", "LedgerRPCServer"]
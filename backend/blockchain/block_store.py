@@ -0,0 +1,511 @@
+"""
+Block Store - Persistenza append-only della chain su disco
+
+Layout della directory:
+    segment_000000.dat   blocchi codificati in binario, solo append
+    blocks.idx           record fissi block_number -> (segmento, offset, lunghezza)
+    blooms.idx           record fissi block_number -> logs bloom (2048 bit)
+    tx.idx               record fissi tx_hash -> (block_number, posizione nel blocco)
+    tx.hash              tabella hash su disco degli stessi record (lookup O(1))
+    checkpoint.json      altezza e lunghezze valide dei file all'ultimo checkpoint
+
+All'avvio si legge solo il checkpoint e si recuperano gli eventuali blocchi
+scritti dopo: la storia non viene mai deserializzata per intero.
+I segmenti recenti sono letti via mmap.
+"""
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from blockchain.mock_blockchain import Block
+from blockchain.bloom import LogBloom, BLOOM_BYTES
+from blockchain.tx_record import TxRecord, pack_hash, unpack_hash
+
+
+# block_number, timestamp (µs), nonce, n_tx
+_BLOCK_HEADER = struct.Struct("<QqQI")
+# segment_id, offset, length
+_BLOCK_INDEX = struct.Struct("<IQI")
+# tx_hash (32 byte), block_number, offset
+_TX_INDEX = struct.Struct("<32sQI")
+# Header di tx.hash: capacità (slot), record validi all'ultimo checkpoint
+_TX_HASH_HEADER = struct.Struct("<QQ")
+_TX_HASH_MIN_CAPACITY = 1024
+_TX_HASH_PROBE = 8  # Slot letti per pread durante il probing
+_EMPTY_SLOT = b"\x00" * 32
+_TX_HASH_DIRTY = 2**64 - 1  # Header dopo inserimenti non ancora in checkpoint
+
+
+# ==================== CODIFICA BINARIA ====================
+
+def _to_micros(ts: datetime) -> int:
+    return round(ts.timestamp() * 1_000_000)
+
+
+def _from_micros(value: int) -> datetime:
+    return datetime.fromtimestamp(value / 1_000_000)
+
+
+def encode_block(block: Block) -> bytes:
+    """Codifica compatta di un blocco con tutte le sue transazioni"""
+    parts = [
+        _BLOCK_HEADER.pack(
+            block.block_number,
+            _to_micros(block.timestamp),
+            block.nonce,
+            len(block.transactions)
+        ),
+        pack_hash(block.hash),
+        pack_hash(block.previous_hash),
+        pack_hash(block.merkle_root),
+    ]
+    # Le tx sono già nella loro codifica canonica
+    parts.extend(tx.encode() for tx in block.transactions)
+    return b"".join(parts)
+
+
+def decode_block(buf, pos: int = 0) -> Block:
+    block_number, timestamp, nonce, n_tx = _BLOCK_HEADER.unpack_from(buf, pos)
+    pos += _BLOCK_HEADER.size
+    block_hash = unpack_hash(bytes(buf[pos:pos + 32]), "")
+    previous_hash = unpack_hash(bytes(buf[pos + 32:pos + 64]), "")
+    merkle_root = unpack_hash(bytes(buf[pos + 64:pos + 96]), "0x")
+    pos += 96
+
+    transactions = []
+    for _ in range(n_tx):
+        tx, pos = TxRecord.decode(buf, pos, block_number)
+        transactions.append(tx)
+
+    return Block.restore(
+        block_number=block_number,
+        previous_hash=previous_hash,
+        transactions=transactions,
+        timestamp=_from_micros(timestamp),
+        nonce=nonce,
+        block_hash=block_hash,
+        merkle_root=merkle_root
+    )
+
+
+# ==================== STORE ====================
+
+class BlockStore:
+    """Storage append-only a segmenti per i blocchi della MockBlockchain"""
+
+    CHECKPOINT_FILE = "checkpoint.json"
+    BLOCK_INDEX_FILE = "blocks.idx"
+    BLOOM_INDEX_FILE = "blooms.idx"
+    TX_INDEX_FILE = "tx.idx"
+    TX_HASH_FILE = "tx.hash"
+
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int = 64 * 1024 * 1024,
+        mapped_segments: int = 4,
+        checkpoint_interval: int = 100
+    ):
+        """
+        Args:
+            directory: Directory dei file della chain (creata se manca)
+            segment_size: Dimensione oltre la quale si apre un nuovo segmento
+            mapped_segments: Quanti segmenti recenti tenere mappati in memoria
+            checkpoint_interval: Ogni quanti blocchi scrivere il checkpoint
+        """
+        self.directory = directory
+        self.segment_size = segment_size
+        self.mapped_segments = mapped_segments
+        self.checkpoint_interval = checkpoint_interval
+
+        os.makedirs(directory, exist_ok=True)
+
+        # Le letture arrivano da più thread (pool dell'API) senza il lock della chain:
+        # _lock protegge la cache dei mmap e la tabella hash delle tx
+        self._lock = threading.Lock()
+        self._maps: "OrderedDict[int, mmap.mmap]" = OrderedDict()
+        self._tx_hash_fd: Optional[int] = None
+        self._tx_hash_capacity = 0
+        self._tx_hash_count = 0
+        self._tx_hash_clean = False
+        self.height = 0  # Numero di blocchi salvati
+        self.tx_count = 0
+        self._segment_id = 0
+        self._segment_length = 0
+
+        self._recover()
+
+        self._segment_file = open(self._segment_path(self._segment_id), "ab")
+        self._block_index = open(self._path(self.BLOCK_INDEX_FILE), "ab")
+        self._bloom_index = open(self._path(self.BLOOM_INDEX_FILE), "ab")
+        self._tx_index = open(self._path(self.TX_INDEX_FILE), "ab")
+
+    # ==================== PATH ====================
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _segment_path(self, segment_id: int) -> str:
+        return self._path(f"segment_{segment_id:06d}.dat")
+
+    # ==================== RECOVERY ====================
+
+    def _recover(self):
+        """
+        Ripristina lo stato dall'ultimo checkpoint
+
+        Solo i blocchi scritti dopo il checkpoint vengono riletti; i record
+        incompleti (crash a metà scrittura) vengono troncati.
+        """
+        checkpoint = {}
+        checkpoint_path = self._path(self.CHECKPOINT_FILE)
+        if os.path.exists(checkpoint_path):
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+
+        self.height = checkpoint.get("height", 0)
+        self.tx_count = checkpoint.get("tx_count", 0)
+        self._segment_id = checkpoint.get("segment_id", 0)
+        self._segment_length = checkpoint.get("segment_length", 0)
+
+        block_index_path = self._path(self.BLOCK_INDEX_FILE)
+        tx_index_path = self._path(self.TX_INDEX_FILE)
+        bloom_index_path = self._path(self.BLOOM_INDEX_FILE)
+        for path in (block_index_path, tx_index_path, bloom_index_path):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+
+        # Blocchi indicizzati dopo il checkpoint con dati completi su disco
+        indexed = os.path.getsize(block_index_path) // _BLOCK_INDEX.size
+        recovered: List[Tuple[int, int, int]] = []
+        if indexed > self.height:
+            with open(block_index_path, "rb") as f:
+                f.seek(self.height * _BLOCK_INDEX.size)
+                for _ in range(indexed - self.height):
+                    entry = _BLOCK_INDEX.unpack(f.read(_BLOCK_INDEX.size))
+                    segment_id, offset, length = entry
+                    path = self._segment_path(segment_id)
+                    if not os.path.exists(path) or os.path.getsize(path) < offset + length:
+                        break
+                    recovered.append(entry)
+
+        if recovered:
+            last_segment, last_offset, last_length = recovered[-1]
+            self._segment_id = last_segment
+            self._segment_length = last_offset + last_length
+
+        # Tronca tutto ciò che va oltre lo stato consistente
+        with open(block_index_path, "r+b") as f:
+            f.truncate(self.height * _BLOCK_INDEX.size)
+        with open(tx_index_path, "r+b") as f:
+            f.truncate(self.tx_count * _TX_INDEX.size)
+        with open(bloom_index_path, "r+b") as f:
+            f.truncate(self.height * BLOOM_BYTES)
+        if os.path.exists(self._segment_path(self._segment_id)):
+            with open(self._segment_path(self._segment_id), "r+b") as f:
+                f.truncate(self._segment_length)
+        next_segment = self._segment_id + 1
+        while os.path.exists(self._segment_path(next_segment)):
+            os.remove(self._segment_path(next_segment))
+            next_segment += 1
+
+        if not recovered:
+            self._open_tx_hash()
+            return
+
+        # Riapplica la coda: rilegge i blocchi e ricostruisce gli indici
+        with open(block_index_path, "ab") as block_index, open(tx_index_path, "ab") as tx_index, \
+                open(bloom_index_path, "ab") as bloom_index:
+            for segment_id, offset, length in recovered:
+                with open(self._segment_path(segment_id), "rb") as f:
+                    f.seek(offset)
+                    block = decode_block(f.read(length))
+
+                for position, tx in enumerate(block.transactions):
+                    tx_index.write(_TX_INDEX.pack(pack_hash(tx.tx_hash), block.block_number, position))
+                bloom_index.write(block.logs_bloom.to_bytes())
+                block_index.write(_BLOCK_INDEX.pack(segment_id, offset, length))
+                self.height += 1
+                self.tx_count += len(block.transactions)
+
+        self._rebuild_tx_hash(self.tx_count)
+        self.checkpoint()
+
+    def checkpoint(self):
+        """Scrive atomicamente il checkpoint con le lunghezze valide dei file"""
+        for f in (getattr(self, "_segment_file", None), getattr(self, "_tx_index", None),
+                  getattr(self, "_bloom_index", None), getattr(self, "_block_index", None)):
+            if f is not None:
+                f.flush()
+                os.fsync(f.fileno())
+        # La tabella hash vale fino a tx_count: un header diverso all'avvio la fa ricostruire
+        if self._tx_hash_fd is not None:
+            with self._lock:
+                os.fsync(self._tx_hash_fd)
+                os.pwrite(self._tx_hash_fd, _TX_HASH_HEADER.pack(self._tx_hash_capacity, self.tx_count), 0)
+                os.fsync(self._tx_hash_fd)
+                self._tx_hash_clean = True
+
+        data = {
+            "height": self.height,
+            "tx_count": self.tx_count,
+            "segment_id": self._segment_id,
+            "segment_length": self._segment_length,
+        }
+        tmp_path = self._path(self.CHECKPOINT_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(self.CHECKPOINT_FILE))
+
+    # ==================== SCRITTURA ====================
+
+    def append_block(self, block: Block):
+        """Aggiunge un blocco in coda (i blocchi vanno scritti in ordine)"""
+        if block.block_number != self.height:
+            raise ValueError(f"Expected block {self.height}, got {block.block_number}")
+
+        data = encode_block(block)
+
+        # Rollover del segmento
+        if self._segment_length and self._segment_length + len(data) > self.segment_size:
+            self._segment_file.close()
+            self._segment_id += 1
+            self._segment_length = 0
+            self._segment_file = open(self._segment_path(self._segment_id), "ab")
+
+        offset = self._segment_length
+        self._segment_file.write(data)
+        self._segment_length += len(data)
+
+        # Indici dopo i dati: il record in blocks.idx fa da marker di commit
+        for position, tx in enumerate(block.transactions):
+            self._tx_index.write(_TX_INDEX.pack(pack_hash(tx.tx_hash), block.block_number, position))
+        self._index_transactions(block)
+        self._bloom_index.write(block.logs_bloom.to_bytes())
+        self._block_index.write(_BLOCK_INDEX.pack(self._segment_id, offset, len(data)))
+
+        self._segment_file.flush()
+        self._tx_index.flush()
+        self._bloom_index.flush()
+        self._block_index.flush()
+
+        # Il blocco diventa visibile ai lettori solo con i file già scritti
+        self.height += 1
+        self.tx_count += len(block.transactions)
+
+        if self.height % self.checkpoint_interval == 0:
+            self.checkpoint()
+
+    # ==================== INDICE HASH DELLE TX ====================
+
+    def _open_tx_hash(self):
+        """
+        Apre tx.hash; la ricostruisce da tx.idx se manca o non corrisponde al checkpoint
+
+        Il primo inserimento dopo un checkpoint segna l'header come sporco:
+        dopo un'interruzione la tabella non può contenere tx di blocchi persi.
+        """
+        path = self._path(self.TX_HASH_FILE)
+        if os.path.exists(path):
+            fd = os.open(path, os.O_RDWR)
+            header = os.pread(fd, _TX_HASH_HEADER.size, 0)
+            if len(header) == _TX_HASH_HEADER.size:
+                capacity, count = _TX_HASH_HEADER.unpack(header)
+                if count == self.tx_count and capacity >= 2 * count and \
+                        os.fstat(fd).st_size == _TX_HASH_HEADER.size + capacity * _TX_INDEX.size:
+                    self._tx_hash_fd, self._tx_hash_capacity, self._tx_hash_count = fd, capacity, count
+                    self._tx_hash_clean = True
+                    return
+            os.close(fd)
+        self._rebuild_tx_hash(self.tx_count)
+
+    def _rebuild_tx_hash(self, records: int):
+        """
+        Riscrive la tabella dai primi `records` record di tx.idx, con capacità almeno doppia
+
+        Costa O(n) ma avviene solo al raddoppio (costo ammortizzato O(1) per tx)
+        o dopo un'interruzione.
+        """
+        capacity = _TX_HASH_MIN_CAPACITY
+        while capacity < 2 * (records + 1):
+            capacity *= 2
+
+        table = bytearray(capacity * _TX_INDEX.size)
+        count = 0
+        with open(self._path(self.TX_INDEX_FILE), "rb") as f:
+            data = f.read(records * _TX_INDEX.size)
+        for pos in range(0, len(data), _TX_INDEX.size):
+            record = data[pos:pos + _TX_INDEX.size]
+            if self._probe_insert(table, capacity, record):
+                count += 1
+
+        path = self._path(self.TX_HASH_FILE)
+        tmp_path = path + ".tmp"
+        # Header pulito solo se la tabella coincide con il checkpoint
+        header_count = records if records == self.tx_count else _TX_HASH_DIRTY
+        with open(tmp_path, "wb") as f:
+            f.write(_TX_HASH_HEADER.pack(capacity, header_count))
+            f.write(table)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+        fd = os.open(path, os.O_RDWR)
+        with self._lock:
+            old, self._tx_hash_fd = self._tx_hash_fd, fd
+            self._tx_hash_capacity, self._tx_hash_count = capacity, count
+            self._tx_hash_clean = header_count != _TX_HASH_DIRTY
+        if old is not None:
+            os.close(old)
+
+    @staticmethod
+    def _slot(key: bytes, capacity: int) -> int:
+        # Gli hash delle tx sono SHA-256: i primi 8 byte sono già uniformi
+        return int.from_bytes(key[:8], "little") & (capacity - 1)
+
+    @classmethod
+    def _probe_insert(cls, table: bytearray, capacity: int, record: bytes) -> bool:
+        """Inserisce in una tabella in memoria; False se la chiave c'era già (sovrascritta)"""
+        key = record[:32]
+        slot = cls._slot(key, capacity)
+        while True:
+            start = slot * _TX_INDEX.size
+            current = table[start:start + 32]
+            if current == _EMPTY_SLOT or current == key:
+                table[start:start + _TX_INDEX.size] = record
+                return current == _EMPTY_SLOT
+            slot = (slot + 1) & (capacity - 1)
+
+    def _index_transactions(self, block: Block):
+        """Aggiunge le tx di un blocco a tx.hash (dopo averle scritte in tx.idx)"""
+        if not block.transactions:
+            return
+        if 2 * (self._tx_hash_count + len(block.transactions)) > self._tx_hash_capacity:
+            # tx.idx contiene già le tx del blocco: la ricostruzione le include
+            self._tx_index.flush()
+            self._rebuild_tx_hash(self.tx_count + len(block.transactions))
+            return
+
+        with self._lock:
+            if self._tx_hash_clean:
+                os.pwrite(self._tx_hash_fd, _TX_HASH_HEADER.pack(self._tx_hash_capacity, _TX_HASH_DIRTY), 0)
+                self._tx_hash_clean = False
+            for position, tx in enumerate(block.transactions):
+                record = _TX_INDEX.pack(pack_hash(tx.tx_hash), block.block_number, position)
+                if self._write_slot(record):
+                    self._tx_hash_count += 1
+
+    def _write_slot(self, record: bytes) -> bool:
+        """Probing lineare su disco (chiamare sotto _lock)"""
+        key = record[:32]
+        capacity = self._tx_hash_capacity
+        slot = self._slot(key, capacity)
+        while True:
+            window = min(_TX_HASH_PROBE, capacity - slot)
+            data = os.pread(self._tx_hash_fd, window * _TX_INDEX.size, _TX_HASH_HEADER.size + slot * _TX_INDEX.size)
+            for i in range(window):
+                current = data[i * _TX_INDEX.size:i * _TX_INDEX.size + 32]
+                if current == _EMPTY_SLOT or current == key:
+                    os.pwrite(self._tx_hash_fd, record, _TX_HASH_HEADER.size + (slot + i) * _TX_INDEX.size)
+                    return current == _EMPTY_SLOT
+            slot = (slot + window) & (capacity - 1)
+
+    # ==================== LETTURA ====================
+
+    def _segment_view(self, segment_id: int, end: int):
+        """mmap del segmento che copre almeno fino a `end` (LRU, chiamare sotto _lock)"""
+        mapped = self._maps.get(segment_id)
+        if mapped is not None and len(mapped) >= end:
+            self._maps.move_to_end(segment_id)
+            return mapped
+
+        if mapped is not None:
+            mapped.close()
+            del self._maps[segment_id]
+
+        with open(self._segment_path(segment_id), "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[segment_id] = mapped
+
+        while len(self._maps) > self.mapped_segments:
+            _, old = self._maps.popitem(last=False)
+            old.close()
+
+        return mapped
+
+    def _block_location(self, block_number: int) -> Tuple[int, int, int]:
+        with open(self._path(self.BLOCK_INDEX_FILE), "rb") as f:
+            f.seek(block_number * _BLOCK_INDEX.size)
+            return _BLOCK_INDEX.unpack(f.read(_BLOCK_INDEX.size))
+
+    def read_block(self, block_number: int) -> Optional[Block]:
+        """Legge un singolo blocco senza toccare il resto della storia"""
+        if not 0 <= block_number < self.height:
+            return None
+
+        segment_id, offset, length = self._block_location(block_number)
+        newest = self._segment_id - self.mapped_segments
+        if segment_id > newest:
+            # Copia sotto lock: nessun puntatore al mmap sopravvive a un remap/eviction
+            with self._lock:
+                data = self._segment_view(segment_id, offset + length)[offset:offset + length]
+            return decode_block(data)
+
+        # Segmenti vecchi: lettura puntuale senza mapparli
+        with open(self._segment_path(segment_id), "rb") as f:
+            f.seek(offset)
+            return decode_block(f.read(length))
+
+    def read_bloom(self, block_number: int) -> Optional[LogBloom]:
+        """Bloom dei log di un blocco, letto senza decodificare il blocco"""
+        if not 0 <= block_number < self.height:
+            return None
+        with open(self._path(self.BLOOM_INDEX_FILE), "rb") as f:
+            f.seek(block_number * BLOOM_BYTES)
+            return LogBloom.from_bytes(f.read(BLOOM_BYTES))
+
+    def find_transaction(self, tx_hash: str) -> Optional[Tuple[int, int]]:
+        """Cerca (block_number, posizione) di una tx nella tabella hash su disco (O(1) pread)"""
+        key = pack_hash(tx_hash)
+        if key == _EMPTY_SLOT:
+            return None
+
+        with self._lock:
+            if self._tx_hash_fd is None:
+                return None
+            capacity = self._tx_hash_capacity
+            slot = self._slot(key, capacity)
+            while True:
+                window = min(_TX_HASH_PROBE, capacity - slot)
+                data = os.pread(
+                    self._tx_hash_fd, window * _TX_INDEX.size, _TX_HASH_HEADER.size + slot * _TX_INDEX.size
+                )
+                for i in range(window):
+                    record_hash, block_number, position = _TX_INDEX.unpack_from(data, i * _TX_INDEX.size)
+                    if record_hash == key:
+                        return (block_number, position) if block_number < self.height else None
+                    if record_hash == _EMPTY_SLOT:
+                        return None
+                slot = (slot + window) & (capacity - 1)
+
+    def close(self):
+        """Checkpoint finale e chiusura dei file"""
+        self.checkpoint()
+        with self._lock:
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            if self._tx_hash_fd is not None:
+                os.close(self._tx_hash_fd)
+                self._tx_hash_fd = None
+        self._segment_file.close()
+        self._block_index.close()
+        self._bloom_index.close()
+        self._tx_index.close()
@@ -0,0 +1,51 @@
+"""
+Log Bloom - Filtro bloom a 2048 bit per blocco (come logsBloom di Ethereum)
+Permette di scartare i blocchi che non contengono un topic senza decodificarli
+"""
+import hashlib
+from functools import lru_cache
+from typing import Iterable
+
+BLOOM_BITS = 2048
+BLOOM_BYTES = BLOOM_BITS // 8
+
+
+@lru_cache(maxsize=65536)
+def bloom_mask(value: str) -> int:
+    """Tre bit presi da coppie di byte dello SHA-256 del valore (cache: i topic si ripetono)"""
+    digest = hashlib.sha256(value.encode()).digest()
+    mask = 0
+    for i in range(0, 6, 2):
+        bit = int.from_bytes(digest[i:i + 2], "big") % BLOOM_BITS
+        mask |= 1 << bit
+    return mask
+
+
+class LogBloom:
+    """Bloom filter dei topic di un blocco, rappresentato come intero"""
+
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: int = 0):
+        self.bits = bits
+
+    def add(self, value: str):
+        self.bits |= bloom_mask(value)
+
+    def add_all(self, values: Iterable[str]):
+        # Anche "" (es. player vuoto): get_logs lo cerca come qualsiasi altro topic
+        for value in values:
+            self.add(value)
+
+    def might_contain_mask(self, mask: int) -> bool:
+        return self.bits & mask == mask
+
+    def might_contain(self, value: str) -> bool:
+        return self.might_contain_mask(bloom_mask(value))
+
+    def to_bytes(self) -> bytes:
+        return self.bits.to_bytes(BLOOM_BYTES, "big")
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "LogBloom":
+        return cls(int.from_bytes(data, "big"))
@@ -0,0 +1,423 @@
+"""
+Chain Archive - Segmenti compressi per i blocchi potati e snapshot di stato
+Usato dal pruning quando la chain non ha un BlockStore su disco
+"""
+import bisect
+import gzip
+import json
+import os
+import struct
+import threading
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from blockchain.mock_blockchain import Block, BlockHeader
+from blockchain.block_store import encode_block, decode_block
+from blockchain.tx_record import pack_hash
+
+_LEN = struct.Struct("<I")
+_OFFSET_BITS = 20  # Posizione della tx nel blocco, nei bit bassi della location
+# Slot di tx.hash: chiave (prefisso dell'hash), location + 1 (0 = slot vuoto)
+_TX_SLOT = struct.Struct("<QQ")
+# Header di tx.hash: capacità (slot), record, altezza dell'archivio indicizzata
+_TX_HASH_HEADER = struct.Struct("<QQQ")
+_TX_HASH_MIN_CAPACITY = 1024
+_TX_HASH_PROBE = 8  # Slot letti per pread durante il probing
+_TX_HASH_DIRTY = 2**64 - 1  # Altezza scritta durante un inserimento
+
+
+def _tx_key(tx_hash: str) -> int:
+    """Primi 8 byte dell'hash: chi legge il blocco confronta l'hash completo"""
+    return int.from_bytes(pack_hash(tx_hash)[:8], "little")
+
+
+class ChainArchive:
+    """
+    Archivio cold della chain
+
+    Ogni round di pruning scrive un segmento `archive_<primo>_<ultimo>.zlib`
+    con i blocchi codificati in binario e compressi insieme, più il suo indice
+    delle tx `.idx` (chiavi ordinate e posizioni); le tx di tutti i segmenti
+    sono cercate in `tx.hash`, tabella hash su disco come quella del BlockStore
+    (in memoria non resta niente per tx). Lo stato ripiegato (balances, risultati) finisce in `snapshot_<altezza>.json.gz`
+    e gli header dei blocchi potati in coda a `headers.jsonl`.
+
+    Al riavvio senza BlockStore la chain riparte da `height` e
+    `load_header_chain()`: i segmenti già scritti non vengono mai riscritti.
+    """
+
+    SNAPSHOTS_KEPT = 2
+
+    def __init__(self, directory: str, compression_level: int = 6):
+        self.directory = directory
+        self.compression_level = compression_level
+        os.makedirs(directory, exist_ok=True)
+
+        # Range (primo, ultimo) dei segmenti presenti, ordinati
+        self._segments: List[Tuple[int, int]] = []
+        for name in os.listdir(directory):
+            if name.startswith("archive_") and name.endswith(".zlib"):
+                first, last = name[len("archive_"):-len(".zlib")].split("_")
+                self._segments.append((int(first), int(last)))
+        self._segments.sort()
+        for (_, last), (first, _) in zip(self._segments, self._segments[1:]):
+            if first != last + 1:
+                raise ValueError(f"Chain archive {directory} has overlapping or missing segments at block {first}")
+
+        # tx.hash: letture dai thread dell'API, inserimenti dal pruning sotto il lock della chain
+        self._lock = threading.Lock()
+        self._tx_hash_fd: Optional[int] = None
+        self._tx_hash_capacity = 0
+        self._tx_hash_count = 0
+        self._open_tx_hash()
+
+        # Ultimo segmento decompresso (letture sequenziali dall'explorer):
+        # ((primo, ultimo), blocchi), sostituito in un solo assegnamento
+        self._cached: Tuple[Optional[Tuple[int, int]], Dict[int, bytes]] = (None, {})
+
+        # Blocchi con header già in headers.jsonl (append_headers salta i ripetuti)
+        self._header_count = self._recover_headers_tail()
+
+    @property
+    def height(self) -> int:
+        """Numero di blocchi archiviati (sempre da 0 a height - 1)"""
+        return self._segments[-1][1] + 1 if self._segments else 0
+
+    def _segment_path(self, first: int, last: int) -> str:
+        return os.path.join(self.directory, f"archive_{first:09d}_{last:09d}.zlib")
+
+    def _index_path(self, first: int, last: int) -> str:
+        return os.path.join(self.directory, f"archive_{first:09d}_{last:09d}.idx")
+
+    # ==================== BLOCCHI ====================
+
+    def archive_blocks(self, blocks: List[Block]):
+        """Scrive un segmento compresso con blocchi consecutivi"""
+        if not blocks:
+            return
+
+        payload = b"".join(
+            _LEN.pack(len(data)) + data
+            for data in (encode_block(block) for block in blocks)
+        )
+        first, last = blocks[0].block_number, blocks[-1].block_number
+        if first != self.height:
+            raise ValueError(f"Expected block {self.height} as next archived block, got {first}")
+
+        # Indice prima del segmento: un segmento visibile ha sempre il suo indice
+        keys, locations = self._write_tx_index(first, last, blocks)
+
+        path = self._segment_path(first, last)
+        with open(path + ".tmp", "wb") as f:
+            f.write(zlib.compress(payload, self.compression_level))
+        os.replace(path + ".tmp", path)
+
+        bisect.insort(self._segments, (first, last))
+        self._index_transactions(keys, locations)
+
+    def read_block(self, block_number: int) -> Optional[Block]:
+        """Legge un blocco archiviato (decomprime l'intero segmento una volta)"""
+        segment = self._segment_of(block_number)
+        if segment is None:
+            return None
+
+        cached_range, blocks = self._cached
+        if cached_range != segment:
+            blocks = self._read_segment(*segment)
+            self._cached = (segment, blocks)
+
+        return decode_block(blocks[block_number])
+
+    def _segment_of(self, block_number: int) -> Optional[Tuple[int, int]]:
+        index = bisect.bisect_right(self._segments, (block_number, float("inf"))) - 1
+        if index < 0:
+            return None
+        first, last = self._segments[index]
+        if not first <= block_number <= last:
+            return None
+        return first, last
+
+    def _read_segment(self, first: int, last: int) -> Dict[int, bytes]:
+        """Blocchi codificati di un segmento per numero"""
+        with open(self._segment_path(first, last), "rb") as f:
+            payload = zlib.decompress(f.read())
+        blocks = {}
+        pos = 0
+        number = first
+        while pos < len(payload):
+            (length,) = _LEN.unpack_from(payload, pos)
+            pos += _LEN.size
+            blocks[number] = payload[pos:pos + length]
+            pos += length
+            number += 1
+        return blocks
+
+    # ==================== INDICE TX ====================
+
+    def find_transaction(self, tx_hash: str) -> Optional[Tuple[int, int]]:
+        """
+        (block_number, posizione) di una tx archiviata, None se sconosciuta
+
+        Cerca il prefisso dell'hash in tx.hash (pochi pread): il chiamante
+        verifica l'hash sulla tx del blocco.
+        """
+        key = _tx_key(tx_hash)
+        with self._lock:
+            capacity = self._tx_hash_capacity
+            slot = self._slot(key, capacity)
+            while True:
+                window = min(_TX_HASH_PROBE, capacity - slot)
+                data = os.pread(
+                    self._tx_hash_fd, window * _TX_SLOT.size, _TX_HASH_HEADER.size + slot * _TX_SLOT.size
+                )
+                for i in range(window):
+                    record_key, stored = _TX_SLOT.unpack_from(data, i * _TX_SLOT.size)
+                    if stored == 0:
+                        return None
+                    if record_key == key:
+                        location = stored - 1
+                        return location >> _OFFSET_BITS, location & ((1 << _OFFSET_BITS) - 1)
+                slot = (slot + window) & (capacity - 1)
+
+    def _write_tx_index(self, first: int, last: int, blocks: List[Block]) -> Tuple[array, array]:
+        entries = sorted(
+            (_tx_key(tx.tx_hash), block.block_number << _OFFSET_BITS | offset)
+            for block in blocks
+            for offset, tx in enumerate(block.transactions)
+        )
+        keys = array("Q", (key for key, _ in entries))
+        locations = array("Q", (location for _, location in entries))
+
+        path = self._index_path(first, last)
+        with open(path + ".tmp", "wb") as f:
+            f.write(keys.tobytes() + locations.tobytes())
+        os.replace(path + ".tmp", path)
+        return keys, locations
+
+    def _load_tx_index(self, first: int, last: int) -> Tuple[array, array]:
+        """Indice di un segmento; ricostruito dai blocchi se manca (segmenti scritti senza indice)"""
+        try:
+            with open(self._index_path(first, last), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            blocks = [decode_block(raw) for raw in self._read_segment(first, last).values()]
+            return self._write_tx_index(first, last, blocks)
+
+        half = len(data) // 2
+        keys, locations = array("Q"), array("Q")
+        keys.frombytes(data[:half])
+        locations.frombytes(data[half:])
+        return keys, locations
+
+    def _open_tx_hash(self):
+        """Apre tx.hash; la ricostruisce dagli indici dei segmenti se non copre l'archivio"""
+        path = os.path.join(self.directory, "tx.hash")
+        if os.path.exists(path):
+            fd = os.open(path, os.O_RDWR)
+            header = os.pread(fd, _TX_HASH_HEADER.size, 0)
+            if len(header) == _TX_HASH_HEADER.size:
+                capacity, count, height = _TX_HASH_HEADER.unpack(header)
+                if height == self.height and capacity >= 2 * count and \
+                        os.fstat(fd).st_size == _TX_HASH_HEADER.size + capacity * _TX_SLOT.size:
+                    self._tx_hash_fd, self._tx_hash_capacity, self._tx_hash_count = fd, capacity, count
+                    return
+            os.close(fd)
+        self._rebuild_tx_hash()
+
+    def _rebuild_tx_hash(self):
+        """
+        Riscrive tx.hash dai `.idx` di tutti i segmenti, con capacità almeno doppia
+
+        Gli indici si leggono uno alla volta: in memoria c'è solo la tabella in costruzione.
+        Costa O(n) ma avviene solo al raddoppio o dopo un'interruzione.
+        """
+        records = 0
+        for first, last in self._segments:
+            if not os.path.exists(self._index_path(first, last)):
+                self._load_tx_index(first, last)  # Riscrive l'indice mancante
+            records += os.path.getsize(self._index_path(first, last)) // (2 * array("Q").itemsize)
+        capacity = _TX_HASH_MIN_CAPACITY
+        while capacity < 2 * (records + 1):
+            capacity *= 2
+
+        table = bytearray(capacity * _TX_SLOT.size)
+        count = 0
+        for segment in self._segments:
+            keys, locations = self._load_tx_index(*segment)
+            for key, location in zip(keys, locations):
+                if self._probe_insert(table, capacity, key, location):
+                    count += 1
+
+        path = os.path.join(self.directory, "tx.hash")
+        with open(path + ".tmp", "wb") as f:
+            f.write(_TX_HASH_HEADER.pack(capacity, count, self.height))
+            f.write(table)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(path + ".tmp", path)
+
+        fd = os.open(path, os.O_RDWR)
+        with self._lock:
+            old, self._tx_hash_fd = self._tx_hash_fd, fd
+            self._tx_hash_capacity, self._tx_hash_count = capacity, count
+        if old is not None:
+            os.close(old)
+
+    @staticmethod
+    def _slot(key: int, capacity: int) -> int:
+        # Gli hash delle tx sono SHA-256: il prefisso è già uniforme
+        return key & (capacity - 1)
+
+    @classmethod
+    def _probe_insert(cls, table: bytearray, capacity: int, key: int, location: int) -> bool:
+        """Inserisce in una tabella in memoria; False se la chiave c'era già (sovrascritta)"""
+        slot = cls._slot(key, capacity)
+        while True:
+            record_key, stored = _TX_SLOT.unpack_from(table, slot * _TX_SLOT.size)
+            if stored == 0 or record_key == key:
+                _TX_SLOT.pack_into(table, slot * _TX_SLOT.size, key, location + 1)
+                return stored == 0
+            slot = (slot + 1) & (capacity - 1)
+
+    def _index_transactions(self, keys: array, locations: array):
+        """Aggiunge a tx.hash le tx del segmento appena scritto"""
+        if 2 * (self._tx_hash_count + len(keys)) > self._tx_hash_capacity:
+            # Il segmento è già in _segments: la ricostruzione lo include
+            self._rebuild_tx_hash()
+            return
+
+        with self._lock:
+            # Header sporco durante gli inserimenti: dopo un crash la tabella si ricostruisce
+            fd, capacity = self._tx_hash_fd, self._tx_hash_capacity
+            os.pwrite(fd, _TX_HASH_HEADER.pack(capacity, self._tx_hash_count, _TX_HASH_DIRTY), 0)
+            for key, location in zip(keys, locations):
+                if self._write_slot(key, location):
+                    self._tx_hash_count += 1
+            os.pwrite(fd, _TX_HASH_HEADER.pack(capacity, self._tx_hash_count, self.height), 0)
+
+    def _write_slot(self, key: int, location: int) -> bool:
+        """Probing lineare su disco (chiamare sotto _lock)"""
+        capacity = self._tx_hash_capacity
+        slot = self._slot(key, capacity)
+        while True:
+            window = min(_TX_HASH_PROBE, capacity - slot)
+            data = os.pread(self._tx_hash_fd, window * _TX_SLOT.size, _TX_HASH_HEADER.size + slot * _TX_SLOT.size)
+            for i in range(window):
+                record_key, stored = _TX_SLOT.unpack_from(data, i * _TX_SLOT.size)
+                if stored == 0 or record_key == key:
+                    os.pwrite(
+                        self._tx_hash_fd, _TX_SLOT.pack(key, location + 1),
+                        _TX_HASH_HEADER.size + (slot + i) * _TX_SLOT.size
+                    )
+                    return stored == 0
+            slot = (slot + window) & (capacity - 1)
+
+    def close(self):
+        """Chiude tx.hash"""
+        with self._lock:
+            if self._tx_hash_fd is not None:
+                os.close(self._tx_hash_fd)
+                self._tx_hash_fd = None
+
+    # ==================== HEADER ====================
+
+    def _headers_path(self) -> str:
+        return os.path.join(self.directory, "headers.jsonl")
+
+    def _recover_headers_tail(self) -> int:
+        """
+        Blocchi coperti da headers.jsonl, letto solo in coda
+
+        Una riga troncata da un crash viene tagliata: le righe aggiunte dopo
+        non finirebbero attaccate a lei.
+        """
+        try:
+            with open(self._headers_path(), "rb+") as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - 4096))
+                tail = f.read()
+                end = tail.rfind(b"\n") + 1
+                if end < len(tail):
+                    f.truncate(size - len(tail) + end)
+        except FileNotFoundError:
+            return 0
+        lines = tail[:end].splitlines()
+        if len(lines) < 2 and size > len(tail):
+            # Riga più lunga del blocco letto: si ricade sul conteggio completo
+            return len(self.load_headers())
+        return json.loads(lines[-1])["block_number"] + 1 if lines else 0
+
+    def append_headers(self, headers: List[Dict]):
+        """Aggiunge in coda a headers.jsonl gli header dei blocchi appena potati (salta quelli già scritti)"""
+        headers = [header for header in headers if header["block_number"] >= self._header_count]
+        if not headers:
+            return
+        with open(self._headers_path(), "a") as f:
+            f.write("".join(json.dumps(header) + "\n" for header in headers))
+        self._header_count = headers[-1]["block_number"] + 1
+
+    def load_headers(self) -> List[Dict]:
+        """Header archiviati (una riga troncata da un crash viene ignorata)"""
+        headers = []
+        try:
+            with open(self._headers_path()) as f:
+                for line in f:
+                    try:
+                        headers.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        break
+        except FileNotFoundError:
+            pass
+        return headers
+
+    def load_header_chain(self) -> List[BlockHeader]:
+        """
+        Header di tutti i blocchi archiviati, da 0 a height - 1
+
+        Quelli che mancano in headers.jsonl (crash tra segmento e header) si
+        ricostruiscono dai segmenti, e il file viene riscritto coerente.
+        """
+        stored = self.load_headers()
+        headers = []
+        for data in stored[:self.height]:
+            if data["block_number"] != len(headers):
+                break
+            headers.append(BlockHeader.from_dict(data))
+        if len(headers) == len(stored) == self.height:
+            return headers
+
+        for block_number in range(len(headers), self.height):
+            headers.append(BlockHeader(self.read_block(block_number)))
+        path = self._headers_path()
+        with open(path + ".tmp", "w") as f:
+            f.write("".join(json.dumps(header.to_dict()) + "\n" for header in headers))
+        os.replace(path + ".tmp", path)
+        self._header_count = self.height
+        return headers
+
+    # ==================== SNAPSHOT ====================
+
+    def write_snapshot(self, height: int, state: Dict):
+        """Salva lo stato ripiegato fino a `height` (escluso) e tiene solo gli ultimi snapshot"""
+        path = os.path.join(self.directory, f"snapshot_{height:09d}.json.gz")
+        with gzip.open(path + ".tmp", "wt") as f:
+            json.dump({"height": height, **state}, f, default=str)
+        os.replace(path + ".tmp", path)
+
+        for old in self._snapshot_names()[:-self.SNAPSHOTS_KEPT]:
+            os.remove(os.path.join(self.directory, old))
+
+    def load_latest_snapshot(self) -> Optional[Dict]:
+        """Ultimo snapshot scritto, None se non ce ne sono"""
+        names = self._snapshot_names()
+        if not names:
+            return None
+        with gzip.open(os.path.join(self.directory, names[-1]), "rt") as f:
+            return json.load(f)
+
+    def _snapshot_names(self) -> List[str]:
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith("snapshot_") and name.endswith(".json.gz")
+        )
@@ -0,0 +1,118 @@
+"""
+Ledger Backend - Interfaccia comune dei ledger su cui gira il gioco
+
+Implementazioni:
+    MockBlockchain   chain simulata in-process (default)
+    JsonRpcLedger    client HTTP JSON-RPC in stile XRPL (vedi rpc_ledger.py)
+
+GameManager usa solo questi metodi, quindi il backend si sceglie
+in configurazione senza toccare la logica di gioco.
+"""
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+from models.game_models import Transaction, TransactionReceipt, InclusionProof, EventLog
+from blockchain.tx_record import TxRecord
+
+
+# Gas simulato per funzione del contratto (condiviso da tutti i backend)
+GAS_COSTS = {
+    "register": 50000,
+    "requestRandomness": 100000,
+    "submitCommitment": 150000,
+    "generateFunction": 80000,
+    "requestVariation": 30000,
+    "requestVariations": 45000,  # Una tx per k variazioni: mai meno di una singola
+    "submitFinalChoice": 200000,  # ZK verification costa tanto
+    "determineWinner": 60000,
+    "distributeRewards": 80000
+}
+DEFAULT_GAS = 21000
+
+
+def estimate_gas(function_name: str) -> int:
+    """Stima il gas in base alla funzione"""
+    return GAS_COSTS.get(function_name, DEFAULT_GAS)
+
+
+class LedgerBackend(ABC):
+    """Interfaccia comune dei ledger"""
+
+    # Numero del prossimo blocco (quello ancora aperto): attributo o property
+    current_block_number: int
+
+    # ==================== TRANSAZIONI ====================
+
+    @abstractmethod
+    def create_transaction(
+        self,
+        from_address: str,
+        function_name: str,
+        params: Dict,
+        to_address: Optional[str] = None,
+        gas_price: Optional[int] = None,
+        system: bool = False
+    ) -> TxRecord:
+        """
+        Crea e invia una transazione; l'hash è disponibile subito
+
+        Le tx `system` sono quelle del gioco, create dopo che il contratto ha
+        già cambiato stato: il ledger non deve rifiutarle per mempool piena.
+
+        Un backend che invia in background mette in `tx.submission` il Future
+        dell'invio: chi ha creato la tx lo attende per vederne il rifiuto.
+
+        Raises:
+            ValueError: se il ledger rifiuta la tx
+        """
+
+    @abstractmethod
+    def mine_block(self):
+        """Chiude il ledger/blocco corrente con le tx pending e lo ritorna"""
+
+    def flush(self):
+        """Attende l'invio delle tx ancora in volo (no-op per i backend sincroni)"""
+
+    @property
+    def producer_running(self) -> bool:
+        """True se il ledger chiude i blocchi da solo (non serve mine_block)"""
+        return False
+
+    # ==================== QUERY ====================
+
+    @property
+    @abstractmethod
+    def pending_count(self) -> int:
+        """Tx in attesa di inclusione"""
+
+    @abstractmethod
+    def get_block(self, block_number: int):
+        """Blocco completo, None se sconosciuto"""
+
+    @abstractmethod
+    def get_transaction(self, tx_hash: str) -> Optional[Transaction]:
+        ...
+
+    @abstractmethod
+    def get_receipt(self, tx_hash: str) -> Optional[TransactionReceipt]:
+        ...
+
+    @abstractmethod
+    def get_inclusion_proof(self, tx_hash: str) -> Optional[InclusionProof]:
+        ...
+
+    @abstractmethod
+    def get_logs(
+        self,
+        from_block: int = 0,
+        to_block: Optional[int] = None,
+        topics: Optional[List] = None
+    ) -> List[EventLog]:
+        ...
+
+    @abstractmethod
+    def get_block_timestamp(self) -> int:
+        """Timestamp corrente del ledger (secondi)"""
+
+    def close(self):
+        """Rilascia thread e risorse del backend"""
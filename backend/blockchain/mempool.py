@@ -0,0 +1,151 @@
+"""
+Mempool - Coda limitata delle transazioni pending ordinata per gas price
+"""
+import heapq
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+from blockchain.tx_record import TxRecord
+
+
+class Mempool:
+    """
+    Mempool con priorità per gas price, aging e capacità massima
+
+    - Selezione: max-heap sul gas price "invecchiato" = gas_price + aging_rate
+      per ogni blocco di attesa. L'ordine relativo non cambia nel tempo, quindi
+      la chiave è statica: gas_price - aging_rate * blocco di arrivo.
+      Una tx a prezzo basso prima o poi supera quelle nuove e non resta ferma per sempre.
+    - Eviction: min-heap sul gas price puro; a mempool piena esce la tx
+      col prezzo più basso (la più recente a parità di prezzo).
+
+    - Tx di sistema (quelle del gioco, emesse dopo che il contratto ha già
+      cambiato stato): non vengono mai rifiutate né espulse. A mempool piena
+      espellono la tx esterna meno pagata o, se non ce ne sono, entrano oltre
+      la capacità.
+
+    Entrambi gli heap usano cancellazione lazy: le voci di tx già uscite
+    vengono scartate quando affiorano.
+    """
+
+    def __init__(self, max_size: int = 10000, aging_rate: int = 1):
+        self.max_size = max_size
+        self.aging_rate = aging_rate
+
+        self._entries: Dict[str, Tuple[int, TxRecord]] = {}  # tx_hash -> (seq, tx)
+        self._select_heap: List[Tuple[int, int, str]] = []
+        self._evict_heap: List[Tuple[int, int, str]] = []
+        self._sequence = itertools.count()
+        self.total_gas = 0  # Gas di tutte le tx pending
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __bool__(self) -> bool:
+        return bool(self._entries)
+
+    def __contains__(self, tx_hash: str) -> bool:
+        return tx_hash in self._entries
+
+    def add(self, tx: TxRecord, arrival_block: int, system: bool = False) -> Optional[TxRecord]:
+        """
+        Ammette una tx, eventualmente espellendo la meno pagata
+
+        Returns:
+            La tx espulsa per fare spazio, se c'è stata
+
+        Raises:
+            ValueError: se la mempool è piena e la tx (non di sistema) non paga
+                più della peggiore
+        """
+        evicted = None
+        if len(self._entries) >= self.max_size:
+            lowest = self._peek_lowest()
+            if lowest is not None and (system or tx.gas_price > lowest.gas_price):
+                evicted = self.remove(lowest.tx_hash)
+            elif not system:
+                raise ValueError("Mempool full: gas price too low")
+
+        seq = next(self._sequence)
+        self._entries[tx.tx_hash] = (seq, tx)
+        self.total_gas += tx.gas_used
+        priority = tx.gas_price - self.aging_rate * arrival_block
+        heapq.heappush(self._select_heap, (-priority, seq, tx.tx_hash))
+        if not system:
+            heapq.heappush(self._evict_heap, (tx.gas_price, -seq, tx.tx_hash))
+        return evicted
+
+    def remove(self, tx_hash: str) -> Optional[TxRecord]:
+        entry = self._entries.pop(tx_hash, None)
+        if entry is None:
+            return None
+        self.total_gas -= entry[1].gas_used
+        self._maybe_compact()
+        return entry[1]
+
+    def _is_live(self, seq: int, tx_hash: str) -> bool:
+        entry = self._entries.get(tx_hash)
+        return entry is not None and entry[0] == seq
+
+    def _peek_lowest(self) -> Optional[TxRecord]:
+        while self._evict_heap:
+            _, neg_seq, tx_hash = self._evict_heap[0]
+            if self._is_live(-neg_seq, tx_hash):
+                return self._entries[tx_hash][1]
+            heapq.heappop(self._evict_heap)
+        return None
+
+    def pop_block(
+        self,
+        gas_limit: int,
+        max_txs: Optional[int] = None,
+        max_skipped: int = 16
+    ) -> List[TxRecord]:
+        """
+        Estrae le tx a priorità più alta che stanno nel gas limit del blocco
+
+        Le tx che non entrano nel gas residuo restano in mempool; dopo
+        `max_skipped` tentativi falliti il blocco si considera pieno.
+        """
+        selected: List[TxRecord] = []
+        skipped: List[Tuple[int, int, str]] = []
+        gas_left = gas_limit
+
+        while self._select_heap and (max_txs is None or len(selected) < max_txs):
+            item = heapq.heappop(self._select_heap)
+            _, seq, tx_hash = item
+            if not self._is_live(seq, tx_hash):
+                continue
+
+            tx = self._entries[tx_hash][1]
+            if tx.gas_used > gas_left:
+                skipped.append(item)
+                if len(skipped) >= max_skipped:
+                    break
+                continue
+
+            del self._entries[tx_hash]
+            selected.append(tx)
+            gas_left -= tx.gas_used
+            self.total_gas -= tx.gas_used
+
+        for item in skipped:
+            heapq.heappush(self._select_heap, item)
+
+        self._maybe_compact()
+        return selected
+
+    def ordered(self) -> List[TxRecord]:
+        """Tx pending nell'ordine in cui verrebbero incluse"""
+        live = [item for item in self._select_heap if self._is_live(item[1], item[2])]
+        return [self._entries[tx_hash][1] for _, _, tx_hash in sorted(live)]
+
+    def _maybe_compact(self):
+        """Ricostruisce gli heap quando le voci morte superano quelle vive"""
+        limit = 2 * len(self._entries) + 64
+        if len(self._select_heap) > limit:
+            self._select_heap = [i for i in self._select_heap if self._is_live(i[1], i[2])]
+            heapq.heapify(self._select_heap)
+        if len(self._evict_heap) > limit:
+            self._evict_heap = [i for i in self._evict_heap if self._is_live(-i[1], i[2])]
+            heapq.heapify(self._evict_heap)
@@ -0,0 +1,123 @@
+"""
+Merkle Tree - Impegno crittografico sulle transazioni di un blocco
+Permette di provare l'inclusione di una tx con O(log n) hash
+"""
+import hashlib
+from typing import Iterable, List
+
+# Prefissi di dominio per distinguere foglie e nodi interni (evita second preimage)
+_LEAF_PREFIX = b"\x00"
+_NODE_PREFIX = b"\x01"
+
+
+def _hash_leaf(tx_hash: str) -> bytes:
+    digits = tx_hash[2:] if tx_hash.startswith("0x") else tx_hash
+    return hashlib.sha256(_LEAF_PREFIX + bytes.fromhex(digits)).digest()
+
+
+def _hash_node(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(_NODE_PREFIX + left + right).digest()
+
+
+EMPTY_ROOT = "0x" + hashlib.sha256(b"").hexdigest()
+
+
+class MerkleTree:
+    """
+    Merkle tree costruito in modo incrementale
+
+    Ogni `append` aggiorna solo il cammino foglia -> radice (O(log n)).
+    Un nodo senza fratello sale invariato al livello superiore: accoppiarlo
+    con se stesso darebbe a [a, b, c] la stessa radice di [a, b, c, c]
+    (CVE-2012-2459).
+    """
+
+    def __init__(self, tx_hashes: Iterable[str] = ()):
+        self.levels: List[List[bytes]] = [[]]
+        for tx_hash in tx_hashes:
+            self.append(tx_hash)
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    def append(self, tx_hash: str):
+        """Aggiunge una foglia e ricalcola il cammino verso la radice"""
+        self.levels[0].append(_hash_leaf(tx_hash))
+
+        index = len(self.levels[0]) - 1
+        level = 0
+        while len(self.levels[level]) > 1:
+            nodes = self.levels[level]
+            parent_index = index // 2
+            left = nodes[parent_index * 2]
+            if parent_index * 2 + 1 < len(nodes):
+                parent = _hash_node(left, nodes[parent_index * 2 + 1])
+            else:
+                parent = left  # Senza fratello: promosso
+
+            if level + 1 == len(self.levels):
+                self.levels.append([])
+            parents = self.levels[level + 1]
+            if parent_index < len(parents):
+                parents[parent_index] = parent
+            else:
+                parents.append(parent)
+
+            index = parent_index
+            level += 1
+
+    @property
+    def root(self) -> str:
+        """Radice del tree (hex con 0x)"""
+        if not self.levels[0]:
+            return EMPTY_ROOT
+        return "0x" + self.levels[-1][0].hex()
+
+    def get_proof(self, index: int) -> List[str]:
+        """
+        Fratelli dal livello foglia fino alla radice per la foglia `index`
+
+        La direzione (sinistra/destra) di ogni passo si ricava dai bit di `index`;
+        i livelli in cui il nodo sale senza fratello non hanno voce.
+        """
+        if not 0 <= index < len(self.levels[0]):
+            raise IndexError("Leaf index out of range")
+
+        proof = []
+        for nodes in self.levels[:-1]:
+            sibling_index = index ^ 1
+            if sibling_index < len(nodes):
+                proof.append("0x" + nodes[sibling_index].hex())
+            index //= 2
+        return proof
+
+
+def verify_inclusion_proof(
+    tx_hash: str,
+    index: int,
+    leaf_count: int,
+    proof: List[str],
+    merkle_root: str
+) -> bool:
+    """Verifica che `tx_hash` sia la foglia `index` dei `leaf_count` del tree con radice `merkle_root`"""
+    if not 0 <= index < leaf_count:
+        return False
+
+    node = _hash_leaf(tx_hash)
+    siblings = iter(proof)
+    width = leaf_count
+    while width > 1:
+        if index % 2 == 1:
+            sibling = next(siblings, None)
+            if sibling is None:
+                return False
+            node = _hash_node(bytes.fromhex(sibling[2:]), node)
+        elif index + 1 < width:
+            sibling = next(siblings, None)
+            if sibling is None:
+                return False
+            node = _hash_node(node, bytes.fromhex(sibling[2:]))
+        # Ultimo nodo di un livello dispari: sale senza fratello
+        index //= 2
+        width = (width + 1) // 2
+    return next(siblings, None) is None and "0x" + node.hex() == merkle_root
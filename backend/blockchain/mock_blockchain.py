@@ -3,117 +3,708 @@ Mock Blockchain - Simula una blockchain Ethereum/L2
 Tiene traccia di blocchi, transazioni e stato
 """
 import hashlib
-import time
+import itertools
+import threading
+from concurrent.futures import Future
 from datetime import datetime
-from typing import Dict, List, Optional
-from models.game_models import Transaction
+from typing import Callable, Dict, List, Optional, Tuple
+from models.game_models import Transaction, TransactionReceipt, InclusionProof, EventLog
+from blockchain.merkle import MerkleTree
+from blockchain.bloom import LogBloom, bloom_mask
+from blockchain.mempool import Mempool
+from blockchain.tx_record import TxRecord
+from blockchain.ledger import LedgerBackend, estimate_gas
+from utils.clock import Clock, get_clock
+
+# Posizione dei topic negli EventLog (come i topic indicizzati di eth_getLogs)
+LOG_TOPICS = ("function_name", "game_id", "player")
 
 
 class Block:
-    def __init__(self, block_number: int, previous_hash: str, transactions: List[Transaction]):
+    def __init__(
+        self,
+        block_number: int,
+        previous_hash: str,
+        transactions: List[TxRecord],
+        timestamp: Optional[datetime] = None
+    ):
         self.block_number = block_number
-        self.timestamp = datetime.now()
+        self.timestamp = timestamp or get_clock().now()
         self.transactions = transactions
         self.previous_hash = previous_hash
         self.nonce = 0
+        self._merkle_tree = MerkleTree(tx.tx_hash for tx in transactions)
+        self.merkle_root = self._merkle_tree.root
         self.hash = self._calculate_hash()
+        self._index_transactions()
+
+    @classmethod
+    def restore(
+        cls,
+        block_number: int,
+        previous_hash: str,
+        transactions: List[TxRecord],
+        timestamp: datetime,
+        nonce: int,
+        block_hash: str,
+        merkle_root: str
+    ) -> "Block":
+        """Ricostruisce un blocco salvato senza ricalcolarne timestamp e hash"""
+        block = cls.__new__(cls)
+        block.block_number = block_number
+        block.timestamp = timestamp
+        block.transactions = transactions
+        block.previous_hash = previous_hash
+        block.nonce = nonce
+        block.hash = block_hash
+        block.merkle_root = merkle_root
+        block._merkle_tree = None  # Ricostruito solo se serve una proof
+        block._index_transactions()
+        return block
+
+    @property
+    def merkle_tree(self) -> MerkleTree:
+        if self._merkle_tree is None:
+            self._merkle_tree = MerkleTree(tx.tx_hash for tx in self.transactions)
+        return self._merkle_tree
+
+    def _index_transactions(self):
+        """Gas cumulativo per posizione (per le ricevute) e bloom dei topic"""
+        self.cumulative_gas: List[int] = []
+        self.logs_bloom = LogBloom()
+        total = 0
+        for tx in self.transactions:
+            total += tx.gas_used
+            self.cumulative_gas.append(total)
+            self.logs_bloom.add_all(tx.topics)
 
     def _calculate_hash(self) -> str:
-        data = f"{self.block_number}{self.timestamp}{len(self.transactions)}{self.previous_hash}{self.nonce}"
+        data = (
+            f"{self.block_number}{self.timestamp}{len(self.transactions)}"
+            f"{self.merkle_root}{self.previous_hash}{self.nonce}"
+        )
         return hashlib.sha256(data.encode()).hexdigest()
 
 
-class MockBlockchain:
+class BlockHeader:
+    """Header di un blocco potato: resta residente al posto del blocco completo"""
+
+    __slots__ = (
+        "block_number", "hash", "previous_hash", "merkle_root",
+        "timestamp", "tx_count", "logs_bloom"
+    )
+
+    def __init__(self, block: Block):
+        self.block_number = block.block_number
+        self.hash = block.hash
+        self.previous_hash = block.previous_hash
+        self.merkle_root = block.merkle_root
+        self.timestamp = block.timestamp
+        self.tx_count = len(block.transactions)
+        self.logs_bloom = block.logs_bloom
+
+    def to_dict(self) -> Dict:
+        return {
+            "block_number": self.block_number,
+            "hash": self.hash,
+            "previous_hash": self.previous_hash,
+            "merkle_root": self.merkle_root,
+            "timestamp": self.timestamp.isoformat(),
+            "tx_count": self.tx_count
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "BlockHeader":
+        """Header riletto da headers.jsonl (senza bloom: get_logs decodifica il blocco)"""
+        header = cls.__new__(cls)
+        header.block_number = data["block_number"]
+        header.hash = data["hash"]
+        header.previous_hash = data["previous_hash"]
+        header.merkle_root = data["merkle_root"]
+        header.timestamp = datetime.fromisoformat(data["timestamp"])
+        header.tx_count = data["tx_count"]
+        header.logs_bloom = None
+        return header
+
+
+class MockBlockchain(LedgerBackend):
     """Simula una blockchain per la demo"""
 
-    def __init__(self):
-        self.chain: List[Block] = []
-        self.pending_transactions: List[Transaction] = []
+    # Stima dell'occupazione in memoria di una tx residente (per il budget)
+    ESTIMATED_TX_BYTES = 750
+
+    def __init__(
+        self,
+        block_interval: Optional[float] = None,
+        max_block_txs: int = 500,
+        mining_delay: float = 0.1,
+        block_gas_limit: int = 30_000_000,
+        mempool_size: int = 10000,
+        store=None,
+        prune_depth: Optional[int] = None,
+        memory_budget_bytes: Optional[int] = None,
+        archive=None,
+        clock: Optional[Clock] = None
+    ):
+        """
+        Args:
+            block_interval: Se impostato, avvia il block producer in background
+                che sigilla un blocco ogni `block_interval` secondi
+            max_block_txs: Numero di tx pending che forza la chiusura anticipata del blocco
+            mining_delay: Tempo di mining simulato per `mine_block()` sincrono
+            block_gas_limit: Gas massimo delle tx incluse in un blocco
+            mempool_size: Numero massimo di tx pending (oltre si espelle la meno pagata)
+            store: BlockStore opzionale; se presente la chain sopravvive ai riavvii
+            prune_depth: Se impostato, solo gli ultimi `prune_depth` blocchi restano
+                completi in memoria; i più vecchi restano come header
+            memory_budget_bytes: Budget stimato per le tx residenti; se superato
+                si pota anche dentro la finestra di `prune_depth`
+            archive: ChainArchive dove finiscono i blocchi potati se manca lo store
+            clock: Clock per timestamp e mining simulato (default: clock globale)
+
+        Raises:
+            ValueError: se prune_depth è impostato senza store né archivio
+                (i blocchi potati non sarebbero più leggibili)
+        """
+        if prune_depth is not None and store is None and archive is None:
+            raise ValueError("Pruning requires a block store or a chain archive (CHAIN_DATA_DIR or CHAIN_ARCHIVE_DIR)")
+
+        self.clock = clock or get_clock()
+        self.store = store
+        self.chain: List[Block] = []  # Blocchi residenti, chain[i] = blocco chain_base + i
+        self.chain_base = 0
+        self.mempool = Mempool(max_size=mempool_size)
         self.current_block_number = 0
         self.gas_price = 20  # Gwei simulato
+        self.block_gas_limit = block_gas_limit
+        self.max_block_txs = max_block_txs
+        self.mining_delay = mining_delay
+
+        self._tx_nonce = itertools.count()  # Rende unici gli hash anche a tempo fermo
 
-        # Genesis block
-        genesis = Block(0, "0x0", [])
-        self.chain.append(genesis)
-        self.current_block_number = 1
+        # Stato condiviso tra chiamanti e block producer
+        self._lock = threading.RLock()
+        self._pending_changed = threading.Condition(self._lock)
+        self._inclusion_futures: Dict[str, Future] = {}
+        self._producer_thread: Optional[threading.Thread] = None
+        self._producer_stop = threading.Event()
+        self.block_interval: Optional[float] = None
+
+        # Indice tx_hash -> (block_number, posizione nel blocco), aggiornato al mining
+        self._tx_index: Dict[str, Tuple[int, int]] = {}
+
+        # Pruning: header dei blocchi potati, precedono chain_base
+        self.prune_depth = prune_depth
+        self.memory_budget_bytes = memory_budget_bytes
+        self.archive = archive
+        self.headers: List[BlockHeader] = []
+        self.prune_listeners: List[Callable[[int], None]] = []
+        self._pruned_below: Optional[int] = None  # Pruning da notificare fuori dal lock
+        self._resident_txs = 0
+
+        if store is not None and store.height > 0:
+            # Riavvio: solo il blocco di testa torna in memoria, il resto resta su disco
+            tip = store.read_block(store.height - 1)
+            self.chain.append(tip)
+            self.chain_base = tip.block_number
+            self.current_block_number = store.height
+            self._resident_txs = len(tip.transactions)
+        elif store is None and archive is not None and archive.height > 0:
+            # Riavvio dall'archivio: l'ultimo blocco archiviato torna testa della chain
+            # (non viene riarchiviato), i precedenti restano header
+            self.headers = archive.load_header_chain()[:-1]
+            tip = archive.read_block(archive.height - 1)
+            self.chain.append(tip)
+            self.chain_base = tip.block_number
+            self.current_block_number = archive.height
+            self._resident_txs = len(tip.transactions)
+        else:
+            # Genesis block
+            genesis = Block(0, "0x0", [], self.clock.now())
+            self.chain.append(genesis)
+            self.current_block_number = 1
+            if store is not None:
+                store.append_block(genesis)
+
+        if block_interval:
+            self.start_block_producer(block_interval, max_block_txs)
 
     def create_transaction(
         self,
         from_address: str,
         function_name: str,
         params: Dict,
-        to_address: Optional[str] = None
-    ) -> Transaction:
-        """Crea una nuova transazione simulata"""
-        tx_data = f"{from_address}{function_name}{str(params)}{time.time()}"
-        tx_hash = "0x" + hashlib.sha256(tx_data.encode()).hexdigest()
+        to_address: Optional[str] = None,
+        gas_price: Optional[int] = None,
+        system: bool = False
+    ) -> TxRecord:
+        """
+        Crea una nuova transazione simulata e la mette in mempool
 
-        # Gas simulato basato sulla complessità
-        gas_used = self._estimate_gas(function_name)
+        Le tx `system` (del gioco) non vengono mai rifiutate dalla mempool.
 
-        tx = Transaction(
-            tx_hash=tx_hash,
+        La tx resta un TxRecord interno; il modello pydantic si ottiene
+        con `get_transaction()` o `TxRecord.to_model()`.
+
+        Raises:
+            ValueError: se la tx supera il gas limit del blocco o la mempool
+                è piena di tx che pagano di più
+        """
+        # Hash sulla codifica canonica; il nonce lo rende unico anche a tempo fermo
+        tx = TxRecord.create(
             from_address=from_address,
-            to_address=to_address or "0xContract",
             function_name=function_name,
             params=params,
-            gas_used=gas_used,
-            block_number=self.current_block_number,
-            timestamp=datetime.now(),
-            status="success"
+            to_address=to_address or "0xContract",
+            gas_used=self._estimate_gas(function_name),
+            gas_price=gas_price if gas_price is not None else self.gas_price,
+            timestamp=self.clock.time(),
+            nonce=next(self._tx_nonce)
         )
+        return self.submit_transaction(tx, system=system)
+
+    def submit_transaction(self, tx: TxRecord, system: bool = False) -> TxRecord:
+        """
+        Mette in mempool una tx già costruita (anche firmata da un client remoto)
+
+        Raises:
+            ValueError: se la tx supera il gas limit del blocco o la mempool
+                è piena di tx che pagano di più
+        """
+        if tx.gas_used > self.block_gas_limit:
+            raise ValueError("Transaction exceeds block gas limit")
+
+        with self._lock:
+            tx.block_number = self.current_block_number
+            evicted = self.mempool.add(tx, self.current_block_number, system=system)
+            if evicted is not None:
+                future = self._inclusion_futures.pop(evicted.tx_hash, None)
+                if future is not None:
+                    future.set_exception(ValueError("Transaction evicted from mempool"))
+
+            # Blocco pieno: sveglia il producer senza aspettare l'intervallo
+            if self._block_full():
+                self._pending_changed.notify()
 
-        self.pending_transactions.append(tx)
         return tx
 
     def mine_block(self) -> Block:
         """Mina un nuovo blocco con le transazioni pending"""
-        if not self.pending_transactions:
-            # Blocco vuoto
-            pass
+        # Simula mining time (fuori dal lock per non bloccare create_transaction)
+        if self.mining_delay:
+            self.clock.sleep(self.mining_delay)
+
+        with self._lock:
+            block = self._seal_pending()
+        self._notify_pruned()
+        return block
+
+    @property
+    def pending_count(self) -> int:
+        return len(self.mempool)
+
+    @property
+    def pending_transactions(self) -> List[TxRecord]:
+        """Tx in mempool nell'ordine di inclusione"""
+        with self._lock:
+            return self.mempool.ordered()
+
+    def _block_full(self) -> bool:
+        return len(self.mempool) >= self.max_block_txs or self.mempool.total_gas >= self.block_gas_limit
+
+    def _seal_pending(self, max_txs: Optional[int] = None) -> Block:
+        """Sigilla le tx pending in un nuovo blocco (da chiamare con il lock)"""
+        included = self.mempool.pop_block(self.block_gas_limit, max_txs)
+        for tx in included:
+            tx.block_number = self.current_block_number
 
         previous_hash = self.chain[-1].hash
         block = Block(
             self.current_block_number,
             previous_hash,
-            self.pending_transactions.copy()
+            included,
+            self.clock.now()
         )
 
-        # Simula mining time
-        time.sleep(0.1)
+        if self.store is not None:
+            self.store.append_block(block)
 
         self.chain.append(block)
-        self.pending_transactions = []
         self.current_block_number += 1
 
+        for offset, tx in enumerate(block.transactions):
+            self._tx_index[tx.tx_hash] = (block.block_number, offset)
+        self._resident_txs += len(block.transactions)
+
+        # Risolvi le attese di inclusione (solo quelle richieste)
+        if self._inclusion_futures:
+            for tx in block.transactions:
+                future = self._inclusion_futures.pop(tx.tx_hash, None)
+                if future is not None:
+                    future.set_result(self.get_receipt(tx.tx_hash))
+
+        if self._should_prune():
+            self._prune()
+
         return block
 
+    # ==================== PRUNING ====================
+
+    @property
+    def resident_bytes(self) -> int:
+        """Stima della memoria occupata dalle tx dei blocchi residenti"""
+        return self._resident_txs * self.ESTIMATED_TX_BYTES
+
+    def _should_prune(self) -> bool:
+        if self.prune_depth is None:
+            return False
+        # Pota a lotti per non riscrivere archivio e snapshot a ogni blocco
+        batch = max(1, self.prune_depth // 10)
+        if len(self.chain) > self.prune_depth + batch:
+            return True
+        return (
+            self.memory_budget_bytes is not None and
+            self.resident_bytes > self.memory_budget_bytes and
+            len(self.chain) > 1
+        )
+
+    def prune(self, keep_blocks: Optional[int] = None) -> int:
+        """
+        Sposta fuori dalla memoria i blocchi più vecchi della finestra recente
+
+        I blocchi potati restano leggibili dallo store o dall'archivio, in memoria
+        resta solo il loro header. I listener ricevono il primo blocco ancora residente.
+
+        Returns:
+            Numero di blocchi potati
+        """
+        with self._lock:
+            cut = self._prune(keep_blocks)
+        self._notify_pruned()
+        return cut
+
+    def _prune(self, keep_blocks: Optional[int] = None) -> int:
+        """Pota sotto il lock; i listener li chiama _notify_pruned dopo il rilascio"""
+        with self._lock:
+            keep = keep_blocks if keep_blocks is not None else (self.prune_depth or len(self.chain))
+            cut = max(0, len(self.chain) - max(1, keep))
+
+            # Con budget superato si pota anche dentro la finestra (resta sempre la testa)
+            if self.memory_budget_bytes is not None:
+                remaining = self._resident_txs - sum(len(b.transactions) for b in self.chain[:cut])
+                while cut < len(self.chain) - 1 and remaining * self.ESTIMATED_TX_BYTES > self.memory_budget_bytes:
+                    remaining -= len(self.chain[cut].transactions)
+                    cut += 1
+
+            if cut == 0:
+                return 0
+
+            pruned = self.chain[:cut]
+            if self.store is None and self.archive is not None:
+                # La testa ripristinata da un riavvio è già nell'archivio
+                self.archive.archive_blocks([b for b in pruned if b.block_number >= self.archive.height])
+
+            for block in pruned:
+                self.headers.append(BlockHeader(block))
+                for tx in block.transactions:
+                    self._tx_index.pop(tx.tx_hash, None)
+                self._resident_txs -= len(block.transactions)
+
+            self.chain = self.chain[cut:]
+            self.chain_base += cut
+            self._pruned_below = self.chain_base
+
+            return cut
+
+    def _notify_pruned(self):
+        """
+        Notifica ai listener l'ultimo pruning, senza il lock della chain
+
+        I listener scrivono file e prendono i lock dei giochi, che nell'ordine
+        dei lock vengono prima della chain.
+        """
+        with self._lock:
+            pruned_below, self._pruned_below = self._pruned_below, None
+        if pruned_below is not None:
+            for listener in self.prune_listeners:
+                listener(pruned_below)
+
+    # ==================== BLOCK PRODUCER ====================
+
+    @property
+    def producer_running(self) -> bool:
+        """True se i blocchi vengono prodotti in background"""
+        return self._producer_thread is not None and self._producer_thread.is_alive()
+
+    def start_block_producer(self, block_interval: float = 1.0, max_block_txs: Optional[int] = None):
+        """
+        Avvia la produzione di blocchi in background
+
+        Un blocco viene sigillato ogni `block_interval` secondi oppure appena
+        le tx pending raggiungono `max_block_txs`. I chiamanti non aspettano il
+        mining: usano `inclusion_future()` se serve sapere in che blocco è finita la tx.
+        """
+        if self.producer_running:
+            return
+
+        self.block_interval = block_interval
+        if max_block_txs is not None:
+            self.max_block_txs = max_block_txs
+
+        self._producer_stop.clear()
+        self._producer_thread = threading.Thread(
+            target=self._produce_blocks,
+            name="block-producer",
+            daemon=True
+        )
+        self._producer_thread.start()
+
+    def stop_block_producer(self):
+        """Ferma il block producer sigillando le tx rimaste pending"""
+        if not self.producer_running:
+            return
+
+        with self._lock:
+            self._producer_stop.set()
+            self._pending_changed.notify()
+        self._producer_thread.join()
+        self._producer_thread = None
+
+        with self._lock:
+            while self.mempool:
+                self._seal_pending(self.max_block_txs)
+        self._notify_pruned()
+
+    def _produce_blocks(self):
+        """Loop del block producer"""
+        while not self._producer_stop.is_set():
+            with self._pending_changed:
+                # Intervallo sul clock della chain (virtuale nei test)
+                self.clock.wait_for(
+                    self._pending_changed,
+                    lambda: self._producer_stop.is_set() or self._block_full(),
+                    self.block_interval
+                )
+                if self._producer_stop.is_set():
+                    break
+                if self.mempool:
+                    self._seal_pending(self.max_block_txs)
+            self._notify_pruned()
+
+    def inclusion_future(self, tx_hash: str) -> Optional[Future]:
+        """
+        Future che si risolve con la TransactionReceipt della tx
+
+        Per tx già minate ritorna un future già risolto, None se la tx è sconosciuta.
+        I future delle tx pending nascono solo quando qualcuno li chiede.
+        """
+        with self._lock:
+            future = self._inclusion_futures.get(tx_hash)
+            if future is None:
+                if tx_hash in self.mempool:
+                    future = self._inclusion_futures[tx_hash] = Future()
+                else:
+                    receipt = self.get_receipt(tx_hash)
+                    if receipt is not None:
+                        future = Future()
+                        future.set_result(receipt)
+            return future
+
+    def close(self):
+        """Ferma il block producer e chiude lo storage su disco"""
+        self.stop_block_producer()
+        if self.store is not None:
+            self.store.close()
+        if self.archive is not None:
+            self.archive.close()
+
+    # ==================== QUERY ====================
+
+    def get_block(self, block_number: int) -> Optional[Block]:
+        """Recupera un blocco dal suo numero (dalla memoria, dallo store o dall'archivio)"""
+        with self._lock:
+            position = block_number - self.chain_base
+            if 0 <= position < len(self.chain):
+                return self.chain[position]
+        if self.store is not None:
+            return self.store.read_block(block_number)
+        if self.archive is not None:
+            return self.archive.read_block(block_number)
+        return None
+
+    def get_header(self, block_number: int) -> Optional[BlockHeader]:
+        """Header di un blocco, anche se potato"""
+        with self._lock:
+            position = block_number - (self.chain_base - len(self.headers))
+            if 0 <= position < len(self.headers):
+                return self.headers[position]
+        block = self.get_block(block_number)
+        return BlockHeader(block) if block else None
+
+    def _locate(self, tx_hash: str) -> Optional[Tuple[int, int]]:
+        """
+        (block_number, posizione) di una tx minata
+
+        Le tx dei blocchi potati si trovano tramite l'indice del BlockStore
+        o, senza store, quello dell'archivio
+        """
+        location = self._tx_index.get(tx_hash)
+        if location is None:
+            if self.store is not None:
+                location = self.store.find_transaction(tx_hash)
+            elif self.archive is not None:
+                location = self.archive.find_transaction(tx_hash)
+        return location
+
+    def _find(self, tx_hash: str) -> Optional[Tuple[Block, int]]:
+        """(blocco, posizione) di una tx minata, verificata sul blocco letto"""
+        location = self._locate(tx_hash)
+        if location is None:
+            return None
+        block_number, offset = location
+        block = self.get_block(block_number)
+        # Blocco non più leggibile o prefisso dell'indice dell'archivio di un'altra tx
+        if block is None or offset >= len(block.transactions) or block.transactions[offset].tx_hash != tx_hash:
+            return None
+        return block, offset
+
+    def is_resident(self, tx_hash: str) -> bool:
+        """True se la tx è pending o in un blocco ancora in memoria"""
+        with self._lock:
+            return tx_hash in self._tx_index or tx_hash in self.mempool
+
     def get_transaction(self, tx_hash: str) -> Optional[Transaction]:
-        """Recupera una transazione dal suo hash"""
-        for block in self.chain:
-            for tx in block.transactions:
-                if tx.tx_hash == tx_hash:
-                    return tx
+        """Recupera una transazione minata dal suo hash (modello API)"""
+        found = self._find(tx_hash)
+        if found is None:
+            return None
+        block, offset = found
+        return block.transactions[offset].to_model()
+
+    def get_receipt(self, tx_hash: str) -> Optional[TransactionReceipt]:
+        """
+        Ricevuta di una transazione minata (None se pending o sconosciuta)
+        """
+        found = self._find(tx_hash)
+        if found is None:
+            return None
+        block, offset = found
+        tx = block.transactions[offset]
+
+        return TransactionReceipt(
+            tx_hash=tx.tx_hash,
+            block_number=block.block_number,
+            block_hash=block.hash,
+            transaction_index=offset,
+            gas_used=tx.gas_used,
+            cumulative_gas_used=block.cumulative_gas[offset],
+            status=tx.status
+        )
+
+    def get_inclusion_proof(self, tx_hash: str) -> Optional[InclusionProof]:
+        """
+        Merkle proof O(log n) che la tx è inclusa nel suo blocco
+
+        Si verifica con `blockchain.merkle.verify_inclusion_proof` senza scaricare il blocco.
+        """
+        found = self._find(tx_hash)
+        if found is None:
+            return None
+        block, offset = found
+
+        return InclusionProof(
+            tx_hash=tx_hash,
+            block_number=block.block_number,
+            block_hash=block.hash,
+            merkle_root=block.merkle_root,
+            transaction_index=offset,
+            transaction_count=len(block.transactions),
+            proof=block.merkle_tree.get_proof(offset)
+        )
+
+    def _get_bloom(self, block_number: int) -> Optional[LogBloom]:
+        """Bloom di un blocco senza decodificarlo (None se non disponibile)"""
+        with self._lock:
+            position = block_number - self.chain_base
+            if 0 <= position < len(self.chain):
+                return self.chain[position].logs_bloom
+            position = block_number - (self.chain_base - len(self.headers))
+            if 0 <= position < len(self.headers):
+                return self.headers[position].logs_bloom
+        if self.store is not None:
+            return self.store.read_bloom(block_number)
         return None
 
+    def get_logs(
+        self,
+        from_block: int = 0,
+        to_block: Optional[int] = None,
+        topics: Optional[List] = None
+    ) -> List[EventLog]:
+        """
+        Cerca gli EventLog in un range di blocchi (come eth_getLogs)
+
+        Args:
+            from_block: Primo blocco (incluso)
+            to_block: Ultimo blocco (incluso), default l'ultimo minato
+            topics: Filtri posizionali [function_name, game_id, player];
+                ogni posizione è None (qualsiasi), un valore o una lista di alternative
+
+        I blocchi il cui bloom esclude i topic vengono saltati senza decodificarli.
+        """
+        if to_block is None:
+            to_block = self.current_block_number - 1
+
+        # Normalizza i filtri: per posizione un set di alternative (None = qualsiasi)
+        filters = []
+        for topic in (topics or [])[:len(LOG_TOPICS)]:
+            if topic is None:
+                filters.append(None)
+            elif isinstance(topic, (list, tuple, set)):
+                filters.append(set(topic))
+            else:
+                filters.append({topic})
+        masks = [
+            [bloom_mask(value) for value in alternatives]
+            for alternatives in filters if alternatives
+        ]
+
+        results = []
+        for block_number in range(max(0, from_block), to_block + 1):
+            bloom = self._get_bloom(block_number)
+            if bloom is not None and not all(
+                any(bloom.might_contain_mask(mask) for mask in alternatives)
+                for alternatives in masks
+            ):
+                continue
+
+            block = self.get_block(block_number)
+            if block is None:
+                continue
+
+            # Un log per tx: il modello si costruisce solo per i match
+            for log_index, tx in enumerate(block.transactions):
+                topics = tx.topics
+                if all(
+                    alternatives is None or topics[position] in alternatives
+                    for position, alternatives in enumerate(filters)
+                ):
+                    log = tx.event_logs()[0]
+                    log.tx_hash = tx.tx_hash
+                    log.block_number = block_number
+                    log.log_index = log_index
+                    results.append(log)
+
+        return results
+
     def get_latest_block(self) -> Block:
         """Ritorna l'ultimo blocco"""
         return self.chain[-1]
 
     def _estimate_gas(self, function_name: str) -> int:
         """Stima il gas in base alla funzione"""
-        gas_costs = {
-            "register": 50000,
-            "requestRandomness": 100000,
-            "submitCommitment": 150000,
-            "generateFunction": 80000,
-            "requestVariation": 30000,
-            "submitFinalChoice": 200000,  # ZK verification costa tanto
-            "determineWinner": 60000,
-            "distributeRewards": 80000
-        }
-        return gas_costs.get(function_name, 21000)
+        return estimate_gas(function_name)
 
     def get_block_timestamp(self) -> int:
         """Ritorna timestamp blockchain corrente"""
-        return int(time.time())
+        return int(self.clock.time())
@@ -0,0 +1,299 @@
+"""
+JSON-RPC Ledger - Client HTTP di un nodo in stile XRPL
+
+- Connection pooling: connessioni HTTP/1.1 keep-alive riusate tra le chiamate
+- Batching: più richieste in un unico POST (array JSON)
+- Submission pipelined: create_transaction firma la tx in locale (l'hash è
+  subito noto) e la accoda; i sender in background la inviano in batch
+  mentre il chiamante prosegue. Il rifiuto di una tx arriva solo a chi l'ha
+  creata, tramite il Future in `tx.submission`.
+
+Il server di riferimento è blockchain.rpc_server (stand-in locale).
+"""
+import http.client
+import itertools
+import json
+import queue
+import secrets
+import threading
+from concurrent.futures import Future, wait
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from models.game_models import Transaction, TransactionReceipt, InclusionProof, EventLog
+from blockchain.block_store import decode_block
+from blockchain.ledger import LedgerBackend, estimate_gas
+from blockchain.tx_record import TxRecord
+from utils.clock import Clock, get_clock
+
+
+class LedgerRPCError(ValueError):
+    """Errore ritornato dal nodo (status "error" nella risposta)"""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(f"{code}: {message}")
+        self.code = code
+
+
+class JsonRpcLedger(LedgerBackend):
+    """LedgerBackend che parla JSON-RPC con un nodo remoto"""
+
+    def __init__(
+        self,
+        url: str,
+        pool_size: int = 4,
+        batch_size: int = 100,
+        pipeline: bool = True,
+        timeout: float = 10.0,
+        gas_price: int = 20,
+        block_gas_limit: int = 30_000_000,
+        clock: Optional[Clock] = None
+    ):
+        """
+        Args:
+            url: Endpoint del nodo (es. http://127.0.0.1:5005/)
+            pool_size: Connessioni keep-alive (e sender in parallelo)
+            batch_size: Richieste massime per POST
+            pipeline: Se False ogni submit aspetta la risposta del nodo
+            timeout: Timeout per richiesta (secondi)
+            gas_price: Gas price di default delle tx
+            block_gas_limit: Gas limit controllato prima dell'invio
+            clock: Clock per i timestamp delle tx
+        """
+        parsed = urlparse(url)
+        self.host = parsed.hostname
+        self.port = parsed.port or 80
+        self.path = parsed.path or "/"
+        self.timeout = timeout
+        self.batch_size = batch_size
+        self.pipeline = pipeline
+        self.gas_price = gas_price
+        self.block_gas_limit = block_gas_limit
+        self.clock = clock or get_clock()
+
+        # Nonce con base casuale: più client non generano lo stesso hash
+        self._tx_nonce = itertools.count(secrets.randbits(32) << 32)
+
+        self._pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(self._new_connection())
+
+        # Submission pipelined: coda di (parametri di submit, future) svuotata dai sender
+        self._outbox: "queue.Queue[Optional[Tuple[Dict, Future]]]" = queue.Queue()
+        self._in_flight: Set[Future] = set()  # Solo i future non ancora risolti
+        self._in_flight_lock = threading.Lock()
+        self._senders: List[threading.Thread] = []
+        if pipeline:
+            for i in range(pool_size):
+                sender = threading.Thread(target=self._send_loop, name=f"rpc-sender-{i}", daemon=True)
+                sender.start()
+                self._senders.append(sender)
+
+        info = self.call("server_info")["info"]
+        self._producer_running = info["producer_running"]
+
+    # ==================== TRASPORTO ====================
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    @contextmanager
+    def _connection(self):
+        connection = self._pool.get()
+        try:
+            yield connection
+        except Exception:
+            connection.close()
+            connection = self._new_connection()
+            raise
+        finally:
+            self._pool.put(connection)
+
+    def _post(self, payload) -> object:
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"}
+        with self._connection() as connection:
+            try:
+                connection.request("POST", self.path, body, headers)
+                response = connection.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # Keep-alive chiuso dal server: un solo retry su connessione nuova
+                connection.close()
+                connection.request("POST", self.path, body, headers)
+                response = connection.getresponse()
+            data = response.read()
+        return json.loads(data)
+
+    @staticmethod
+    def _unwrap(response: Dict) -> Dict:
+        result = response.get("result", {})
+        if result.get("status") != "success":
+            raise LedgerRPCError(result.get("error", "unknown"), result.get("error_message", ""))
+        return result
+
+    def call(self, method: str, **params) -> Dict:
+        """Singola chiamata RPC"""
+        return self._unwrap(self._post({"method": method, "params": [params]}))
+
+    def call_batch(self, calls: List[Tuple[str, Dict]]) -> List:
+        """
+        Più chiamate in blocchi da `batch_size` per POST
+
+        Returns:
+            Per ogni chiamata il result, oppure la LedgerRPCError corrispondente
+        """
+        results = []
+        for start in range(0, len(calls), self.batch_size):
+            chunk = calls[start:start + self.batch_size]
+            responses = self._post([{"method": m, "params": [p]} for m, p in chunk])
+            for response in responses:
+                try:
+                    results.append(self._unwrap(response))
+                except LedgerRPCError as e:
+                    results.append(e)
+        return results
+
+    # ==================== SUBMISSION ====================
+
+    def _send_loop(self):
+        """Sender: raccoglie le tx accodate e le invia in batch"""
+        while True:
+            item = self._outbox.get()
+            if item is None:
+                return
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._outbox.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._outbox.put(None)  # Lo stop resta per gli altri sender
+                    break
+                batch.append(item)
+
+            try:
+                results = self.call_batch([("submit", params) for params, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result["tx_json"]["hash"])
+
+    def create_transaction(
+        self,
+        from_address: str,
+        function_name: str,
+        params: Dict,
+        to_address: Optional[str] = None,
+        gas_price: Optional[int] = None,
+        system: bool = False
+    ) -> TxRecord:
+        """
+        Firma la tx in locale e la invia (in pipeline o in modo sincrono)
+
+        `system` non viaggia sul filo: il nodo applica a tutte le tx che riceve
+        la stessa politica di mempool, qualunque cosa dichiari il client.
+        """
+        tx = TxRecord.create(
+            from_address=from_address,
+            function_name=function_name,
+            params=params,
+            to_address=to_address or "0xContract",
+            gas_used=estimate_gas(function_name),
+            gas_price=gas_price if gas_price is not None else self.gas_price,
+            timestamp=self.clock.time(),
+            nonce=next(self._tx_nonce)
+        )
+        if tx.gas_used > self.block_gas_limit:
+            raise ValueError("Transaction exceeds block gas limit")
+
+        params = {"tx_blob": tx.encode().hex()}
+        if not self.pipeline:
+            self.call("submit", **params)
+            return tx
+
+        future = tx.submission = Future()
+        with self._in_flight_lock:
+            self._in_flight.add(future)
+        future.add_done_callback(self._settled)
+        self._outbox.put((params, future))
+        return tx
+
+    def _settled(self, future: Future):
+        with self._in_flight_lock:
+            self._in_flight.discard(future)
+
+    def flush(self):
+        """
+        Attende la risposta del nodo per tutte le tx accodate finora
+
+        Non solleva: il rifiuto di una tx è nel suo `tx.submission`, per chi l'ha creata.
+        """
+        with self._in_flight_lock:
+            pending = list(self._in_flight)
+        wait(pending)
+
+    def mine_block(self):
+        """Chiude il ledger corrente (ledger_accept) dopo aver inviato le tx in volo"""
+        self.flush()
+        result = self.call("ledger_accept")
+        return decode_block(bytes.fromhex(result["ledger_blob"]))
+
+    @property
+    def producer_running(self) -> bool:
+        return self._producer_running
+
+    # ==================== QUERY ====================
+
+    @property
+    def current_block_number(self) -> int:
+        return self.call("ledger_current")["ledger_current_index"]
+
+    @property
+    def pending_count(self) -> int:
+        return self.call("server_info")["info"]["pending_transactions"]
+
+    def get_block(self, block_number: int):
+        try:
+            result = self.call("ledger", ledger_index=block_number)
+        except LedgerRPCError:
+            return None
+        return decode_block(bytes.fromhex(result["ledger_blob"]))
+
+    def get_transaction(self, tx_hash: str) -> Optional[Transaction]:
+        data = self.call("tx", transaction=tx_hash)["tx_json"]
+        return Transaction(**data) if data else None
+
+    def get_receipt(self, tx_hash: str) -> Optional[TransactionReceipt]:
+        data = self.call("tx_receipt", transaction=tx_hash)["receipt"]
+        return TransactionReceipt(**data) if data else None
+
+    def get_inclusion_proof(self, tx_hash: str) -> Optional[InclusionProof]:
+        data = self.call("tx_proof", transaction=tx_hash)["proof"]
+        return InclusionProof(**data) if data else None
+
+    def get_logs(
+        self,
+        from_block: int = 0,
+        to_block: Optional[int] = None,
+        topics: Optional[List] = None
+    ) -> List[EventLog]:
+        result = self.call("get_logs", from_block=from_block, to_block=to_block, topics=topics)
+        return [EventLog(**log) for log in result["logs"]]
+
+    def get_block_timestamp(self) -> int:
+        return self.call("server_info")["info"]["time"]
+
+    def close(self):
+        """Invia le tx rimaste, ferma i sender e chiude le connessioni"""
+        for _ in self._senders:
+            self._outbox.put(None)
+        for sender in self._senders:
+            sender.join()
+        self._senders = []
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
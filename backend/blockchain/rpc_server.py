@@ -0,0 +1,216 @@
+"""
+Ledger RPC Server - Stand-in locale di un nodo JSON-RPC in stile XRPL
+
+Espone una MockBlockchain via HTTP/1.1 keep-alive con il formato di rippled:
+    request:  {"method": "submit", "params": [{"tx_blob": "..."}]}
+    response: {"result": {"status": "success", ...}}
+Un array JSON di richieste (batch) riceve un array di risposte nello stesso ordine.
+
+Serve a test e benchmark per misurare i costi reali di round-trip senza rete.
+Esegui: python -m blockchain.rpc_server --port 5005 [--block-interval 1.0]
+"""
+import argparse
+import json
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+
+from blockchain.mock_blockchain import MockBlockchain
+from blockchain.block_store import encode_block
+from blockchain.tx_record import TxRecord
+
+
+class InvalidParams(Exception):
+    """Parametro presente ma non decodificabile (es. tx_blob malformato)"""
+
+
+class LedgerRPCServer:
+    """Server JSON-RPC sopra una MockBlockchain"""
+
+    def __init__(
+        self,
+        ledger: Optional[MockBlockchain] = None,
+        host: str = "127.0.0.1",
+        port: int = 0
+    ):
+        """
+        Args:
+            ledger: Chain servita (default: una MockBlockchain nuova)
+            host: Indirizzo di ascolto
+            port: Porta di ascolto (0 = porta libera scelta dal sistema)
+        """
+        self.ledger = ledger or MockBlockchain()
+        self._methods: Dict[str, Callable[[Dict], Dict]] = {
+            "submit": self._submit,
+            "ledger_accept": self._ledger_accept,
+            "ledger": self._ledger,
+            "ledger_current": self._ledger_current,
+            "server_info": self._server_info,
+            "tx": self._tx,
+            "tx_receipt": self._tx_receipt,
+            "tx_proof": self._tx_proof,
+            "get_logs": self._get_logs,
+        }
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive per il pool del client
+            disable_nagle_algorithm = True  # Header e body in due write: evita il delayed ACK
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    payload = json.loads(self.rfile.read(length))
+                except ValueError:
+                    payload = None
+
+                if isinstance(payload, list):
+                    response = [server.dispatch(request) for request in payload]
+                else:
+                    response = server.dispatch(payload)
+
+                body = json.dumps(response).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Niente log per richiesta: falserebbe i benchmark
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "LedgerRPCServer":
+        """Avvia il server in un thread in background"""
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever,
+            name="ledger-rpc-server",
+            daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        """Serve nel thread corrente (uso da riga di comando)"""
+        self._httpd.serve_forever()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.ledger.close()
+
+    # ==================== DISPATCH ====================
+
+    def dispatch(self, request) -> Dict:
+        """Esegue una singola richiesta e ritorna la risposta in formato rippled"""
+        if not isinstance(request, dict) or "method" not in request:
+            return _error("invalidRequest", "Malformed JSON-RPC request")
+
+        handler = self._methods.get(request["method"])
+        if handler is None:
+            return _error("unknownCmd", f"Unknown method: {request['method']}")
+
+        params = (request.get("params") or [{}])[0]
+        try:
+            result = handler(params)
+        except (KeyError, TypeError, IndexError, struct.error, InvalidParams) as e:
+            # invalidParams è il -32602 di JSON-RPC nel formato di rippled
+            return _error("invalidParams", str(e))
+        except ValueError as e:
+            return _error("txRejected", str(e))
+
+        result["status"] = "success"
+        return {"result": result}
+
+    # ==================== METODI ====================
+
+    def _submit(self, params: Dict) -> Dict:
+        try:
+            blob = bytes.fromhex(params["tx_blob"])
+            tx, end = TxRecord.decode(blob, 0, 0)
+        except (ValueError, IndexError, struct.error) as e:
+            # Hex, UTF-8 e JSON dei parametri sollevano ValueError: non è un rifiuto della tx
+            raise InvalidParams(f"Malformed tx_blob: {e}") from e
+        if end != len(blob):
+            raise InvalidParams("Malformed tx_blob: trailing or missing bytes")
+        if tx.compute_hash() != tx.tx_hash:
+            raise ValueError("Transaction hash does not match tx_blob")
+        # Mai `system` dal client: solo il GameManager in-process può scavalcare la mempool
+        self.ledger.submit_transaction(tx)
+        return {"engine_result": "tesSUCCESS", "tx_json": {"hash": tx.tx_hash}}
+
+    def _ledger_accept(self, params: Dict) -> Dict:
+        block = self.ledger.mine_block()
+        return {
+            "ledger_current_index": self.ledger.current_block_number,
+            "ledger_blob": encode_block(block).hex()
+        }
+
+    def _ledger(self, params: Dict) -> Dict:
+        block = self.ledger.get_block(int(params["ledger_index"]))
+        if block is None:
+            raise ValueError("lgrNotFound")
+        return {"ledger_blob": encode_block(block).hex()}
+
+    def _ledger_current(self, params: Dict) -> Dict:
+        return {"ledger_current_index": self.ledger.current_block_number}
+
+    def _server_info(self, params: Dict) -> Dict:
+        return {"info": {
+            "ledger_current_index": self.ledger.current_block_number,
+            "pending_transactions": self.ledger.pending_count,
+            "producer_running": self.ledger.producer_running,
+            "time": self.ledger.get_block_timestamp()
+        }}
+
+    def _tx(self, params: Dict) -> Dict:
+        tx = self.ledger.get_transaction(params["transaction"])
+        return {"tx_json": tx.model_dump(mode="json") if tx else None}
+
+    def _tx_receipt(self, params: Dict) -> Dict:
+        receipt = self.ledger.get_receipt(params["transaction"])
+        return {"receipt": receipt.model_dump(mode="json") if receipt else None}
+
+    def _tx_proof(self, params: Dict) -> Dict:
+        proof = self.ledger.get_inclusion_proof(params["transaction"])
+        return {"proof": proof.model_dump(mode="json") if proof else None}
+
+    def _get_logs(self, params: Dict) -> Dict:
+        logs = self.ledger.get_logs(
+            from_block=params.get("from_block", 0),
+            to_block=params.get("to_block"),
+            topics=params.get("topics")
+        )
+        return {"logs": [log.model_dump(mode="json") for log in logs]}
+
+
+def _error(code: str, message: str) -> Dict:
+    return {"result": {"status": "error", "error": code, "error_message": message}}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stand-in JSON-RPC della MockBlockchain")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5005)
+    parser.add_argument("--block-interval", type=float, default=None)
+    args = parser.parse_args()
+
+    rpc = LedgerRPCServer(MockBlockchain(block_interval=args.block_interval), args.host, args.port)
+    print(f"Ledger RPC in ascolto su {rpc.url}")
+    try:
+        rpc.serve_forever()
+    except KeyboardInterrupt:
+        rpc.stop()
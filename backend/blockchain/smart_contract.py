@@ -2,9 +2,14 @@
 Smart Contract Simulator - Simula il contratto Solidity del gioco
 Gestisce la logica on-chain e validazioni
 """
-from typing import Optional
-from datetime import datetime
+from typing import List, Optional
 from models.game_models import Game, Player, GameState, PlayerStatus, Commitment, FinalSubmission
+from utils.clock import Clock, get_clock
+from utils.locks import StripedLock
+
+
+class PlayerNotEligible(ValueError):
+    """Registrazione rifiutata per il giocatore, non per il gioco: il posto resta libero"""
 
 
 class SmartContract:
@@ -14,28 +19,38 @@ class SmartContract:
     XPF_VARIATION_COST = 1
     XPF_PLAY_COST = 1
     MAX_VARIATIONS = 9
+    MIN_PLAYERS = 2  # Per partire alla scadenza della registrazione
     WINNER_REWARD = 100  # Vincitore riceve 100 XPF
 
-    def __init__(self):
+    def __init__(self, clock: Optional[Clock] = None):
+        self.clock = clock or get_clock()
         self.games: dict[str, Game] = {}
         self.xpf_balances: dict[str, int] = {}  # address -> balance
+        # Un indirizzo può giocare in più giochi in parallelo: il ledger XPF
+        # ha lock per indirizzo, indipendenti dai lock dei giochi
+        self.address_locks = StripedLock(64)
 
     # ==================== XPF TOKEN FUNCTIONS ====================
 
     def mint_xpf(self, address: str, amount: int):
         """Minta XPF per un giocatore"""
-        if address not in self.xpf_balances:
-            self.xpf_balances[address] = 0
-        self.xpf_balances[address] += amount
+        with self.address_locks(address):
+            self.xpf_balances[address] = self.xpf_balances.get(address, 0) + amount
+
+    def open_account(self, address: str, amount: int):
+        """Minta `amount` XPF solo se l'indirizzo non ha ancora un balance"""
+        with self.address_locks(address):
+            if address not in self.xpf_balances:
+                self.xpf_balances[address] = amount
 
     def burn_xpf(self, address: str, amount: int) -> bool:
-        """Brucia XPF di un giocatore"""
-        if address not in self.xpf_balances:
-            return False
-        if self.xpf_balances[address] < amount:
-            return False
-        self.xpf_balances[address] -= amount
-        return True
+        """Brucia XPF di un giocatore (controllo e addebito sono atomici)"""
+        with self.address_locks(address):
+            balance = self.xpf_balances.get(address)
+            if balance is None or balance < amount:
+                return False
+            self.xpf_balances[address] = balance - amount
+            return True
 
     def get_xpf_balance(self, address: str) -> int:
         """Ritorna il balance XPF di un indirizzo"""
@@ -56,21 +71,21 @@ class SmartContract:
         if game.status != GameState.REGISTERING:
             raise ValueError("Game not accepting registrations")
         if game.get_player(player_address) is not None:
-            raise ValueError("Player already registered")
+            raise PlayerNotEligible("Player already registered")
 
         # Minta XPF iniziali se nuovo giocatore
-        if player_address not in self.xpf_balances:
-            self.mint_xpf(player_address, self.XPF_INITIAL)
+        self.open_account(player_address, self.XPF_INITIAL)
 
         # Verifica XPF sufficiente
         if self.get_xpf_balance(player_address) < self.XPF_PLAY_COST:
-            raise ValueError("Insufficient XPF")
+            raise PlayerNotEligible("Insufficient XPF")
 
         # Aggiungi giocatore
         player = Player(
             address=player_address,
             xpf_balance=self.get_xpf_balance(player_address),
-            status=PlayerStatus.REGISTERED
+            status=PlayerStatus.REGISTERED,
+            registered_at=self.clock.now()
         )
         game.players.append(player)
 
@@ -129,6 +144,10 @@ class SmartContract:
 
     def request_variation(self, game_id: str, player_address: str) -> bool:
         """Richiedi generazione di una variazione"""
+        return self.request_variations(game_id, player_address, 1)
+
+    def request_variations(self, game_id: str, player_address: str, count: int) -> bool:
+        """Richiedi `count` variazioni con un solo burn (tutte o nessuna)"""
         game = self.games.get(game_id)
         if not game:
             raise ValueError("Game not found")
@@ -142,19 +161,19 @@ class SmartContract:
             raise ValueError("Not in playing phase")
         if player.status not in [PlayerStatus.COMMITTED, PlayerStatus.GENERATING]:
             raise ValueError("Invalid player status")
-        if len(player.variations) >= self.MAX_VARIATIONS:
+        if count < 1:
+            raise ValueError("Invalid variation count")
+        # Conta le variazioni pagate, non solo quelle già calcolate
+        if player.variations_requested + count > self.MAX_VARIATIONS:
             raise ValueError("Max variations reached")
 
-        # Verifica XPF (ogni variazione costa 1 XPF)
-        xpf_balance = self.get_xpf_balance(player_address)
-        if xpf_balance < self.XPF_VARIATION_COST:
+        # Burn XPF (ogni variazione costa 1 XPF)
+        cost = self.XPF_VARIATION_COST * count
+        if not self.burn_xpf(player_address, cost):
             raise ValueError("Insufficient XPF")
 
-        # Burn XPF
-        if not self.burn_xpf(player_address, self.XPF_VARIATION_COST):
-            raise ValueError("Failed to burn XPF")
-
-        player.xpf_spent += self.XPF_VARIATION_COST
+        player.variations_requested += count
+        player.xpf_spent += cost
         player.xpf_balance = self.get_xpf_balance(player_address)
         player.status = PlayerStatus.GENERATING
 
@@ -185,18 +204,13 @@ class SmartContract:
         if player.final_submission is not None:
             raise ValueError("Already submitted")
 
-        # Verifica XPF
-        xpf_balance = self.get_xpf_balance(player_address)
-        if xpf_balance < self.XPF_PLAY_COST:
-            raise ValueError("Insufficient XPF")
-
         # Verifica ZK proof (simulato)
         if not self._verify_final_proof(submission):
             raise ValueError("Invalid ZK proof")
 
         # Burn XPF finale
         if not self.burn_xpf(player_address, self.XPF_PLAY_COST):
-            raise ValueError("Failed to burn XPF")
+            raise ValueError("Insufficient XPF")
 
         player.xpf_spent += self.XPF_PLAY_COST
         player.xpf_balance = self.get_xpf_balance(player_address)
@@ -261,4 +275,52 @@ class SmartContract:
         self.mint_xpf(game.winner, self.WINNER_REWARD)
 
         game.status = GameState.COMPLETED
-        game.completed_at = datetime.now()
+        game.completed_at = self.clock.now()
+
+    # ==================== TIMEOUT ====================
+
+    def expire_phase(self, game_id: str) -> List[str]:
+        """
+        Chiude la fase scaduta: chi non ha agito diventa TIMED_OUT
+
+        Registrazione: parte con i giocatori presenti se sono almeno MIN_PLAYERS.
+        Commitment e gioco: proseguono i giocatori che hanno agito. Se non
+        resta nessuno il gioco si chiude senza vincitore.
+        Ritorna gli indirizzi esclusi.
+        """
+        game = self.games.get(game_id)
+        if not game:
+            raise ValueError("Game not found")
+
+        if game.status == GameState.REGISTERING:
+            if len(game.players) >= self.MIN_PLAYERS:
+                game.max_players = len(game.players)
+            else:
+                self.close_game(game_id)
+            return []
+
+        if game.status == GameState.RANDOMNESS_FULFILLED:
+            missing = [p for p in game.active_players() if p.commitment is None]
+            next_status = GameState.ALL_COMMITTED
+        elif game.status == GameState.PLAYING:
+            missing = [p for p in game.active_players() if p.final_submission is None]
+            next_status = GameState.ALL_SUBMITTED
+        else:
+            raise ValueError("No phase to expire")
+
+        for player in missing:
+            player.status = PlayerStatus.TIMED_OUT
+        if game.active_players():
+            game.status = next_status
+        else:
+            self.close_game(game_id)
+        return [player.address for player in missing]
+
+    def close_game(self, game_id: str):
+        """Chiude un gioco senza vincitore"""
+        game = self.games.get(game_id)
+        if not game:
+            raise ValueError("Game not found")
+
+        game.status = GameState.COMPLETED
+        game.completed_at = self.clock.now()
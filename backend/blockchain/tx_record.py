@@ -0,0 +1,265 @@
+"""
+Tx Record - Rappresentazione interna compatta delle transazioni
+
+La chain lavora su TxRecord (slot, parametri già codificati in binario);
+il modello pydantic Transaction viene costruito solo al confine delle API.
+L'hash della tx è lo SHA-256 della codifica canonica del corpo.
+"""
+import hashlib
+import json
+import struct
+import sys
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from models.game_models import Transaction, EventLog
+
+
+# gas_used, gas_price, timestamp (µs), nonce
+# Campi larghi abbastanza per qualunque valore accettato a monte: la codifica
+# avviene dopo che il contratto ha già cambiato stato e non deve fallire
+_TX_FIXED = struct.Struct("<QQqQ")
+_STR_LEN = struct.Struct("<I")
+_COUNT = struct.Struct("<I")
+_INT = struct.Struct("<q")
+_LEN = struct.Struct("<I")
+
+# Tag dei tipi dei parametri
+_PARAM_NONE = 0
+_PARAM_INT = 1
+_PARAM_STR = 2
+_PARAM_BOOL = 3
+_PARAM_JSON = 4  # Fallback per valori non scalari o interi fuori range
+
+_EMPTY_HASH = b"\x00" * 32
+_INT_MIN = -(1 << 63)
+_INT_MAX = (1 << 63) - 1
+
+STATUS_SUCCESS = "success"
+
+
+# ==================== PRIMITIVE ====================
+
+def pack_hash(value: str) -> bytes:
+    """Hash hex (con o senza 0x) -> 32 byte; "0x0" del genesis -> zeri"""
+    digits = value[2:] if value.startswith("0x") else value
+    if len(digits) != 64:
+        return _EMPTY_HASH
+    return bytes.fromhex(digits)
+
+
+def unpack_hash(raw: bytes, prefix: str) -> str:
+    if raw == _EMPTY_HASH:
+        return "0x0"
+    return prefix + raw.hex()
+
+
+def pack_str(value: Optional[str]) -> bytes:
+    data = (value or "").encode()
+    return _STR_LEN.pack(len(data)) + data
+
+
+def unpack_str(buf, pos: int) -> Tuple[str, int]:
+    (length,) = _STR_LEN.unpack_from(buf, pos)
+    pos += _STR_LEN.size
+    return bytes(buf[pos:pos + length]).decode(), pos + length
+
+
+def encode_params(params: Dict) -> bytes:
+    """Codifica canonica dei parametri: chiavi ordinate, valori con tag di tipo"""
+    parts = [_COUNT.pack(len(params))]
+    for key in sorted(params):
+        value = params[key]
+        parts.append(pack_str(key))
+        if value is None:
+            parts.append(bytes([_PARAM_NONE]))
+        elif isinstance(value, bool):
+            parts.append(bytes([_PARAM_BOOL, value]))
+        elif isinstance(value, int) and _INT_MIN <= value <= _INT_MAX:
+            parts.append(bytes([_PARAM_INT]) + _INT.pack(value))
+        elif isinstance(value, str):
+            data = value.encode()
+            parts.append(bytes([_PARAM_STR]) + _LEN.pack(len(data)) + data)
+        else:
+            data = json.dumps(value, sort_keys=True, separators=(",", ":"), default=str).encode()
+            parts.append(bytes([_PARAM_JSON]) + _LEN.pack(len(data)) + data)
+    return b"".join(parts)
+
+
+def decode_params(buf, pos: int = 0) -> Tuple[Dict, int]:
+    (count,) = _COUNT.unpack_from(buf, pos)
+    pos += _COUNT.size
+    params = {}
+    for _ in range(count):
+        key, pos = unpack_str(buf, pos)
+        tag = buf[pos]
+        pos += 1
+        if tag == _PARAM_NONE:
+            params[key] = None
+        elif tag == _PARAM_BOOL:
+            params[key] = bool(buf[pos])
+            pos += 1
+        elif tag == _PARAM_INT:
+            (params[key],) = _INT.unpack_from(buf, pos)
+            pos += _INT.size
+        else:
+            (length,) = _LEN.unpack_from(buf, pos)
+            pos += _LEN.size
+            data = bytes(buf[pos:pos + length])
+            pos += length
+            params[key] = data.decode() if tag == _PARAM_STR else json.loads(data)
+    return params, pos
+
+
+# ==================== RECORD ====================
+
+class TxRecord:
+    """Transazione interna: slot, stringhe internate, parametri come bytes"""
+
+    __slots__ = (
+        "tx_hash", "from_address", "to_address", "function_name", "game_id",
+        "params_blob", "gas_used", "gas_price", "timestamp_us", "nonce",
+        "block_number", "status", "submission"
+    )
+
+    def __init__(
+        self,
+        from_address: str,
+        to_address: str,
+        function_name: str,
+        game_id: str,
+        params_blob: bytes,
+        gas_used: int,
+        gas_price: int,
+        timestamp_us: int,
+        nonce: int,
+        block_number: int = 0,
+        status: str = STATUS_SUCCESS,
+        tx_hash: Optional[str] = None
+    ):
+        # Indirizzi e nomi funzione si ripetono su migliaia di tx
+        self.from_address = sys.intern(from_address)
+        self.to_address = sys.intern(to_address)
+        self.function_name = sys.intern(function_name)
+        self.game_id = game_id
+        self.params_blob = params_blob
+        self.gas_used = gas_used
+        self.gas_price = gas_price
+        self.timestamp_us = timestamp_us
+        self.nonce = nonce
+        self.block_number = block_number
+        self.status = status
+        self.tx_hash = tx_hash or self.compute_hash()
+        self.submission: Optional[Future] = None  # Invio in background (JsonRpcLedger), non codificato
+
+    @classmethod
+    def create(
+        cls,
+        from_address: str,
+        function_name: str,
+        params: Dict,
+        to_address: str,
+        gas_used: int,
+        gas_price: int,
+        timestamp: float,
+        nonce: int
+    ) -> "TxRecord":
+        return cls(
+            from_address=from_address,
+            to_address=to_address,
+            function_name=function_name,
+            game_id=str(params.get("game_id", "")),
+            params_blob=encode_params(params),
+            gas_used=gas_used,
+            gas_price=gas_price,
+            timestamp_us=round(timestamp * 1_000_000),
+            nonce=nonce
+        )
+
+    @property
+    def params(self) -> Dict:
+        return decode_params(self.params_blob)[0]
+
+    @property
+    def timestamp(self) -> datetime:
+        return datetime.fromtimestamp(self.timestamp_us / 1_000_000)
+
+    @property
+    def topics(self) -> Tuple[str, str, str]:
+        """Topic posizionali dell'evento: [function_name, game_id, player]"""
+        return (self.function_name, self.game_id, self.from_address)
+
+    # ==================== CODIFICA ====================
+
+    def encode_body(self) -> bytes:
+        """Codifica canonica del contenuto firmato (base dell'hash)"""
+        return b"".join([
+            pack_str(self.from_address),
+            pack_str(self.to_address),
+            pack_str(self.function_name),
+            _TX_FIXED.pack(self.gas_used, self.gas_price, self.timestamp_us, self.nonce),
+            self.params_blob,
+        ])
+
+    def compute_hash(self) -> str:
+        return "0x" + hashlib.sha256(self.encode_body()).hexdigest()
+
+    def encode(self) -> bytes:
+        """Record completo per lo storage: hash + status + corpo"""
+        return pack_hash(self.tx_hash) + pack_str(self.status) + self.encode_body()
+
+    @classmethod
+    def decode(cls, buf, pos: int, block_number: int) -> Tuple["TxRecord", int]:
+        tx_hash = unpack_hash(bytes(buf[pos:pos + 32]), "0x")
+        pos += 32
+        status, pos = unpack_str(buf, pos)
+        from_address, pos = unpack_str(buf, pos)
+        to_address, pos = unpack_str(buf, pos)
+        function_name, pos = unpack_str(buf, pos)
+        gas_used, gas_price, timestamp_us, nonce = _TX_FIXED.unpack_from(buf, pos)
+        pos += _TX_FIXED.size
+        params_start = pos
+        params, pos = decode_params(buf, pos)
+
+        record = cls(
+            from_address=from_address,
+            to_address=to_address,
+            function_name=function_name,
+            game_id=str(params.get("game_id", "")),
+            params_blob=bytes(buf[params_start:pos]),
+            gas_used=gas_used,
+            gas_price=gas_price,
+            timestamp_us=timestamp_us,
+            nonce=nonce,
+            block_number=block_number,
+            status=status,
+            tx_hash=tx_hash
+        )
+        return record, pos
+
+    # ==================== CONFINE API ====================
+
+    def event_logs(self) -> List[EventLog]:
+        """Log strutturato emesso dalla chiamata al contratto"""
+        return [EventLog(
+            address=self.to_address,
+            topics=list(self.topics),
+            data=self.params
+        )]
+
+    def to_model(self) -> Transaction:
+        """Modello pydantic per le risposte API"""
+        return Transaction(
+            tx_hash=self.tx_hash,
+            from_address=self.from_address,
+            to_address=self.to_address,
+            function_name=self.function_name,
+            params=self.params,
+            gas_used=self.gas_used,
+            gas_price=self.gas_price,
+            block_number=self.block_number,
+            timestamp=self.timestamp,
+            status=self.status,
+            logs=self.event_logs()
+        )
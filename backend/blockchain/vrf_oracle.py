@@ -0,0 +1,142 @@
+"""
+VRF Oracle - Worker in background che evade le richieste di casualità
+
+Simula il nodo Chainlink: la richiesta viene accodata e il chiamante torna
+subito; dopo la latenza dell'oracolo il worker invoca la callback di
+fulfillment (come `fulfillRandomness` chiamata dal coordinator on-chain).
+
+Le richieste arrivate entro la finestra di batching vengono evase insieme:
+una sola chiamata alla callback, quindi un solo blocco e una sola proof.
+"""
+import logging
+import queue
+import threading
+from typing import Callable, List, Optional, Tuple
+
+from utils.clock import Clock, get_clock
+
+logger = logging.getLogger(__name__)
+
+_JOIN_POLL = 0.01  # Secondi reali tra due controlli di join()
+
+
+class VRFOracle:
+    """Coda FIFO di richieste VRF evasa a batch da un thread dedicato"""
+
+    def __init__(
+        self,
+        fulfill: Callable[[List[Tuple[str, str]]], None],
+        latency: float = 0.5,
+        window: float = 0.0,
+        max_batch: int = 256,
+        clock: Optional[Clock] = None
+    ):
+        """
+        Args:
+            fulfill: Callback con la lista di (game_id, request_id) da evadere
+            latency: Latenza simulata dell'oracolo dalla richiesta al fulfillment
+            window: Attesa extra dopo la scadenza della prima richiesta per
+                raccoglierne altre nello stesso batch (0 = solo quelle già in coda)
+            max_batch: Richieste massime per batch (1 = una per volta)
+            clock: Clock per latenza e finestra (con VirtualClock il worker aspetta
+                che il tempo virtuale arrivi alla scadenza: lo fa avanzare join())
+        """
+        self.fulfill = fulfill
+        self.latency = latency
+        self.window = window
+        self.max_batch = max_batch
+        self.clock = clock or get_clock()
+
+        # (scadenza, game_id, request_id); latenza costante -> scadenze già in ordine
+        self._requests: "queue.Queue[Optional[Tuple[float, str, str]]]" = queue.Queue()
+        self._resumed = threading.Event()
+        self._resumed.set()
+        self._stopping = threading.Event()
+        # Scadenza che il worker sta aspettando (None se non aspetta il clock)
+        self._waiting_until: Optional[float] = None
+        self._thread = threading.Thread(target=self._run, name="vrf-oracle", daemon=True)
+        self._thread.start()
+
+    def submit(self, game_id: str, request_id: str):
+        """Accoda una richiesta; ritorna subito"""
+        self._requests.put((self.clock.time() + self.latency, game_id, request_id))
+
+    @property
+    def pending(self) -> int:
+        return self._requests.unfinished_tasks
+
+    def pause(self):
+        """Sospende l'evasione: le richieste restano in coda (es. manutenzione del nodo)"""
+        self._resumed.clear()
+
+    def resume(self):
+        self._resumed.set()
+
+    def join(self):
+        """
+        Attende che tutte le richieste accodate siano state evase
+
+        Il worker non fa mai avanzare il clock: chi aspetta lo porta alla
+        scadenza del batch in corso (con un SystemClock è una normale attesa).
+        """
+        done = self._requests.all_tasks_done
+        while self._requests.unfinished_tasks:
+            deadline = self._waiting_until
+            remaining = deadline - self.clock.time() if deadline is not None else 0
+            if remaining > 0:
+                self.clock.sleep(remaining)
+            with done:
+                if self._requests.unfinished_tasks:
+                    done.wait(_JOIN_POLL)
+
+    def stop(self):
+        """Evade le richieste rimaste e ferma il worker"""
+        if self._thread is None:
+            return
+        self._requests.put(None)
+        self._stopping.set()  # Le richieste rimaste sono evase senza aspettare la latenza
+        self.resume()
+        self._thread.join()
+        self._thread = None
+
+    def _collect(self, first: Tuple[float, str, str]) -> Tuple[List[Tuple[str, str]], bool]:
+        """Aspetta la scadenza della prima richiesta e raccoglie il batch"""
+        deadline = first[0] + self.window
+        self._waiting_until = deadline
+        self.clock.wait(self._stopping, deadline - self.clock.time())
+        self._waiting_until = None
+        self._resumed.wait()
+
+        batch = [(first[1], first[2])]
+        stopping = False
+        while len(batch) < self.max_batch:
+            try:
+                item = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append((item[1], item[2]))
+        return batch, stopping
+
+    def _run(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                self._requests.task_done()
+                return
+
+            batch, stopping = self._collect(item)
+            try:
+                self.fulfill(batch)
+            except Exception:
+                # Un batch fallito non deve fermare l'oracolo
+                logger.exception("VRF fulfillment failed for %d requests", len(batch))
+            finally:
+                for _ in range(len(batch) + stopping):
+                    self._requests.task_done()
+
+            if stopping:
+                # Lo stop è accodato dopo tutte le richieste: il batch era l'ultimo
+                return
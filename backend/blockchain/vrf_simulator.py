@@ -2,23 +2,27 @@
 VRF Simulator - Simula Chainlink VRF per generazione casualità verificabile
 """
 import hashlib
+import itertools
 import secrets
-from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
 from models.game_models import VRFResult
+from blockchain.merkle import MerkleTree, verify_inclusion_proof
+from utils.clock import Clock, get_clock
 
 
 class VRFSimulator:
     """Simula Chainlink VRF per la demo"""
 
-    def __init__(self):
+    def __init__(self, clock: Optional[Clock] = None):
+        self.clock = clock or get_clock()
         # Chiave privata del "nodo Chainlink" (simulata)
         self.vrf_private_key = secrets.token_hex(32)
-        self.request_counter = 0
+        # next() su itertools.count è atomico: niente id duplicati tra thread
+        self._request_ids = itertools.count(1)
 
     def request_randomness(self, game_id: str) -> str:
         """Richiede casualità verificabile"""
-        self.request_counter += 1
-        request_id = f"vrf_request_{game_id}_{self.request_counter}"
+        request_id = f"vrf_request_{game_id}_{next(self._request_ids)}"
         return request_id
 
     def fulfill_randomness(self, request_id: str, game_id: str) -> VRFResult:
@@ -31,19 +35,65 @@ class VRFSimulator:
         seed_game = "0x" + random_bytes.hex()
 
         # Genera proof simulata (nella realtà sarebbe una firma su curva ellittica)
-        proof_data = f"{self.vrf_private_key}{request_id}{seed_game}{datetime.now()}"
+        proof_data = f"{self.vrf_private_key}{request_id}{seed_game}{self.clock.now()}"
         proof = "0x" + hashlib.sha256(proof_data.encode()).hexdigest()
 
         vrf_result = VRFResult(
             seed_game=seed_game,
             proof=proof,
             request_id=request_id,
-            timestamp=datetime.now(),
+            timestamp=self.clock.now(),
             block_number=0  # Verrà aggiornato dal blockchain
         )
 
         return vrf_result
 
+    def fulfill_randomness_batch(self, requests: List[Tuple[str, str]]) -> List[VRFResult]:
+        """
+        Evade più richieste (request_id, game_id) con un'unica proof
+
+        Un solo seed casuale di batch; il seed di ogni gioco è
+        Hash(seed_batch || request_id). I seed sono le foglie di un Merkle tree
+        e la proof firma la sola radice: ogni risultato porta il proprio cammino.
+        """
+        batch_seed = secrets.token_bytes(32)
+        seeds = [
+            "0x" + hashlib.sha256(batch_seed + request_id.encode()).hexdigest()
+            for request_id, _ in requests
+        ]
+
+        tree = MerkleTree(seeds)
+        timestamp = self.clock.now()
+        proof_data = f"{self.vrf_private_key}{tree.root}{timestamp}"
+        proof = "0x" + hashlib.sha256(proof_data.encode()).hexdigest()
+
+        return [
+            VRFResult(
+                seed_game=seed,
+                proof=proof,
+                request_id=request_id,
+                timestamp=timestamp,
+                block_number=0,  # Verrà aggiornato dal blockchain
+                batch_root=tree.root,
+                batch_index=index,
+                batch_size=len(seeds),
+                batch_path=tree.get_proof(index)
+            )
+            for index, ((request_id, _), seed) in enumerate(zip(requests, seeds))
+        ]
+
+    def verify_batch_membership(self, vrf_result: VRFResult) -> bool:
+        """Verifica che il seed faccia parte del batch firmato dalla proof"""
+        if vrf_result.batch_root is None or vrf_result.batch_size is None:
+            return False
+        return verify_inclusion_proof(
+            vrf_result.seed_game,
+            vrf_result.batch_index,
+            vrf_result.batch_size,
+            vrf_result.batch_path,
+            vrf_result.batch_root
+        )
+
     def verify_proof(self, seed: str, proof: str) -> bool:
         """
         Verifica la proof VRF (simulato)
@@ -60,3 +110,20 @@ class VRFSimulator:
         data = f"{seed_game}{player_address}{game_id}"
         player_seed = "0x" + hashlib.sha256(data.encode()).hexdigest()
         return player_seed
+
+    def derive_player_seeds(self, seed_game: str, player_addresses: Iterable[str], game_id: str) -> List[str]:
+        """
+        derive_player_seed per tutti i giocatori in un solo passaggio
+
+        Il prefisso comune (seed_game) entra nello stato SHA-256 una volta sola;
+        i risultati sono identici a quelli di derive_player_seed.
+        """
+        prefix = hashlib.sha256(seed_game.encode())
+        suffix = game_id.encode()
+        seeds = []
+        for address in player_addresses:
+            digest = prefix.copy()
+            digest.update(address.encode())
+            digest.update(suffix)
+            seeds.append("0x" + digest.hexdigest())
+        return seeds
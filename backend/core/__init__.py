@@ -1,3 +1,6 @@
 from .game_manager import GameManager
+from .async_game_manager import AsyncGameManager
+from .sharding import ShardRouter
+from .matchmaking import Matchmaker
 
-__all__ = ["GameManager"]
+__all__ = ["GameManager", "AsyncGameManager", "ShardRouter", "Matchmaker"]
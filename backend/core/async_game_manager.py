@@ -0,0 +1,154 @@
+"""
+Async Game Manager - Facade async di GameManager per le route FastAPI
+
+Le operazioni bloccanti (mining simulato, RSA, hashing) girano su un pool
+di thread limitato: l'event loop resta libero per le letture e per /health.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, TypeVar
+
+from blockchain.mock_blockchain import MockBlockchain
+from core.game_manager import GameManager
+from models.game_models import Game, GameState, Player, Commitment, FinalSubmission
+
+T = TypeVar("T")
+
+
+class AsyncGameManager:
+    """
+    Wrapper async di GameManager
+
+    - Le mutazioni girano nel pool; GameManager prende da sé il lock del gioco,
+      quindi operazioni su giochi diversi procedono in parallelo
+    - `run()` esegue nel pool qualsiasi funzione bloccante senza stato condiviso
+      (es. generazione chiavi RSA, proof ZK)
+    - Le letture restano sull'event loop solo se sono lookup in memoria: con
+      uno ShardRouter (giochi negli shard) o un ledger JSON-RPC ogni lettura è
+      un round trip e passa dal pool, come la lettura di un gioco archiviato
+    - Al massimo `max_pending` operazioni sono ammesse insieme: le altre
+      aspettano sull'event loop invece di accumularsi nella coda del pool
+    """
+
+    def __init__(self, manager: GameManager, max_workers: int = 8, max_pending: Optional[int] = None):
+        self.manager = manager
+        self.max_pending = max_pending or max_workers * 4
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="game-worker")
+        self._admission: Optional[asyncio.Semaphore] = None
+        # Letture bloccanti: giochi in altri processi, chain su un nodo remoto
+        self._remote_games = not isinstance(manager, GameManager)
+        self._remote_chain = not isinstance(manager.blockchain, MockBlockchain)
+
+    async def run(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Esegue `fn` nel pool e ne attende il risultato"""
+        if self._admission is None:
+            self._admission = asyncio.Semaphore(self.max_pending)
+        async with self._admission:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def close(self):
+        """Attende le operazioni in corso e chiude il pool"""
+        self._executor.shutdown(wait=True)
+
+    # ==================== MUTAZIONI ====================
+
+    async def create_game(self, max_players: int = 3) -> Game:
+        return await self.run(self.manager.create_game, max_players=max_players)
+
+    async def register_player(self, game_id: str, player_address: str) -> Player:
+        return await self.run(self.manager.register_player, game_id, player_address)
+
+    async def submit_commitment(
+        self,
+        game_id: str,
+        player_address: str,
+        public_key: str,
+        encrypted_numbers: List[str],
+        zk_proof: str
+    ) -> Commitment:
+        return await self.run(
+            self.manager.submit_commitment,
+            game_id, player_address, public_key, encrypted_numbers, zk_proof
+        )
+
+    async def request_variation(self, game_id: str, player_address: str) -> Dict:
+        return await self.run(self.manager.request_variation, game_id, player_address)
+
+    async def compute_variation(self, game_id: str, player_address: str, current_numbers: List[int]) -> Dict:
+        return await self.run(self.manager.compute_variation, game_id, player_address, current_numbers)
+
+    async def compute_variation_encrypted(self, game_id: str, player_address: str, encrypted_state: List[str]) -> Dict:
+        return await self.run(self.manager.compute_variation_encrypted, game_id, player_address, encrypted_state)
+
+    async def request_variations(
+        self,
+        game_id: str,
+        player_address: str,
+        current_numbers: List[int],
+        count: int
+    ) -> Dict:
+        return await self.run(self.manager.request_variations, game_id, player_address, current_numbers, count)
+
+    async def submit_final_choice(
+        self,
+        game_id: str,
+        player_address: str,
+        output_declared: int,
+        encrypted_state_hash: str,
+        variations_count: int,
+        zk_proof: str
+    ) -> FinalSubmission:
+        return await self.run(
+            self.manager.submit_final_choice,
+            game_id, player_address, output_declared,
+            encrypted_state_hash, variations_count, zk_proof
+        )
+
+    # ==================== LETTURE ====================
+
+    async def _read(self, remote: bool, fn: Callable[..., T], *args) -> T:
+        if remote:
+            return await self.run(fn, *args)
+        return fn(*args)
+
+    async def get_game(self, game_id: str) -> Optional[Game]:
+        if self._remote_games:
+            return await self.run(self.manager.get_game, game_id)
+        game = self.manager.get_game(game_id, from_disk=False)
+        if game is None and self._may_be_on_disk(game_id):
+            # Concluso fuori memoria: lettura da archivio o store e validazione pydantic nel pool
+            game = await self.run(self.manager.get_game, game_id)
+        return game
+
+    def _may_be_on_disk(self, game_id: str) -> bool:
+        """Archivio: indice in memoria; store: lo dice solo una query, fatta nel pool"""
+        manager = self.manager
+        return (manager.game_archive is not None and game_id in manager.game_archive) or manager.store is not None
+
+    async def get_game_status(self, game_id: str) -> Optional[GameState]:
+        return await self._read(self._remote_games, self.manager.get_game_status, game_id)
+
+    async def get_active_game(self) -> Optional[Game]:
+        game_id = self.manager.active_game_id
+        return await self.get_game(game_id) if game_id else None
+
+    async def get_all_games(self) -> List[Game]:
+        return await self._read(self._remote_games, self.manager.get_all_games)
+
+    async def get_player_xpf(self, player_address: str) -> int:
+        return await self._read(self._remote_games, self.manager.get_player_xpf, player_address)
+
+    async def count_games(self) -> int:
+        return await self._read(self._remote_games, self.manager.count_games)
+
+    async def chain_status(self) -> Dict[str, int]:
+        """Altezza e tx pending della chain (con gli shard: di tutte le chain)"""
+        return await self._read(self._remote_games or self._remote_chain, self._chain_status)
+
+    def _chain_status(self) -> Dict[str, int]:
+        return {
+            "blockchain_height": self.manager.blockchain.current_block_number,
+            "pending_transactions": self.manager.blockchain.pending_count
+        }
@@ -2,68 +2,406 @@
 Game Manager - Orchestrazione completa del gioco
 Coordina blockchain, crittografia e logica di gioco
 """
+import functools
+import logging
 import secrets
-import time
-from typing import Optional, List, Dict
+import threading
+from collections import deque
 from datetime import datetime
+from typing import Callable, Deque, Optional, List, Dict, Tuple
 
 from models.game_models import (
     Game, GameState, Player, PlayerStatus,
     Commitment, Variation, FinalSubmission, VRFResult
 )
+from blockchain.ledger import LedgerBackend
 from blockchain.mock_blockchain import MockBlockchain
+from blockchain.tx_record import TxRecord
+from blockchain.block_store import BlockStore
+from blockchain.chain_archive import ChainArchive
 from blockchain.vrf_simulator import VRFSimulator
+from blockchain.vrf_oracle import VRFOracle
 from blockchain.smart_contract import SmartContract
 from crypto.number_derivation import (
     derive_numbers_from_seed,
     derive_function_coefficients,
     derive_function_bias,
-    calculate_validation_function
+    calculate_validation_function,
+    calculate_validation_function_batch
 )
 from crypto.crypto_engine import CryptoEngine
+from crypto.homomorphic import HomomorphicEngine
+from utils.clock import Clock, get_clock
+from utils.locks import StripedLock
+from utils.timer_wheel import TimerWheel
+from storage.game_store import GameStore
+from storage.game_archive import GameArchive
+
+logger = logging.getLogger(__name__)
+
+
+def _game_locked(method):
+    """Esegue un metodo `(self, game_id, ...)` sotto il lock del gioco e lo segna da persistere"""
+    @functools.wraps(method)
+    def wrapper(self, game_id: str, *args, **kwargs):
+        with self.game_locks(game_id):
+            try:
+                return method(self, game_id, *args, **kwargs)
+            finally:
+                # Anche un errore a metà può aver cambiato stato (es. XPF già bruciati)
+                self._persist(game_id)
+    return wrapper
 
 
 class GameManager:
     """Gestisce l'intero ciclo di vita del gioco"""
 
-    def __init__(self):
-        self.blockchain = MockBlockchain()
-        self.vrf = VRFSimulator()
-        self.contract = SmartContract()
+    def __init__(
+        self,
+        block_interval: Optional[float] = None,
+        max_block_txs: int = 500,
+        block_gas_limit: int = 30_000_000,
+        mempool_size: int = 10000,
+        chain_dir: Optional[str] = None,
+        prune_depth: Optional[int] = None,
+        memory_budget_bytes: Optional[int] = None,
+        archive_dir: Optional[str] = None,
+        clock: Optional[Clock] = None,
+        ledger: Optional[LedgerBackend] = None,
+        vrf_latency: float = 0.5,
+        vrf_batch_window: float = 0.0,
+        vrf_max_batch: int = 256,
+        db_path: Optional[str] = None,
+        contract: Optional[SmartContract] = None,
+        completed_ttl: Optional[float] = None,
+        max_hot_completed: Optional[int] = None,
+        game_archive_dir: Optional[str] = None,
+        archive_cache_size: int = 256,
+        registration_timeout: Optional[float] = None,
+        commitment_timeout: Optional[float] = None,
+        playing_timeout: Optional[float] = None,
+        timeout_tick: float = 1.0
+    ):
+        # Con block_interval le tx vengono incluse dal block producer in background
+        # Con chain_dir i blocchi sono persistiti su disco e sopravvivono ai riavvii
+        # Con prune_depth solo la finestra recente resta in memoria, il resto
+        # viene ripiegato in snapshot + segmenti compressi in archive_dir
+        # Con un VirtualClock le attese simulate sono istantanee e i thread in background
+        # (oracolo VRF, pulizia, block producer) seguono il tempo virtuale senza farlo avanzare
+        # Con ledger (es. JsonRpcLedger) le opzioni della chain simulata sono ignorate
+        # Con db_path giochi e balance sono salvati in SQLite e ripresi al riavvio
+        # Con completed_ttl / max_hot_completed i giochi conclusi lasciano la memoria
+        # per l'archivio compresso in game_archive_dir (get_game li trova comunque)
+        # Con i timeout di fase chi non agisce in tempo diventa TIMED_OUT e il gioco prosegue
+        self.clock = clock or get_clock()
+        self.archive = ChainArchive(archive_dir) if archive_dir else None
+        self.blockchain: LedgerBackend = ledger or MockBlockchain(
+            block_interval=block_interval,
+            max_block_txs=max_block_txs,
+            block_gas_limit=block_gas_limit,
+            mempool_size=mempool_size,
+            store=BlockStore(chain_dir) if chain_dir else None,
+            prune_depth=prune_depth,
+            memory_budget_bytes=memory_budget_bytes,
+            archive=self.archive,
+            clock=self.clock
+        )
+        self.vrf = VRFSimulator(clock=self.clock)
+        # Le richieste VRF sono evase in background: register_player non aspetta l'oracolo
+        # Le richieste in coda insieme (o entro vrf_batch_window) sono evase in un solo blocco
+        self.oracle = VRFOracle(
+            self._fulfill_randomness_batch,
+            latency=vrf_latency,
+            window=vrf_batch_window,
+            max_batch=vrf_max_batch,
+            clock=self.clock
+        )
+        # Listener (game_id, evento) chiamati dai thread in background (es. VRF evaso)
+        self.listeners: List[Callable[[str, Dict], None]] = []
+        # Uno shard passa un contratto che inoltra gli XPF altrui allo shard proprietario
+        self.contract = contract or SmartContract(clock=self.clock)
         self.crypto = CryptoEngine()
 
         # Storage in-memory (in produzione useremmo database)
+        # Ogni mutazione prende il lock del proprio gioco: giochi diversi
+        # procedono in parallelo. Ordine dei lock: gioco -> indirizzo XPF -> chain
+        self.game_locks = StripedLock(256)
         self.games: Dict[str, Game] = {}
         self.active_game_id: Optional[str] = None
 
+        # Header della chain già in headers.jsonl (compresi quelli ripristinati al riavvio)
+        self._archived_headers = 0
+        self._snapshot_lock = threading.Lock()
+        # Il pruning esiste solo sulla chain simulata
+        if isinstance(self.blockchain, MockBlockchain):
+            self.blockchain.prune_listeners.append(self._on_blocks_pruned)
+            self._archived_headers = len(self.blockchain.headers)
+        if self.archive:
+            snapshot = self.archive.load_latest_snapshot()
+            if snapshot:
+                self.contract.xpf_balances.update(snapshot["balances"])
+
+        if (completed_ttl is not None or max_hot_completed is not None) and not game_archive_dir:
+            raise ValueError("Completed game eviction requires game_archive_dir")
+        self.game_archive = GameArchive(game_archive_dir, cache_size=archive_cache_size) \
+            if game_archive_dir else None
+        self.completed_ttl = completed_ttl
+        self.max_hot_completed = max_hot_completed
+        # Giochi conclusi ancora in memoria, in ordine di completamento: (time, game_id)
+        self._completed: Deque[Tuple[float, str]] = deque()
+        self._evict_lock = threading.Lock()
+
+        # Durata di ogni fase con scadenza; le scadenze pendenti vivono in una timer wheel
+        self.phase_timeouts: Dict[GameState, float] = {
+            status: timeout for status, timeout in (
+                (GameState.REGISTERING, registration_timeout),
+                (GameState.RANDOMNESS_FULFILLED, commitment_timeout),
+                (GameState.PLAYING, playing_timeout)
+            ) if timeout is not None
+        }
+        self.timeouts = TimerWheel(tick=timeout_tick, clock=self.clock) if self.phase_timeouts else None
+        # Thread di pulizia: ogni timeout_tick chiude le fasi scadute e archivia i conclusi
+        self.sweep_interval = timeout_tick
+        self._sweep_stop = threading.Event()
+        self._sweep_thread: Optional[threading.Thread] = None
+
+        self.store = GameStore(db_path) if db_path else None
+        if self.store:
+            self._resume_from_store()
+            self.store.start(self.games, self.contract.xpf_balances, self.game_locks)
+
+        if self.timeouts is not None or self.game_archive is not None:
+            self._sweep_thread = threading.Thread(target=self._run_sweeps, name="game-sweeps", daemon=True)
+            self._sweep_thread.start()
+
+    def subscribe(self, listener: Callable[[str, Dict], None]):
+        """Registra un listener degli eventi di gioco"""
+        self.listeners.append(listener)
+
+    def _notify(self, game_id: str, event: Dict):
+        for listener in self.listeners:
+            listener(game_id, event)
+
+    def close(self):
+        """Evade le richieste VRF pendenti, salva lo stato e chiude la chain"""
+        if self._sweep_thread is not None:
+            self._sweep_stop.set()
+            self._sweep_thread.join()
+            self._sweep_thread = None
+        self.oracle.stop()
+        if self.store:
+            self.store.close()
+        if self.game_archive:
+            self.game_archive.close()
+        self.blockchain.close()
+
+    # ==================== PERSISTENZA ====================
+
+    def _persist(self, game_id: str):
+        """Segna il gioco e i balance dei suoi giocatori per il prossimo flush"""
+        if self.store is None:
+            return
+        game = self.games.get(game_id)
+        if game is not None:
+            self.store.mark_game(game_id, [player.address for player in game.players])
+
+    def _resume_from_store(self):
+        """
+        Ricarica i giochi in corso e i balance; le richieste VRF in attesa tornano all'oracolo
+
+        I giochi conclusi restano nello store e get_game li legge su richiesta;
+        con un archivio tornano in coda per evict_completed (solo id e completamento).
+        """
+        for game in self.store.load_games(status for status in GameState if status != GameState.COMPLETED):
+            self.games[game.game_id] = game
+            self.contract.games[game.game_id] = game
+        if self.game_archive is not None:
+            self._completed.extend(self.store.load_completed())
+        # Lo store è più recente dello snapshot dell'archivio
+        self.contract.xpf_balances.update(self.store.load_balances())
+        active_game_id = self.store.get_meta("active_game_id")
+        if active_game_id and self.get_game_status(active_game_id) is not None:
+            self.active_game_id = active_game_id
+
+        for game in self.games.values():
+            if game.status == GameState.AWAITING_RANDOMNESS:
+                if game.vrf_request_id is None:
+                    game.vrf_request_id = self.vrf.request_randomness(game.game_id)
+                self.oracle.submit(game.game_id, game.vrf_request_id)
+            elif self.timeouts is not None and game.status in self.phase_timeouts:
+                # Scadenza salvata; timeout appena attivati partono da ora
+                if game.phase_deadline is None:
+                    self._schedule_timeout(game)
+                else:
+                    self.timeouts.schedule(game.game_id, game.phase_deadline.timestamp(), game.status)
+
+    # ==================== CICLO DI VITA ====================
+
+    def evict_completed(self) -> int:
+        """
+        Sposta nell'archivio i giochi conclusi oltre il TTL (o oltre max_hot_completed)
+
+        Chiamato a ogni create_game e dal thread di pulizia: costa O(1) se non c'è nulla da spostare.
+        Ritorna il numero di giochi archiviati.
+        """
+        if self.game_archive is None or not self._evict_lock.acquire(blocking=False):
+            return 0
+        try:
+            deadline = self.clock.time() - self.completed_ttl if self.completed_ttl is not None else None
+            game_ids = []
+            while self._completed:
+                completed_at, game_id = self._completed[0]
+                expired = deadline is not None and completed_at <= deadline
+                over_cap = self.max_hot_completed is not None and len(self._completed) > self.max_hot_completed
+                if not (expired or over_cap):
+                    break
+                self._completed.popleft()
+                game_ids.append(game_id)
+            if not game_ids:
+                return 0
+
+            # Serializza sotto il lock del gioco; la scrittura su disco avviene senza lock
+            records = []
+            for game_id in game_ids:
+                with self.game_locks(game_id):
+                    game = self.games.get(game_id)
+                    if game is None and self.store:
+                        # Concluso prima di un riavvio: mai caricato in memoria
+                        game = self.store.load_game(game_id)
+                    if game is not None:
+                        records.append((game_id, game.model_dump_json()))
+            self.game_archive.write(records)
+
+            # Solo ora, con l'archivio su disco, il gioco lascia memoria e store
+            for game_id, _ in records:
+                with self.game_locks(game_id):
+                    self.games.pop(game_id, None)
+                    self.contract.games.pop(game_id, None)
+            if self.store:
+                self.store.forget_games(game_id for game_id, _ in records)
+            return len(records)
+        finally:
+            self._evict_lock.release()
+
+    def _track_completed(self, game_id: str):
+        """Accoda un gioco appena concluso per evict_completed (solo se c'è un archivio)"""
+        if self.game_archive is not None:
+            self._completed.append((self.clock.time(), game_id))
+
+    # ==================== BLOCKCHAIN ====================
+
+    def _create_transaction(self, from_address: str, function_name: str, params: Dict, **kwargs) -> TxRecord:
+        """Tx del gioco: il contratto è già cambiato, quindi il ledger non può rifiutarla per mempool piena"""
+        return self.blockchain.create_transaction(
+            from_address=from_address,
+            function_name=function_name,
+            params=params,
+            system=True,
+            **kwargs
+        )
+
+    def _commit_transaction(self, game: Game, tx: TxRecord):
+        """
+        Registra la tx nel gioco e la fa includere in un blocco
+
+        Se il block producer è attivo la tx resta pending e viene sigillata
+        in background insieme alle altre; altrimenti mina subito un blocco.
+        """
+        self._record_transaction(game, tx)
+        self._seal_transactions([tx])
+
+    def _record_transaction(self, game: Game, tx: TxRecord):
+        game.tx_hashes.append(tx.tx_hash)
+
+    def _seal_transactions(self, txs: List[TxRecord]):
+        """
+        Mina le tx pending, a meno che non lo faccia già il block producer
+
+        Prima attende l'invio delle proprie tx (ledger in pipeline): un rifiuto
+        arriva a questo chiamante, non a chi mina o fa flush per altri.
+        """
+        for tx in txs:
+            if tx.submission is not None:
+                tx.submission.result()
+        if not self.blockchain.producer_running:
+            self.blockchain.mine_block()
+
+    def _on_blocks_pruned(self, pruned_below: int):
+        """
+        Ripiega nello snapshot lo stato dei blocchi potati
+
+        I giochi conclusi con tutte le tx sotto `pruned_below` perdono la lista
+        degli hash delle transazioni (restano nello store/archivio); balances, risultati
+        e header chain finiscono nello snapshot. Chiamato fuori dal lock della chain.
+        """
+        results = {}
+        # Copia: altri thread possono creare giochi durante il pruning
+        for game in list(self.games.values()):
+            if game.status != GameState.COMPLETED:
+                continue
+            # Chi mina può tenere il lock di un altro gioco: niente attese,
+            # un gioco occupato viene ripulito al pruning successivo
+            lock = self.game_locks(game.game_id)
+            if lock.acquire(blocking=False):
+                try:
+                    if game.tx_hashes and not self.blockchain.is_resident(game.tx_hashes[-1]):
+                        game.tx_hashes = []
+                        self._persist(game.game_id)
+                finally:
+                    lock.release()
+            results[game.game_id] = {
+                "winner": game.winner,
+                "winning_output": game.winning_output,
+                "completed_at": game.completed_at
+            }
+
+        if self.archive:
+            # Il mining può notificare da più thread: uno snapshot alla volta
+            with self._snapshot_lock:
+                self.archive.write_snapshot(pruned_below, {
+                    "balances": dict(self.contract.xpf_balances),
+                    "game_results": results
+                })
+                # Solo gli header potati in questo round: i precedenti sono già nel file
+                headers = self.blockchain.headers
+                self.archive.append_headers([header.to_dict() for header in headers[self._archived_headers:]])
+                self._archived_headers = len(headers)
+
     # ==================== FASE 0: SETUP ====================
 
-    def create_game(self, max_players: int = 3) -> Game:
-        """Crea un nuovo gioco"""
-        game_id = f"game_{secrets.token_hex(8)}"
+    def create_game(self, max_players: int = 3, game_id: Optional[str] = None) -> Game:
+        """Crea un nuovo gioco (il router degli shard sceglie lui il game_id)"""
+        game_id = game_id or f"game_{secrets.token_hex(8)}"
 
         game = Game(
             game_id=game_id,
             status=GameState.REGISTERING,
             max_players=max_players,
-            created_at=datetime.now()
+            created_at=self.clock.now()
         )
 
-        self.games[game_id] = game
-        self.contract.games[game_id] = game
-        self.active_game_id = game_id
-
-        # Transazione blockchain simulata
-        tx = self.blockchain.create_transaction(
-            from_address="0xGameFactory",
-            function_name="createGame",
-            params={"game_id": game_id, "max_players": max_players}
-        )
-        self.blockchain.mine_block()
-        game.transactions.append(tx)
+        # Il gioco è visibile dopo l'inserimento: createGame resta la prima tx
+        with self.game_locks(game_id):
+            self.games[game_id] = game
+            self.contract.games[game_id] = game
+            self.active_game_id = game_id
+            self._schedule_timeout(game)
+
+            # Transazione blockchain simulata
+            tx = self._create_transaction(
+                from_address="0xGameFactory",
+                function_name="createGame",
+                params={"game_id": game_id, "max_players": max_players}
+            )
+            self._commit_transaction(game, tx)
+            self._persist(game_id)
+            if self.store:
+                self.store.set_meta("active_game_id", game_id)
 
+        self.evict_completed()
         return game
 
+    @_game_locked
     def register_player(self, game_id: str, player_address: str) -> Player:
         """Registra un giocatore"""
         game = self.games.get(game_id)
@@ -74,13 +412,12 @@ class GameManager:
         self.contract.register_player(game_id, player_address)
 
         # Transazione blockchain
-        tx = self.blockchain.create_transaction(
+        tx = self._create_transaction(
             from_address=player_address,
             function_name="register",
             params={"game_id": game_id}
         )
-        self.blockchain.mine_block()
-        game.transactions.append(tx)
+        self._commit_transaction(game, tx)
 
         player = game.get_player(player_address)
 
@@ -96,60 +433,102 @@ class GameManager:
         """Richiede casualità a VRF"""
         game = self.games[game_id]
         game.status = GameState.AWAITING_RANDOMNESS
+        self._schedule_timeout(game)
 
         # VRF request
         request_id = self.vrf.request_randomness(game_id)
+        game.vrf_request_id = request_id
 
         # Transazione
-        tx = self.blockchain.create_transaction(
+        tx = self._create_transaction(
             from_address="0xGameContract",
             function_name="requestRandomness",
             params={"game_id": game_id, "request_id": request_id},
             to_address="0xChainlinkVRF"
         )
-        self.blockchain.mine_block()
-        game.transactions.append(tx)
+        self._commit_transaction(game, tx)
 
-        # Simula fulfillment asincrono (in realtà sincrono per demo)
-        time.sleep(0.5)  # Simula latenza
-        self._fulfill_randomness(game_id, request_id)
+        # L'oracolo chiamerà _fulfill_randomness dopo la sua latenza
+        self.oracle.submit(game_id, request_id)
 
     def _fulfill_randomness(self, game_id: str, request_id: str):
-        """Fulfill VRF (chiamato da "Chainlink")"""
-        game = self.games[game_id]
+        """Fulfill VRF di un singolo gioco"""
+        self._fulfill_randomness_batch([(game_id, request_id)])
+
+    def _fulfill_randomness_batch(self, requests: List[Tuple[str, str]]):
+        """
+        Fulfill VRF di più giochi (callback dell'oracolo "Chainlink", gira nel suo thread)
+
+        Una sola proof per tutto il batch e un solo blocco con le tx di fulfillment;
+        ogni gioco riceve comunque il proprio seed e i seed dei suoi giocatori.
+        """
+        with self.game_locks.many(game_id for game_id, _ in requests):
+            self._fulfill_randomness_locked(requests)
+
+    def _fulfill_randomness_locked(self, requests: List[Tuple[str, str]]):
+        games = []
+        pending = []
+        for game_id, request_id in requests:
+            game = self.games.get(game_id)
+            if game is not None and game.status == GameState.AWAITING_RANDOMNESS:
+                games.append(game)
+                pending.append((request_id, game_id))
+        if not games:
+            return
 
         # VRF genera seed + proof
-        vrf_result = self.vrf.fulfill_randomness(request_id, game_id)
-        vrf_result.block_number = self.blockchain.current_block_number
+        vrf_results = self.vrf.fulfill_randomness_batch(pending)
+        block_number = self.blockchain.current_block_number
 
-        game.vrf_result = vrf_result
+        txs = []
+        for game, vrf_result in zip(games, vrf_results):
+            vrf_result.block_number = block_number
+            game.vrf_result = vrf_result
 
-        # Deriva seed per ogni giocatore
-        for player in game.players:
-            player.seed_player = self.vrf.derive_player_seed(
+            # Deriva seed per ogni giocatore
+            seeds = self.vrf.derive_player_seeds(
                 vrf_result.seed_game,
-                player.address,
-                game_id
+                [player.address for player in game.players],
+                game.game_id
             )
-
-        game.status = GameState.RANDOMNESS_FULFILLED
-        game.started_at = datetime.now()
-
-        # Transazione fulfillment
-        tx = self.blockchain.create_transaction(
-            from_address="0xChainlinkVRF",
-            function_name="fulfillRandomness",
-            params={
-                "game_id": game_id,
-                "seed": vrf_result.seed_game,
-                "proof": vrf_result.proof
-            }
-        )
-        self.blockchain.mine_block()
-        game.transactions.append(tx)
+            for player, seed in zip(game.players, seeds):
+                player.seed_player = seed
+
+            # Transazione fulfillment (una per gioco, per log e ricevute)
+            tx = self._create_transaction(
+                from_address="0xChainlinkVRF",
+                function_name="fulfillRandomness",
+                params={
+                    "game_id": game.game_id,
+                    "seed": vrf_result.seed_game,
+                    "proof": vrf_result.proof,
+                    "batch_root": vrf_result.batch_root
+                }
+            )
+            self._record_transaction(game, tx)
+            txs.append(tx)
+
+        # Un solo blocco per tutto il batch
+        self._seal_transactions(txs)
+
+        # Lo stato cambia per ultimo: chi lo vede trova già i seed dei giocatori
+        started_at = self.clock.now()
+        for game in games:
+            game.started_at = started_at
+            game.status = GameState.RANDOMNESS_FULFILLED
+            self._schedule_timeout(game)
+            self._persist(game.game_id)
+
+            self._notify(game.game_id, {
+                "type": "randomness_fulfilled",
+                "game_id": game.game_id,
+                "status": game.status.value,
+                "block_number": block_number
+            })
 
     # ==================== FASE 2: COMMITMENT ====================
 
+    @_game_locked
     def submit_commitment(
         self,
         game_id: str,
@@ -172,7 +551,7 @@ class GameManager:
             public_key=public_key,
             encrypted_numbers_hash=encrypted_numbers_hash,
             zk_proof=zk_proof,
-            timestamp=datetime.now(),
+            timestamp=self.clock.now(),
             tx_hash=""
         )
 
@@ -180,7 +559,7 @@ class GameManager:
         self.contract.submit_commitment(game_id, player_address, commitment)
 
         # Transazione blockchain
-        tx = self.blockchain.create_transaction(
+        tx = self._create_transaction(
             from_address=player_address,
             function_name="submitCommitment",
             params={
@@ -188,9 +567,8 @@ class GameManager:
                 "commitment_hash": commitment_hash
             }
         )
-        self.blockchain.mine_block()
+        self._commit_transaction(game, tx)
         commitment.tx_hash = tx.tx_hash
-        game.transactions.append(tx)
 
         # Se tutti hanno committato, genera funzione
         if game.all_committed():
@@ -219,9 +597,10 @@ class GameManager:
 
         # Dopo poco, passa a PLAYING
         game.status = GameState.PLAYING
+        self._schedule_timeout(game)
 
         # Transazione
-        tx = self.blockchain.create_transaction(
+        tx = self._create_transaction(
             from_address="0xGameContract",
             function_name="generateFunction",
             params={
@@ -229,11 +608,11 @@ class GameManager:
                 "seed_function": seed_function
             }
         )
-        self.blockchain.mine_block()
-        game.transactions.append(tx)
+        self._commit_transaction(game, tx)
 
     # ==================== FASE 4: VARIATIONS ====================
 
+    @_game_locked
     def request_variation(self, game_id: str, player_address: str) -> Dict:
         """Giocatore richiede generazione variazione"""
         game = self.games[game_id]
@@ -243,22 +622,23 @@ class GameManager:
         self.contract.request_variation(game_id, player_address)
 
         # Transazione
-        tx = self.blockchain.create_transaction(
+        tx = self._create_transaction(
             from_address=player_address,
             function_name="requestVariation",
             params={"game_id": game_id}
         )
-        self.blockchain.mine_block()
-        game.transactions.append(tx)
+        self._commit_transaction(game, tx)
 
         variation_index = len(player.variations)
 
         return {
             "variation_index": variation_index,
             "tx_hash": tx.tx_hash,
-            "xpf_remaining": self.contract.get_xpf_balance(player_address)
+            # Saldo aggiornato dal contratto dopo il burn (con gli shard evita un round trip)
+            "xpf_remaining": player.xpf_balance
         }
 
+    @_game_locked
     def compute_variation(
         self,
         game_id: str,
@@ -274,9 +654,146 @@ class GameManager:
         game = self.games[game_id]
         player = game.get_player(player_address)
 
+        if game.status != GameState.PLAYING:
+            raise ValueError("Not in playing phase")
         if not game.function_coefficients:
             raise ValueError("Function not generated yet")
+        if player is None:
+            raise ValueError("Player not registered")
+        # Ogni variazione calcolata deve essere stata pagata con request_variation
+        if len(player.variations) >= player.variations_requested:
+            raise ValueError("No paid variation to compute")
 
+        deltas, new_numbers = self._vary(current_numbers)
+
+        # Calcola output
+        output = calculate_validation_function(
+            new_numbers,
+            game.function_coefficients,
+            game.function_bias
+        )
+
+        result = self._record_variation(player, deltas, new_numbers, output)
+        result["xpf_remaining"] = player.xpf_balance
+        return result
+
+    @_game_locked
+    def compute_variation_encrypted(
+        self,
+        game_id: str,
+        player_address: str,
+        encrypted_state: List[str]
+    ) -> Dict:
+        """
+        Server calcola una variazione sui numeri cifrati (Paillier)
+
+        I numeri sono cifrati con la chiave pubblica del commitment: il server
+        somma i delta e calcola F senza decifrare; il client decifra stato e
+        output con la chiave privata.
+        """
+        game = self.games[game_id]
+        player = game.get_player(player_address)
+
+        if game.status != GameState.PLAYING:
+            raise ValueError("Not in playing phase")
+        if not game.function_coefficients:
+            raise ValueError("Function not generated yet")
+        if player is None:
+            raise ValueError("Player not registered")
+        if player.commitment is None or not HomomorphicEngine.is_public_key(player.commitment.public_key):
+            raise ValueError("Commitment key is not a Paillier public key")
+        if len(encrypted_state) != len(game.function_coefficients):
+            raise ValueError("Invalid encrypted state")
+        if len(player.variations) >= player.variations_requested:
+            raise ValueError("No paid variation to compute")
+
+        public_key = player.commitment.public_key
+        deltas = [secrets.randbelow(41) - 20 for _ in range(len(encrypted_state))]
+        new_state = HomomorphicEngine.apply_delta_to_encrypted(encrypted_state, deltas, public_key)
+        encrypted_output = HomomorphicEngine.compute_output_on_encrypted(
+            new_state,
+            game.function_coefficients,
+            game.function_bias,
+            public_key
+        )
+
+        variation_index = len(player.variations)
+        player.variations.append(Variation(
+            variation_index=variation_index,
+            encrypted_state=new_state,
+            encrypted_output=encrypted_output,
+            timestamp=self.clock.now()
+        ))
+
+        return {
+            "variation_index": variation_index,
+            "encrypted_state": new_state,
+            "encrypted_output": encrypted_output,
+            "deltas": deltas,
+            "xpf_remaining": player.xpf_balance
+        }
+
+    @_game_locked
+    def request_variations(
+        self,
+        game_id: str,
+        player_address: str,
+        current_numbers: List[int],
+        count: int
+    ) -> Dict:
+        """
+        Richiede e calcola `count` variazioni insieme: un burn, una tx, un blocco
+
+        Equivale a `count` coppie request_variation + compute_variation in cui
+        ogni variazione parte dai numeri della precedente; gli output sono
+        calcolati in un solo passaggio.
+        """
+        game = self.games.get(game_id)
+        if game is None:
+            raise ValueError("Game not found")
+        # Input validati prima del burn: un rifiuto non deve costare XPF né una tx
+        if game.status != GameState.PLAYING:
+            raise ValueError("Not in playing phase")
+        if not game.function_coefficients:
+            raise ValueError("Function not generated yet")
+        if len(current_numbers) != len(game.function_coefficients):
+            raise ValueError("Invalid current numbers")
+
+        # Smart contract verifica e burn di tutti gli XPF (o nessuno)
+        self.contract.request_variations(game_id, player_address, count)
+
+        player = game.get_player(player_address)
+
+        tx = self._create_transaction(
+            from_address=player_address,
+            function_name="requestVariations",
+            params={"game_id": game_id, "count": count}
+        )
+        self._commit_transaction(game, tx)
+
+        steps = []
+        numbers = current_numbers
+        for _ in range(count):
+            deltas, numbers = self._vary(numbers)
+            steps.append((deltas, numbers))
+
+        outputs = calculate_validation_function_batch(
+            [numbers for _, numbers in steps],
+            game.function_coefficients,
+            game.function_bias
+        )
+
+        return {
+            "variations": [
+                self._record_variation(player, deltas, numbers, output)
+                for (deltas, numbers), output in zip(steps, outputs)
+            ],
+            "tx_hash": tx.tx_hash,
+            "xpf_remaining": player.xpf_balance
+        }
+
+    def _vary(self, current_numbers: List[int]) -> Tuple[List[int], List[int]]:
+        """Delta casuali e numeri risultanti di una variazione"""
         # Genera delta casuali ±20
         deltas = [secrets.randbelow(41) - 20 for _ in range(10)]  # -20 to +20
 
@@ -285,14 +802,10 @@ class GameManager:
             max(0, min(1000, num + delta))
             for num, delta in zip(current_numbers, deltas)
         ]
+        return deltas, new_numbers
 
-        # Calcola output
-        output = calculate_validation_function(
-            new_numbers,
-            game.function_coefficients,
-            game.function_bias
-        )
-
+    def _record_variation(self, player: Player, deltas: List[int], new_numbers: List[int], output: int) -> Dict:
+        """Aggiunge la variazione al giocatore e ritorna il risultato per il client"""
         # In produzione: encrypted_output, encrypted_new_numbers
         # Per demo: ritorniamo output in chiaro + numeri cifrati (simulati)
 
@@ -306,7 +819,7 @@ class GameManager:
             variation_index=variation_index,
             encrypted_state=encrypted_new_numbers,
             encrypted_output=encrypted_output,
-            timestamp=datetime.now()
+            timestamp=self.clock.now()
         )
 
         player.variations.append(variation)
@@ -321,6 +834,7 @@ class GameManager:
 
     # ==================== FASE 5: FINAL SUBMISSION ====================
 
+    @_game_locked
     def submit_final_choice(
         self,
         game_id: str,
@@ -339,7 +853,7 @@ class GameManager:
             encrypted_state_hash=encrypted_state_hash,
             variations_count=variations_count,
             zk_proof=zk_proof,
-            timestamp=datetime.now(),
+            timestamp=self.clock.now(),
             tx_hash=""
         )
 
@@ -347,7 +861,7 @@ class GameManager:
         self.contract.submit_final_choice(game_id, player_address, submission)
 
         # Transazione
-        tx = self.blockchain.create_transaction(
+        tx = self._create_transaction(
             from_address=player_address,
             function_name="submitFinalChoice",
             params={
@@ -356,9 +870,8 @@ class GameManager:
                 "variations_count": variations_count
             }
         )
-        self.blockchain.mine_block()
+        self._commit_transaction(game, tx)
         submission.tx_hash = tx.tx_hash
-        game.transactions.append(tx)
 
         # Se tutti hanno submitted, determina vincitore
         if game.all_submitted():
@@ -375,7 +888,7 @@ class GameManager:
         game = self.games[game_id]
 
         # Transazione
-        tx = self.blockchain.create_transaction(
+        tx = self._create_transaction(
             from_address="0xGameContract",
             function_name="determineWinner",
             params={
@@ -384,8 +897,7 @@ class GameManager:
                 "winning_output": game.winning_output
             }
         )
-        self.blockchain.mine_block()
-        game.transactions.append(tx)
+        self._commit_transaction(game, tx)
 
         # Distribuisci reward
         self._distribute_rewards(game_id)
@@ -393,10 +905,12 @@ class GameManager:
     def _distribute_rewards(self, game_id: str):
         """Distribuisci reward"""
         self.contract.distribute_rewards(game_id)
+        self._track_completed(game_id)
 
         game = self.games[game_id]
+        self._schedule_timeout(game)
 
-        tx = self.blockchain.create_transaction(
+        tx = self._create_transaction(
             from_address="0xGameContract",
             function_name="distributeRewards",
             params={
@@ -404,19 +918,117 @@ class GameManager:
                 "winner": game.winner
             }
         )
-        self.blockchain.mine_block()
-        game.transactions.append(tx)
+        self._commit_transaction(game, tx)
+
+    # ==================== TIMEOUT DI FASE ====================
+
+    def _schedule_timeout(self, game: Game):
+        """Fissa la scadenza della fase in cui è appena entrato il gioco (o la toglie)"""
+        if self.timeouts is None:
+            return
+        timeout = self.phase_timeouts.get(game.status)
+        if timeout is None:
+            game.phase_deadline = None
+            self.timeouts.cancel(game.game_id)
+            return
+        deadline = self.clock.time() + timeout
+        game.phase_deadline = datetime.fromtimestamp(deadline)
+        self.timeouts.schedule(game.game_id, deadline, game.status)
+
+    def _run_sweeps(self):
+        """Scadenze di fase e archiviazione dei conclusi anche quando non si creano giochi"""
+        # Intervallo sul clock del gioco: con un VirtualClock la pulizia segue il tempo virtuale
+        while not self.clock.wait(self._sweep_stop, self.sweep_interval):
+            try:
+                self.expire_timeouts()
+            except Exception:
+                logger.exception("Phase timeout sweep failed")
+            try:
+                self.evict_completed()
+            except Exception:
+                logger.exception("Completed game eviction failed")
+
+    def expire_timeouts(self) -> int:
+        """
+        Chiude le fasi scadute fino a ora (lo fa già il thread di pulizia a ogni tick)
+
+        Ritorna il numero di giochi toccati.
+        """
+        if self.timeouts is None:
+            return 0
+        expired = self.timeouts.advance()
+        for game_id, phase in expired:
+            self._expire_phase(game_id, phase)
+        return len(expired)
+
+    @_game_locked
+    def _expire_phase(self, game_id: str, phase: GameState):
+        """Esclude chi non ha agito e fa avanzare il gioco come se la fase fosse conclusa"""
+        game = self.games.get(game_id)
+        if game is None or game.status != phase:
+            return  # La fase si è chiusa da sola mentre la scadenza scattava
+
+        timed_out = self.contract.expire_phase(game_id)
+        tx = self._create_transaction(
+            from_address="0xGameContract",
+            function_name="expirePhase",
+            params={"game_id": game_id, "phase": phase.value, "timed_out": timed_out}
+        )
+        self._commit_transaction(game, tx)
+
+        if game.status == GameState.REGISTERING:
+            # Il contratto ha ridotto max_players ai presenti: il gioco è pieno
+            self._request_randomness(game_id)
+        elif game.status == GameState.ALL_COMMITTED:
+            self._generate_function(game_id)
+        elif game.status == GameState.ALL_SUBMITTED:
+            self._determine_winner(game_id)
+        else:
+            # Nessuno ha agito: chiuso senza vincitore
+            self._track_completed(game_id)
+            self._schedule_timeout(game)
+
+        self._notify(game_id, {
+            "type": "phase_timeout",
+            "game_id": game_id,
+            "phase": phase.value,
+            "timed_out": timed_out,
+            "status": game.status.value
+        })
 
     # ==================== QUERY METHODS ====================
 
-    def get_game(self, game_id: str) -> Optional[Game]:
-        """Ottieni stato gioco"""
-        return self.games.get(game_id)
+    def get_game(self, game_id: str, from_disk: bool = True) -> Optional[Game]:
+        """
+        Ottieni stato gioco (i conclusi fuori memoria sono letti da archivio o store)
+
+        Con from_disk=False non tocca il disco: un concluso fuori dalla cache
+        dell'archivio ritorna None (get_game_status dice se esiste).
+        """
+        game = self.games.get(game_id)
+        if game is not None:
+            return game
+        if self.game_archive is not None:
+            game = self.game_archive.get(game_id) if from_disk else self.game_archive.get_cached(game_id)
+        if game is None and self.store is not None and from_disk:
+            game = self.store.load_game(game_id)
+        return game
+
+    def get_game_status(self, game_id: str) -> Optional[GameState]:
+        """Solo lo stato del gioco, senza decodificare giochi da archivio o store"""
+        game = self.games.get(game_id)
+        if game is not None:
+            return game.status
+        if self.game_archive is not None and game_id in self.game_archive:
+            return GameState.COMPLETED  # Si archiviano solo i giochi conclusi
+        if self.store is not None:
+            return self.store.get_status(game_id)
+        return None
 
     def get_active_game(self) -> Optional[Game]:
         """Ottieni gioco attivo"""
         if self.active_game_id:
-            return self.games.get(self.active_game_id)
+            return self.get_game(self.active_game_id)
         return None
 
     def get_player_xpf(self, player_address: str) -> int:
@@ -424,5 +1036,8 @@ class GameManager:
         return self.contract.get_xpf_balance(player_address)
 
     def get_all_games(self) -> List[Game]:
-        """Ottieni tutti i giochi"""
+        """Ottieni tutti i giochi in memoria (gli archiviati solo per id)"""
         return list(self.games.values())
+
+    def count_games(self) -> int:
+        return len(self.games)
@@ -0,0 +1,238 @@
+"""
+Matchmaking - Coda di giocatori che forma i giochi al posto della lobby unica
+
+I giocatori entrano in coda (opzionalmente divisi in bucket per skill e XPF);
+appena un bucket ha `max_players` giocatori il server crea il gioco e li
+registra. Ogni bucket è un heap ordinato per arrivo: enqueue e dequeue sono
+O(log n) anche con migliaia di giocatori in attesa.
+"""
+import heapq
+import itertools
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from blockchain.smart_contract import PlayerNotEligible, SmartContract
+from models.game_models import GameState, MatchStatus, MatchTicket
+from utils.clock import Clock, get_clock
+
+# Chiave del bucket: (fascia di skill, fascia di XPF); None = non usata
+BucketKey = Tuple[Optional[int], Optional[int]]
+
+
+class Matchmaker:
+    """
+    Coda di matchmaking davanti a GameManager (o ShardRouter)
+
+    I gruppi completi sono tolti dalla coda sotto un lock breve; creazione
+    del gioco e registrazioni avvengono fuori dal lock, nel thread della
+    richiesta che ha completato il gruppo: più giochi si riempiono in parallelo.
+    """
+
+    def __init__(
+        self,
+        manager,
+        max_players: int = 3,
+        skill_bucket_size: Optional[int] = None,
+        xpf_bucket_size: Optional[int] = None,
+        ticket_ttl: float = 600.0,
+        clock: Optional[Clock] = None
+    ):
+        """
+        Args:
+            manager: GameManager o ShardRouter
+            max_players: Giocatori per gioco
+            skill_bucket_size: Ampiezza delle fasce di skill (None = ignora la skill)
+            xpf_bucket_size: Ampiezza delle fasce di balance XPF (None = ignora gli XPF)
+            ticket_ttl: Secondi per cui un ticket concluso (MATCHED/FAILED/CANCELLED) resta leggibile
+            clock: Clock per l'ordine di arrivo
+        """
+        self.manager = manager
+        self.max_players = max_players
+        self.skill_bucket_size = skill_bucket_size
+        self.xpf_bucket_size = xpf_bucket_size
+        self.ticket_ttl = ticket_ttl
+        self.clock = clock or get_clock()
+
+        self._lock = threading.Lock()
+        self._sequence = itertools.count()
+        # Heap per bucket di (arrivo, sequenza, indirizzo); i cancellati restano
+        # nell'heap e vengono scartati quando arrivano in cima
+        self._heaps: Dict[BucketKey, List[Tuple[float, int, str]]] = {}
+        self._sizes: Dict[BucketKey, int] = {}
+        self._queued: Dict[str, Tuple[int, BucketKey]] = {}  # indirizzo -> (sequenza valida, bucket)
+        self._tickets: Dict[str, MatchTicket] = {}
+        # Ticket conclusi in ordine di chiusura: (istante, ticket), eliminati dopo ticket_ttl
+        self._settled: Deque[Tuple[float, MatchTicket]] = deque()
+        # Giochi con posti rimasti liberi per registrazioni fallite: riempiti per primi
+        self._open_games: Dict[BucketKey, Deque[Tuple[str, int]]] = {}
+
+        self.games_formed = 0
+
+    def _bucket(self, player_address: str, skill: Optional[int]) -> BucketKey:
+        skill_band = None
+        if self.skill_bucket_size and skill is not None:
+            skill_band = skill // self.skill_bucket_size
+        xpf_band = None
+        if self.xpf_bucket_size:
+            # 0 = indirizzo nuovo (riceverà XPF_INITIAL alla registrazione) o senza fondi
+            # (la registrazione fallirà e il ticket diventa FAILED)
+            balance = self.manager.get_player_xpf(player_address) or SmartContract.XPF_INITIAL
+            xpf_band = balance // self.xpf_bucket_size
+        return skill_band, xpf_band
+
+    # ==================== CODA ====================
+
+    def enqueue(self, player_address: str, skill: Optional[int] = None) -> MatchTicket:
+        """
+        Mette in coda un giocatore
+
+        Se il suo arrivo completa un gruppo il gioco viene formato subito e il
+        ticket ritorna già MATCHED con il game_id; altrimenti resta QUEUED.
+        """
+        bucket = self._bucket(player_address, skill)
+        with self._lock:
+            self._expire_tickets()
+            if player_address in self._queued:
+                raise ValueError("Player already queued")
+            sequence = next(self._sequence)
+            heapq.heappush(self._heaps.setdefault(bucket, []), (self.clock.time(), sequence, player_address))
+            self._sizes[bucket] = self._sizes.get(bucket, 0) + 1
+            self._queued[player_address] = (sequence, bucket)
+            ticket = MatchTicket(player_address=player_address, bucket=_bucket_label(bucket))
+            self._tickets[player_address] = ticket
+            groups = self._take_groups(bucket)
+
+        self._fill(bucket, groups)
+        return ticket
+
+    def cancel(self, player_address: str) -> bool:
+        """Toglie un giocatore dalla coda; False se non era in attesa"""
+        with self._lock:
+            queued = self._queued.pop(player_address, None)
+            if queued is None:
+                return False
+            self._sizes[queued[1]] -= 1
+            ticket = self._tickets[player_address]
+            ticket.status = MatchStatus.CANCELLED
+            self._settled.append((self.clock.time(), ticket))
+            return True
+
+    def get_ticket(self, player_address: str) -> Optional[MatchTicket]:
+        with self._lock:
+            self._expire_tickets()
+            return self._tickets.get(player_address)
+
+    def _expire_tickets(self):
+        """Elimina i ticket conclusi da più di ticket_ttl (chiamare sotto _lock)"""
+        deadline = self.clock.time() - self.ticket_ttl
+        while self._settled and self._settled[0][0] <= deadline:
+            _, ticket = self._settled.popleft()
+            # Il giocatore può essere rientrato in coda con un ticket nuovo
+            if self._tickets.get(ticket.player_address) is ticket:
+                del self._tickets[ticket.player_address]
+
+    @property
+    def queued_count(self) -> int:
+        return len(self._queued)
+
+    # ==================== FORMAZIONE GIOCHI ====================
+
+    def _pop(self, bucket: BucketKey) -> MatchTicket:
+        """Primo giocatore ancora in attesa del bucket (chiamare sotto _lock)"""
+        heap = self._heaps[bucket]
+        while True:
+            _, sequence, address = heapq.heappop(heap)
+            queued = self._queued.get(address)
+            if queued is not None and queued[0] == sequence:
+                del self._queued[address]
+                self._sizes[bucket] -= 1
+                return self._tickets[address]
+
+    def _take_groups(self, bucket: BucketKey) -> List[Tuple[Optional[str], List[MatchTicket]]]:
+        """Toglie dalla coda i gruppi pronti: (game_id da completare o None, ticket)"""
+        groups = []
+        open_games = self._open_games.get(bucket)
+        while open_games and self._sizes.get(bucket, 0):
+            game_id, free = open_games.popleft()
+            # Nel frattempo il gioco può essere partito o scaduto
+            if not self._accepts_registrations(game_id):
+                continue
+            taken = min(free, self._sizes[bucket])
+            groups.append((game_id, [self._pop(bucket) for _ in range(taken)]))
+            if taken < free:
+                open_games.appendleft((game_id, free - taken))
+        while self._sizes.get(bucket, 0) >= self.max_players:
+            groups.append((None, [self._pop(bucket) for _ in range(self.max_players)]))
+        return groups
+
+    def _fill(self, bucket: BucketKey, groups: List[Tuple[Optional[str], List[MatchTicket]]]):
+        """
+        Crea i giochi e registra i giocatori (fuori dal lock)
+
+        Ogni ticket estratto dalla coda finisce MATCHED o FAILED, qualunque
+        eccezione sollevi il manager. Un posto torna disponibile solo se la
+        registrazione è fallita per il giocatore (es. XPF insufficienti) e il
+        gioco accetta ancora iscrizioni.
+        """
+        while groups:
+            reopened = []
+            settled = []
+            formed = 0
+            for game_id, tickets in groups:
+                if game_id is None:
+                    try:
+                        game_id = self.manager.create_game(max_players=self.max_players).game_id
+                    except Exception as exc:
+                        for ticket in tickets:
+                            _fail(ticket, exc)
+                        settled.extend(tickets)
+                        continue
+                    formed += 1
+                free = 0
+                for ticket in tickets:
+                    try:
+                        self.manager.register_player(game_id, ticket.player_address)
+                    except Exception as exc:
+                        _fail(ticket, exc)
+                        # Colpa del giocatore: il posto può andare al prossimo in coda
+                        if isinstance(exc, PlayerNotEligible):
+                            free += 1
+                    else:
+                        ticket.game_id = game_id
+                        ticket.matched_at = self.clock.now()
+                        ticket.status = MatchStatus.MATCHED
+                settled.extend(tickets)
+                if free and self._accepts_registrations(game_id):
+                    reopened.append((game_id, free))
+
+            with self._lock:
+                self.games_formed += formed
+                now = self.clock.time()
+                self._settled.extend((now, ticket) for ticket in settled)
+                if not reopened:
+                    return
+                # I posti liberi vanno ai prossimi in coda dello stesso bucket
+                self._open_games.setdefault(bucket, deque()).extend(reopened)
+                groups = self._take_groups(bucket)
+
+    def _accepts_registrations(self, game_id: str) -> bool:
+        try:
+            return self.manager.get_game_status(game_id) == GameState.REGISTERING
+        except Exception:
+            return False
+
+
+def _fail(ticket: MatchTicket, exc: Exception):
+    ticket.status = MatchStatus.FAILED
+    ticket.error = str(exc) or type(exc).__name__
+
+
+def _bucket_label(bucket: BucketKey) -> str:
+    skill_band, xpf_band = bucket
+    parts = []
+    if skill_band is not None:
+        parts.append(f"skill:{skill_band}")
+    if xpf_band is not None:
+        parts.append(f"xpf:{xpf_band}")
+    return ",".join(parts) or "default"
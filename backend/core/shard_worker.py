@@ -0,0 +1,128 @@
+"""
+Shard Worker - Processo che ospita uno shard di giochi
+
+Avviato da ShardRouter con `python -m core.shard_worker`: legge la propria
+configurazione (pickle) da stdin, serve le chiamate del router e degli altri
+shard sul proprio socket e stampa "ready" quando accetta connessioni.
+"""
+import pickle
+import sys
+import threading
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, List, Optional, Tuple
+
+from blockchain.rpc_ledger import JsonRpcLedger
+from core.game_manager import GameManager
+from core.sharding import ShardConnectionPool, ShardContract
+from utils.clock import set_clock
+
+# Metodi di GameManager esposti dagli shard
+_GAME_METHODS = frozenset({
+    "create_game", "register_player", "submit_commitment", "request_variation",
+    "compute_variation", "compute_variation_encrypted", "request_variations", "submit_final_choice",
+    "get_game", "get_game_status", "get_all_games",
+    "get_player_xpf", "count_games"
+})
+_CHAIN_METHODS = frozenset({"get_transaction", "get_receipt", "get_inclusion_proof", "get_logs"})
+_CHAIN_ATTRIBUTES = frozenset({"current_block_number", "pending_count"})
+_XPF_METHODS = frozenset({"mint_xpf", "open_account", "burn_xpf", "get_xpf_balance"})
+
+
+def serve_shard(
+    index: int,
+    addresses: List[str],
+    authkey: bytes,
+    events_address: str,
+    options: Dict,
+    ledger_rpc_url: Optional[str],
+    ledger_options: Dict
+):
+    """Entry point del processo shard"""
+    clock = options.pop("clock", None)
+    if clock is not None:
+        set_clock(clock)
+
+    peers = [
+        None if i == index else ShardConnectionPool(address, authkey)
+        for i, address in enumerate(addresses)
+    ]
+    contract = ShardContract(index, peers, clock=clock)
+    manager = GameManager(
+        clock=clock,
+        contract=contract,
+        ledger=JsonRpcLedger(ledger_rpc_url, **ledger_options) if ledger_rpc_url else None,
+        **options
+    )
+
+    # Eventi (es. randomness_fulfilled) inoltrati al router
+    events = Client(events_address, authkey=authkey)
+    events_lock = threading.Lock()
+
+    def forward_event(game_id: str, event: Dict):
+        with events_lock:
+            events.send((game_id, event))
+    manager.subscribe(forward_event)
+
+    listener = Listener(addresses[index], authkey=authkey)
+    stopped = threading.Event()
+
+    def dispatch(kind: str, name: str, args: Tuple, kwargs: Dict) -> Any:
+        if kind == "game" and name in _GAME_METHODS:
+            return getattr(manager, name)(*args, **kwargs)
+        if kind == "xpf" and name in _XPF_METHODS:
+            # Richiesta di un altro shard per un indirizzo di cui siamo proprietari
+            result = getattr(contract, name)(*args, **kwargs)
+            if manager.store:
+                manager.store.mark_balances([args[0]])
+            return result
+        if kind == "chain" and name in _CHAIN_METHODS:
+            return getattr(manager.blockchain, name)(*args, **kwargs)
+        if kind == "chain" and name in _CHAIN_ATTRIBUTES:
+            return getattr(manager.blockchain, name)
+        raise ValueError(f"Unknown shard call {kind}.{name}")
+
+    def handle(conn: Connection):
+        with conn:
+            while True:
+                try:
+                    kind, name, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if kind == "shutdown":
+                    stopped.set()
+                    conn.send((True, None))
+                    return
+                try:
+                    reply = (True, dispatch(kind, name, args, kwargs))
+                except Exception as exc:
+                    reply = (False, exc)
+                try:
+                    conn.send(reply)
+                except Exception as exc:
+                    # Risultato o eccezione non serializzabile: il chiamante non resta appeso
+                    conn.send((False, RuntimeError(f"{type(exc).__name__}: {exc}")))
+
+    def accept():
+        while not stopped.is_set():
+            try:
+                conn = listener.accept()
+            except Exception:
+                # Listener chiuso allo shutdown o handshake fallito
+                continue
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=accept, name=f"shard-{index}-accept", daemon=True).start()
+    # Il router aspetta questa riga prima di inoltrare richieste
+    print("ready", flush=True)
+
+    stopped.wait()
+    manager.close()
+    for peer in peers:
+        if peer is not None:
+            peer.close()
+    events.close()
+    listener.close()
+
+
+if __name__ == "__main__":
+    serve_shard(**pickle.load(sys.stdin.buffer))
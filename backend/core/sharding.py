@@ -0,0 +1,349 @@
+"""
+Sharding - Giochi partizionati per hash di game_id su più processi worker
+
+Ogni shard è un processo (`python -m core.shard_worker`) con il proprio
+GameManager e la propria chain simulata, salvo ledger JSON-RPC condiviso.
+Il router vive nel processo delle route e inoltra ogni chiamata allo shard
+proprietario su socket Unix locali (multiprocessing.connection).
+
+Gli XPF hanno un solo proprietario per indirizzo, scelto con lo stesso hash:
+uno shard che deve bruciare XPF di un indirizzo altrui lo chiede allo shard
+proprietario, che li aggiorna sotto il proprio lock per indirizzo.
+"""
+import logging
+import os
+import pickle
+import queue
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import zlib
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional
+
+from blockchain.ledger import LedgerBackend
+from blockchain.smart_contract import SmartContract
+from models.game_models import Game, GameState
+from utils.clock import Clock
+
+logger = logging.getLogger(__name__)
+
+# Opzioni di GameManager con percorsi su disco: ogni shard usa il proprio
+_PATH_OPTIONS = ("chain_dir", "archive_dir", "db_path", "game_archive_dir")
+
+
+def shard_for(key: str, shards: int) -> int:
+    """Shard proprietario di una chiave (stabile tra processi, a differenza di hash())"""
+    return zlib.crc32(key.encode()) % shards
+
+
+class ShardConnectionPool:
+    """Connessioni riusabili verso uno shard; una chiamata occupa una connessione"""
+
+    def __init__(self, address: str, authkey: bytes):
+        self.address = address
+        self.authkey = authkey
+        self._idle: "queue.LifoQueue[Connection]" = queue.LifoQueue()
+
+    def call(self, kind: str, name: str, *args, **kwargs) -> Any:
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = Client(self.address, authkey=self.authkey)
+
+        try:
+            conn.send((kind, name, args, kwargs))
+            ok, value = conn.recv()
+        except (EOFError, OSError):
+            conn.close()
+            raise
+        self._idle.put(conn)
+
+        if not ok:
+            raise value
+        return value
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class ShardContract(SmartContract):
+    """SmartContract di uno shard: gli XPF di indirizzi altrui vivono nello shard proprietario"""
+
+    def __init__(self, index: int, peers: List[Optional[ShardConnectionPool]], clock: Optional[Clock] = None):
+        super().__init__(clock=clock)
+        self.index = index
+        self.peers = peers
+
+    def _owner(self, address: str) -> Optional[ShardConnectionPool]:
+        """Pool dello shard proprietario, None se è questo"""
+        return self.peers[shard_for(address, len(self.peers))]
+
+    def mint_xpf(self, address: str, amount: int):
+        owner = self._owner(address)
+        if owner is None:
+            return super().mint_xpf(address, amount)
+        owner.call("xpf", "mint_xpf", address, amount)
+
+    def open_account(self, address: str, amount: int):
+        owner = self._owner(address)
+        if owner is None:
+            return super().open_account(address, amount)
+        owner.call("xpf", "open_account", address, amount)
+
+    def burn_xpf(self, address: str, amount: int) -> bool:
+        owner = self._owner(address)
+        if owner is None:
+            return super().burn_xpf(address, amount)
+        return owner.call("xpf", "burn_xpf", address, amount)
+
+    def get_xpf_balance(self, address: str) -> int:
+        owner = self._owner(address)
+        if owner is None:
+            return super().get_xpf_balance(address)
+        return owner.call("xpf", "get_xpf_balance", address)
+
+
+def _shard_options(options: Dict, index: int) -> Dict:
+    """Opzioni di GameManager per lo shard `index` (percorsi separati per shard)"""
+    options = dict(options)
+    for key in _PATH_OPTIONS:
+        if not options.get(key):
+            continue
+        if key == "db_path":
+            options[key] = f"{options[key]}.shard{index}"
+        else:
+            options[key] = os.path.join(options[key], f"shard_{index}")
+    return options
+
+
+# ==================== ROUTER ====================
+
+class ShardedChainView:
+    """Letture chain sugli shard: ogni shard ha la propria chain, le tx si cercano su tutti"""
+
+    def __init__(self, router: "ShardRouter"):
+        self.router = router
+
+    def _first(self, name: str, *args):
+        for pool in self.router.pools:
+            result = pool.call("chain", name, *args)
+            if result is not None:
+                return result
+        return None
+
+    def get_transaction(self, tx_hash: str):
+        return self._first("get_transaction", tx_hash)
+
+    def get_receipt(self, tx_hash: str):
+        return self._first("get_receipt", tx_hash)
+
+    def get_inclusion_proof(self, tx_hash: str):
+        return self._first("get_inclusion_proof", tx_hash)
+
+    def get_logs(self, from_block: int = 0, to_block: Optional[int] = None, topics: Optional[List] = None):
+        # Filtro su un solo game_id (topic 1): basta lo shard del gioco
+        game_id = topics[1] if topics and len(topics) > 1 else None
+        pools = [self.router.pool_for(game_id)] if isinstance(game_id, str) else self.router.pools
+        logs = []
+        for pool in pools:
+            logs.extend(pool.call("chain", "get_logs", from_block, to_block, topics))
+        return logs
+
+    @property
+    def current_block_number(self) -> int:
+        return max(pool.call("chain", "current_block_number") for pool in self.router.pools)
+
+    @property
+    def pending_count(self) -> int:
+        return sum(pool.call("chain", "pending_count") for pool in self.router.pools)
+
+
+class ShardRouter:
+    """
+    Router verso N processi shard, con la stessa interfaccia di GameManager
+
+    I giochi sono assegnati con shard_for(game_id): il router sceglie il
+    game_id e quindi lo shard. Cambiare il numero di shard con database o
+    chain già su disco sposterebbe i proprietari: va fatto con una migrazione.
+    """
+
+    def __init__(
+        self,
+        shards: int = 2,
+        ledger_rpc_url: Optional[str] = None,
+        ledger_options: Optional[Dict] = None,
+        **manager_options
+    ):
+        """
+        Args:
+            shards: Numero di processi worker
+            ledger_rpc_url: Ledger JSON-RPC condiviso da tutti gli shard
+                (default: una chain simulata per shard)
+            ledger_options: Opzioni di JsonRpcLedger (pool_size, batch_size, ...)
+            **manager_options: Opzioni di GameManager per ogni shard
+                (un `clock` deve essere serializzabile, es. VirtualClock)
+        """
+        self.shards = shards
+        self.active_game_id: Optional[str] = None
+        self.listeners: List[Callable[[str, Dict], None]] = []
+
+        self._socket_dir = tempfile.mkdtemp(prefix="f1ai-shards-")
+        self._authkey = secrets.token_bytes(32)
+        addresses = [os.path.join(self._socket_dir, f"shard_{i}.sock") for i in range(shards)]
+
+        self._events = Listener(os.path.join(self._socket_dir, "events.sock"), authkey=self._authkey)
+        self._event_connections: List[Connection] = []
+        threading.Thread(target=self._accept_events, name="shard-events", daemon=True).start()
+
+        # Processi nuovi (non fork): il processo delle route ha già thread
+        # (uvicorn, oracolo) e non deve essere reimportato dagli shard
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [backend_dir, os.environ.get("PYTHONPATH")])))
+        self.processes: List[subprocess.Popen] = []
+        for index in range(shards):
+            process = subprocess.Popen(
+                [sys.executable, "-m", "core.shard_worker"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env
+            )
+            process.stdin.write(pickle.dumps({
+                "index": index,
+                "addresses": addresses,
+                "authkey": self._authkey,
+                "events_address": self._events.address,
+                "options": _shard_options(manager_options, index),
+                "ledger_rpc_url": ledger_rpc_url,
+                "ledger_options": ledger_options or {}
+            }))
+            process.stdin.close()
+            self.processes.append(process)
+
+        for index, process in enumerate(self.processes):
+            if process.stdout.readline().strip() != b"ready":
+                self.close()
+                raise RuntimeError(f"Shard {index} failed to start")
+
+        self.pools = [ShardConnectionPool(address, self._authkey) for address in addresses]
+        if ledger_rpc_url:
+            from blockchain.rpc_ledger import JsonRpcLedger
+            self.blockchain = JsonRpcLedger(ledger_rpc_url, **(ledger_options or {}))
+        else:
+            self.blockchain = ShardedChainView(self)
+
+    def pool_for(self, game_id: str) -> ShardConnectionPool:
+        return self.pools[shard_for(game_id, self.shards)]
+
+    def _call(self, game_id: str, name: str, *args, **kwargs):
+        return self.pool_for(game_id).call("game", name, game_id, *args, **kwargs)
+
+    # ==================== EVENTI ====================
+
+    def subscribe(self, listener: Callable[[str, Dict], None]):
+        """Registra un listener degli eventi di tutti gli shard"""
+        self.listeners.append(listener)
+
+    def _accept_events(self):
+        while True:
+            try:
+                conn = self._events.accept()
+            except OSError:
+                return
+            self._event_connections.append(conn)
+            threading.Thread(target=self._read_events, args=(conn,), daemon=True).start()
+
+    def _read_events(self, conn: Connection):
+        while True:
+            try:
+                game_id, event = conn.recv()
+            except (EOFError, OSError):
+                return
+            for listener in self.listeners:
+                try:
+                    listener(game_id, event)
+                except Exception:
+                    logger.exception("Shard event listener failed")
+
+    # ==================== MUTAZIONI ====================
+
+    def create_game(self, max_players: int = 3) -> Game:
+        game_id = f"game_{secrets.token_hex(8)}"
+        game = self.pool_for(game_id).call("game", "create_game", max_players=max_players, game_id=game_id)
+        self.active_game_id = game_id
+        return game
+
+    def register_player(self, game_id: str, player_address: str):
+        return self._call(game_id, "register_player", player_address)
+
+    def submit_commitment(self, game_id: str, *args, **kwargs):
+        return self._call(game_id, "submit_commitment", *args, **kwargs)
+
+    def request_variation(self, game_id: str, player_address: str) -> Dict:
+        return self._call(game_id, "request_variation", player_address)
+
+    def compute_variation(self, game_id: str, player_address: str, current_numbers: List[int]) -> Dict:
+        return self._call(game_id, "compute_variation", player_address, current_numbers)
+
+    def compute_variation_encrypted(self, game_id: str, player_address: str, encrypted_state: List[str]) -> Dict:
+        return self._call(game_id, "compute_variation_encrypted", player_address, encrypted_state)
+
+    def request_variations(self, game_id: str, player_address: str, current_numbers: List[int], count: int) -> Dict:
+        return self._call(game_id, "request_variations", player_address, current_numbers, count)
+
+    def submit_final_choice(self, game_id: str, *args, **kwargs):
+        return self._call(game_id, "submit_final_choice", *args, **kwargs)
+
+    # ==================== LETTURE ====================
+
+    def get_game(self, game_id: str) -> Optional[Game]:
+        return self._call(game_id, "get_game")
+
+    def get_game_status(self, game_id: str) -> Optional[GameState]:
+        return self._call(game_id, "get_game_status")
+
+    def get_active_game(self) -> Optional[Game]:
+        if self.active_game_id:
+            return self.get_game(self.active_game_id)
+        return None
+
+    def get_player_xpf(self, player_address: str) -> int:
+        return self.pools[shard_for(player_address, self.shards)].call("game", "get_player_xpf", player_address)
+
+    def get_all_games(self) -> List[Game]:
+        games = []
+        for pool in self.pools:
+            games.extend(pool.call("game", "get_all_games"))
+        return games
+
+    def count_games(self) -> int:
+        return sum(pool.call("game", "count_games") for pool in self.pools)
+
+    def close(self):
+        """Ferma gli shard (ognuno evade il VRF pendente e salva lo stato)"""
+        for index, process in enumerate(self.processes):
+            if process.poll() is not None:
+                continue
+            try:
+                with Client(os.path.join(self._socket_dir, f"shard_{index}.sock"), authkey=self._authkey) as conn:
+                    conn.send(("shutdown", None, (), {}))
+                    conn.recv()
+            except (OSError, EOFError):
+                process.terminate()
+        for process in self.processes:
+            process.wait()
+            process.stdout.close()
+        for pool in getattr(self, "pools", []):
+            pool.close()
+        if isinstance(getattr(self, "blockchain", None), LedgerBackend):
+            self.blockchain.close()
+        self._events.close()
+        for conn in self._event_connections:
+            conn.close()
+        shutil.rmtree(self._socket_dir, ignore_errors=True)
+
@@ -1,5 +1,6 @@
 from .crypto_engine import CryptoEngine
 from .number_derivation import derive_numbers_from_seed
 from .homomorphic import HomomorphicEngine
+from .key_pool import KeyPool
 
-__all__ = ["CryptoEngine", "derive_numbers_from_seed", "HomomorphicEngine"]
+__all__ = ["CryptoEngine", "derive_numbers_from_seed", "HomomorphicEngine", "KeyPool"]
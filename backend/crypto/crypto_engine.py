@@ -3,25 +3,72 @@ Crypto Engine - Gestisce crittografia, commitment, e ZK proof (simulati)
 """
 import hashlib
 import secrets
+import threading
+from collections import OrderedDict
 from typing import List, Tuple
 from Crypto.PublicKey import RSA
 from Crypto.Cipher import PKCS1_OAEP
 import base64
 
 
+class CipherCache:
+    """
+    LRU dei cipher OAEP per chiave, indicizzati dal digest del PEM
+
+    import_key (parsing ASN.1, e per le chiavi private controlli sui primi)
+    e il setup del cipher avvengono una volta per chiave invece che per numero.
+    Il cipher non ha stato tra una chiamata e l'altra: è condiviso tra thread.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._ciphers: "OrderedDict[bytes, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key_pem: str):
+        digest = hashlib.sha256(key_pem.encode()).digest()
+        with self._lock:
+            cipher = self._ciphers.get(digest)
+            if cipher is not None:
+                self._ciphers.move_to_end(digest)
+                self.hits += 1
+                return cipher
+
+        cipher = PKCS1_OAEP.new(RSA.import_key(key_pem))
+
+        with self._lock:
+            self.misses += 1
+            self._ciphers[digest] = cipher
+            if len(self._ciphers) > self.maxsize:
+                self._ciphers.popitem(last=False)
+        return cipher
+
+    def clear(self):
+        with self._lock:
+            self._ciphers.clear()
+
+
+_ciphers = CipherCache()
+
+
 class CryptoEngine:
     """Engine per operazioni crittografiche"""
 
     @staticmethod
-    def generate_keypair() -> Tuple[str, str]:
+    def generate_keypair(key_size: int = 2048) -> Tuple[str, str]:
         """
         Genera coppia di chiavi RSA per cifratura
         (Semplificazione: in produzione useremmo Paillier per omomorfia)
 
+        Args:
+            key_size: Bit del modulo
+
         Returns:
             (public_key, private_key) come stringhe PEM
         """
-        key = RSA.generate(2048)
+        key = RSA.generate(key_size)
         private_key = key.export_key().decode()
         public_key = key.publickey().export_key().decode()
         return public_key, private_key
@@ -38,17 +85,7 @@ class CryptoEngine:
         Returns:
             Ciphertext come base64
         """
-        public_key = RSA.import_key(public_key_pem)
-        cipher = PKCS1_OAEP.new(public_key)
-
-        # Converti numero in bytes
-        number_bytes = str(number).encode()
-
-        # Cifra
-        ciphertext = cipher.encrypt(number_bytes)
-
-        # Ritorna come base64 per facilità di trasporto
-        return base64.b64encode(ciphertext).decode()
+        return CryptoEngine._encrypt(_ciphers.get(public_key_pem), number)
 
     @staticmethod
     def decrypt_number(ciphertext_b64: str, private_key_pem: str) -> int:
@@ -62,9 +99,38 @@ class CryptoEngine:
         Returns:
             Numero in chiaro
         """
-        private_key = RSA.import_key(private_key_pem)
-        cipher = PKCS1_OAEP.new(private_key)
+        return CryptoEngine._decrypt(_ciphers.get(private_key_pem), ciphertext_b64)
 
+    @staticmethod
+    def encrypt_numbers(numbers: List[int], public_key: str) -> List[str]:
+        """Cifra una lista di numeri (chiave letta una volta per tutto il vettore)"""
+        cipher = _ciphers.get(public_key)
+        return [CryptoEngine._encrypt(cipher, num) for num in numbers]
+
+    @staticmethod
+    def decrypt_numbers(ciphertexts_b64: List[str], private_key_pem: str) -> List[int]:
+        """Decifra una lista di numeri (chiave letta una volta per tutto il vettore)"""
+        cipher = _ciphers.get(private_key_pem)
+        return [CryptoEngine._decrypt(cipher, ciphertext) for ciphertext in ciphertexts_b64]
+
+    @staticmethod
+    def cipher_cache() -> CipherCache:
+        """Cache dei cipher condivisa (hit, miss, svuotamento)"""
+        return _ciphers
+
+    @staticmethod
+    def _encrypt(cipher, number: int) -> str:
+        # Converti numero in bytes
+        number_bytes = str(number).encode()
+
+        # Cifra
+        ciphertext = cipher.encrypt(number_bytes)
+
+        # Ritorna come base64 per facilità di trasporto
+        return base64.b64encode(ciphertext).decode()
+
+    @staticmethod
+    def _decrypt(cipher, ciphertext_b64: str) -> int:
         # Decodifica base64
         ciphertext = base64.b64decode(ciphertext_b64)
 
@@ -74,11 +140,6 @@ class CryptoEngine:
         # Converti da bytes a int
         return int(plaintext.decode())
 
-    @staticmethod
-    def encrypt_numbers(numbers: List[int], public_key: str) -> List[str]:
-        """Cifra una lista di numeri"""
-        return [CryptoEngine.encrypt_number(num, public_key) for num in numbers]
-
     @staticmethod
     def create_commitment(data: str) -> str:
         """
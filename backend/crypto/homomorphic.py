@@ -1,26 +1,89 @@
 """
-Homomorphic Engine - Simula calcolo omomorfico
-NOTA: Questa è una semplificazione. Per vera omomorfia servirebbero librerie come python-paillier o SEAL
+Homomorphic Engine - Calcolo omomorfico sui numeri cifrati (Paillier)
+
+Il server riceve i numeri cifrati con la chiave Paillier del giocatore,
+applica le variazioni e calcola F senza mai vederli in chiaro; il client
+decifra solo lo stato e l'output. Chiavi e ciphertext viaggiano come stringhe
+(`paillier:<n>` e interi esadecimali).
 """
-import secrets
-from typing import List
-from .crypto_engine import CryptoEngine
+from functools import lru_cache
+from typing import List, Tuple
+
 from .number_derivation import calculate_validation_function
+from .paillier import KEY_SIZE, PaillierPrivateKey, PaillierPublicKey, generate_paillier_keypair
+
+
+@lru_cache(maxsize=1024)
+def _public_key(data: str) -> PaillierPublicKey:
+    """Chiave letta una volta (cache: con lei resta il suo pool di casualità)"""
+    return PaillierPublicKey.load(data)
+
+
+@lru_cache(maxsize=256)
+def _private_key(data: str) -> PaillierPrivateKey:
+    return PaillierPrivateKey.load(data)
+
+
+def _to_int(ciphertext: str) -> int:
+    return int(ciphertext, 16)
+
+
+def _from_client(ciphertext: str, key: PaillierPublicKey) -> int:
+    """Ciphertext di un client, rifiutato se fuori da Z*_{n²} (ValueError)"""
+    try:
+        value = int(ciphertext, 16)
+    except ValueError:
+        raise ValueError("Ciphertext is not a hexadecimal integer") from None
+    return key.check_ciphertext(value)
+
+
+def _to_str(ciphertext: int) -> str:
+    return f"{ciphertext:x}"
 
 
 class HomomorphicEngine:
     """
-    Simula calcolo omomorfico su dati cifrati
+    Calcolo su dati cifrati con Paillier
 
-    IMPORTANTE: In produzione useremmo Paillier o BFV/CKKS
-    Per la demo, "fingiamo" di calcolare su cifrati ma in realtà:
-    1. Server non vede i numeri (riceve solo ciphertext)
-    2. Server fa calcoli e ritorna ciphertext output
-    3. Client decifra solo l'output finale
+    1. Il client cifra i numeri con la propria chiave pubblica
+    2. Il server somma i delta e calcola F = sum(c[i] * X[i]) + bias sui cifrati
+    3. Il client decifra lo stato e l'output (il modulo 10000 si applica dopo)
 
-    Questo mantiene il flusso corretto per la demo
+    Il limite 0-1000 dei numeri richiede un confronto e non si può applicare
+    sui cifrati: nel percorso cifrato i numeri non vengono limitati.
     """
 
+    @staticmethod
+    def generate_keypair(key_size: int = KEY_SIZE) -> Tuple[str, str]:
+        """
+        Genera coppia di chiavi Paillier
+
+        Returns:
+            (public_key, private_key) come stringhe
+        """
+        public_key, private_key = generate_paillier_keypair(key_size)
+        return public_key.export(), private_key.export()
+
+    @staticmethod
+    def is_public_key(public_key: str) -> bool:
+        try:
+            _public_key(public_key)
+            return True
+        except ValueError:
+            return False
+
+    @staticmethod
+    def encrypt_numbers(numbers: List[int], public_key: str) -> List[str]:
+        """Cifra una lista di numeri (casualità dal pool della chiave)"""
+        key = _public_key(public_key)
+        return [_to_str(key.encrypt(number)) for number in numbers]
+
+    @staticmethod
+    def decrypt_numbers(encrypted_numbers: List[str], private_key: str) -> List[int]:
+        """Decifra una lista di numeri (CRT)"""
+        key = _private_key(private_key)
+        return [key.decrypt(_to_int(ciphertext)) for ciphertext in encrypted_numbers]
+
     @staticmethod
     def apply_delta_to_encrypted(
         encrypted_numbers: List[str],
@@ -28,11 +91,7 @@ class HomomorphicEngine:
         public_key: str
     ) -> List[str]:
         """
-        Simula: encrypted_new[i] = encrypted_numbers[i] + Encrypt(delta[i])
-
-        In realtà in questa demo non possiamo fare vera omomorfia con RSA,
-        quindi ritorniamo nuovi ciphertext che sembrano validi.
-        Il client dovrà fidarsi del server (accettabile per PoC hackathon)
+        encrypted_new[i] = encrypted_numbers[i] ⊕ delta[i]
 
         Args:
             encrypted_numbers: Lista ciphertext
@@ -40,18 +99,15 @@ class HomomorphicEngine:
             public_key: Chiave pubblica
 
         Returns:
-            Nuovi ciphertext (simulati)
+            Nuovi ciphertext
         """
-        # Nella demo, generiamo nuovi ciphertext "modificati"
-        # In produzione, useremmo vera addizione omomorfica
-        new_encrypted = []
-        for enc in encrypted_numbers:
-            # Simula "modifica" generando nuovo ciphertext
-            # (In realtà questo non è sicuro, ma per demo va bene)
-            modified = enc + "_modified_" + secrets.token_hex(4)
-            new_encrypted.append(modified)
-
-        return new_encrypted
+        if len(encrypted_numbers) != len(deltas):
+            raise ValueError("Numbers and deltas must have same length")
+        key = _public_key(public_key)
+        return [
+            _to_str(key.add_plain(_from_client(ciphertext, key), delta))
+            for ciphertext, delta in zip(encrypted_numbers, deltas)
+        ]
 
     @staticmethod
     def compute_output_on_encrypted(
@@ -61,10 +117,10 @@ class HomomorphicEngine:
         public_key: str
     ) -> str:
         """
-        Simula: encrypted_output = F(encrypted_numbers)
-        dove F = sum(c[i] * X[i]) + bias
+        encrypted_output = Enc(sum(c[i] * X[i]) + bias), senza il modulo finale
 
-        Dovrebbe calcolare tutto su cifrati, ma per demo semplifichiamo
+        Il risultato è ri-randomizzato con un valore del pool: non è collegabile
+        ai ciphertext di ingresso.
 
         Args:
             encrypted_numbers: Numeri cifrati
@@ -73,16 +129,21 @@ class HomomorphicEngine:
             public_key: Chiave pubblica
 
         Returns:
-            Output cifrato (simulato)
+            Output cifrato (da decifrare con decrypt_output)
         """
-        # Per la demo, creiamo un ciphertext che "contiene" l'output
-        # Il client dovrà decifrarlo
+        if len(encrypted_numbers) != len(coefficients):
+            raise ValueError("Numbers and coefficients must have same length")
+        key = _public_key(public_key)
+        total = 1  # Enc(0) con r = 1
+        for ciphertext, coeff in zip(encrypted_numbers, coefficients):
+            total = key.add(total, key.multiply_plain(_from_client(ciphertext, key), coeff))
+        total = key.add_plain(total, bias)
+        return _to_str(key.rerandomize(total))
 
-        # Simuliamo un ciphertext output
-        # In realtà dovremmo fare moltiplicazioni e somme omorforiche
-        output_ciphertext = f"encrypted_output_{secrets.token_hex(16)}"
-
-        return output_ciphertext
+    @staticmethod
+    def decrypt_output(encrypted_output: str, private_key: str, modulo: int = 10000) -> int:
+        """Output di F come calculate_validation_function (0-9999)"""
+        return _private_key(private_key).decrypt(_to_int(encrypted_output)) % modulo
 
     @staticmethod
     def compute_output_with_plaintext_for_demo(
@@ -93,9 +154,7 @@ class HomomorphicEngine:
         """
         Calcola output in chiaro (per server che deve ritornare risultato)
 
-        NOTA: Questa funzione è usata dal server per calcolare l'output reale
-        che poi viene cifrato e inviato al client.
-
-        In produzione vera, il server NON avrebbe accesso ai numeri in chiaro.
+        NOTA: Usata dal percorso in chiaro di compute_variation; il percorso
+        cifrato (compute_variation_encrypted) non vede mai i numeri.
         """
         return calculate_validation_function(numbers, coefficients, bias)
@@ -0,0 +1,230 @@
+"""
+Key Pool - Coppie RSA pre-generate per /crypto/generate-keypair
+
+RSA.generate(2048) costa da decine a centinaia di ms di CPU con varianza
+alta. Processi worker (`python -m crypto.key_worker`) tengono la coda di
+chiavi pronte alla profondità `target`: la route prende una chiave in
+microsecondi e un burst di registrazioni consuma la riserva invece di
+generare sul thread della richiesta.
+"""
+import logging
+import os
+import struct
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from crypto.crypto_engine import CryptoEngine
+
+logger = logging.getLogger(__name__)
+
+# Header di ogni chiave inviata dai worker: lunghezza public PEM, lunghezza private PEM
+HEADER = struct.Struct("<II")
+
+# Finestra su cui si misura la velocità di riempimento
+_RATE_WINDOW = 60.0
+
+
+class _KeyWorker:
+    """Processo generatore e numero di chiavi che gli sono state chieste"""
+
+    def __init__(self, process: subprocess.Popen):
+        self.process = process
+        self.in_flight = 0
+
+
+class KeyPool:
+    """
+    Coda di coppie (public PEM, private PEM) riempita in background
+
+    - Ogni chiave presa fa richiedere ai worker quelle mancanti a `target`
+      (pronte + in generazione)
+    - Sotto `low_watermark` il pool è in riserva: lo segnalano log e metriche
+    - Con la coda vuota get() aspetta al più `max_wait` una chiave in arrivo,
+      poi la genera inline (fallback) come faceva la route
+    """
+
+    def __init__(
+        self,
+        target: int = 32,
+        low_watermark: int = 8,
+        workers: int = 1,
+        key_size: int = 2048,
+        max_wait: float = 0.05
+    ):
+        """
+        Args:
+            target: Chiavi tenute pronte
+            low_watermark: Profondità sotto cui il pool è in riserva
+            workers: Processi generatori
+            key_size: Bit del modulo RSA
+            max_wait: Attesa massima di una chiave con la coda vuota prima del fallback
+        """
+        self.target = target
+        self.low_watermark = low_watermark
+        self.workers = workers
+        self.key_size = key_size
+        self.max_wait = max_wait
+
+        self._ready: Deque[Tuple[str, str]] = deque()
+        self._lock = threading.Lock()
+        self._arrived = threading.Condition(self._lock)
+        self._workers: List[_KeyWorker] = []
+        self._readers: List[threading.Thread] = []
+        self._arrivals: Deque[float] = deque()  # Istanti (monotonic) delle chiavi arrivate nella finestra
+        self._started_at: Optional[float] = None
+        self._low = False
+
+        self.served = 0
+        self.fallbacks = 0
+        self.generated = 0
+        self.low_watermark_hits = 0
+
+    # ==================== CICLO DI VITA ====================
+
+    def start(self):
+        """Avvia i worker e il primo riempimento"""
+        if self._started_at is not None:
+            return
+        self._started_at = time.monotonic()
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [backend_dir, os.environ.get("PYTHONPATH")])))
+        with self._lock:
+            for index in range(self.workers):
+                process = subprocess.Popen(
+                    [sys.executable, "-m", "crypto.key_worker", str(self.key_size)],
+                    stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env
+                )
+                worker = _KeyWorker(process)
+                self._workers.append(worker)
+                reader = threading.Thread(target=self._read, args=(worker,), name=f"key-pool-{index}", daemon=True)
+                reader.start()
+                self._readers.append(reader)
+            self._refill()
+
+    def close(self):
+        """Ferma i worker (le chiavi in generazione vanno perse)"""
+        with self._lock:
+            workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.process.terminate()
+        for worker in workers:
+            worker.process.wait()
+            worker.process.stdin.close()
+        for reader in self._readers:
+            reader.join()
+        self._readers = []
+
+    # ==================== CHIAVI ====================
+
+    def get(self) -> Tuple[str, str]:
+        """Coppia (public_key, private_key) PEM pronta; inline se il pool è vuoto"""
+        with self._lock:
+            if not self._ready and self._workers and self.max_wait > 0:
+                self._arrived.wait_for(lambda: self._ready, self.max_wait)
+            keypair = self._take()
+            if keypair is None:
+                self.fallbacks += 1
+
+        if keypair is None:
+            keypair = CryptoEngine.generate_keypair(self.key_size)
+        return keypair
+
+    def get_nowait(self) -> Optional[Tuple[str, str]]:
+        """Coppia pronta o None, senza mai attendere (sicura sull'event loop)"""
+        with self._lock:
+            return self._take()
+
+    @property
+    def depth(self) -> int:
+        return len(self._ready)
+
+    def stats(self) -> Dict:
+        """Profondità, chiavi in generazione, uso e velocità di riempimento (chiavi/s)"""
+        with self._lock:
+            now = time.monotonic()
+            self._trim_arrivals(now)
+            window = min(_RATE_WINDOW, now - self._started_at) if self._started_at is not None else 0
+            return {
+                "depth": len(self._ready),
+                "target": self.target,
+                "low_watermark": self.low_watermark,
+                "in_flight": sum(worker.in_flight for worker in self._workers),
+                "workers": len(self._workers),
+                "served": self.served,
+                "fallbacks": self.fallbacks,
+                "generated": self.generated,
+                "low_watermark_hits": self.low_watermark_hits,
+                "refill_rate": round(len(self._arrivals) / window, 3) if window > 0 else 0.0
+            }
+
+    # ==================== INTERNI ====================
+
+    def _take(self) -> Optional[Tuple[str, str]]:
+        """Prende una chiave pronta e riordina quelle mancanti (chiamare sotto _lock)"""
+        keypair = self._ready.popleft() if self._ready else None
+        if keypair is not None:
+            self.served += 1
+        if len(self._ready) < self.low_watermark and self._workers and not self._low:
+            self._low = True
+            self.low_watermark_hits += 1
+            logger.warning("Key pool below low watermark (%d/%d ready)", len(self._ready), self.target)
+        self._refill()
+        return keypair
+
+    def _refill(self):
+        """Chiede ai worker le chiavi mancanti a target (chiamare sotto _lock)"""
+        missing = self.target - len(self._ready) - sum(worker.in_flight for worker in self._workers)
+        if missing <= 0 or not self._workers:
+            return
+        requests = {}
+        for _ in range(missing):
+            worker = min(self._workers, key=lambda w: w.in_flight + requests.get(id(w), 0))
+            requests[id(worker)] = requests.get(id(worker), 0) + 1
+        for worker in self._workers:
+            count = requests.get(id(worker))
+            if not count:
+                continue
+            try:
+                worker.process.stdin.write(b"\n" * count)
+                worker.process.stdin.flush()
+            except OSError:
+                continue  # Worker morto: lo toglie il suo reader
+            worker.in_flight += count
+
+    def _trim_arrivals(self, now: float):
+        while self._arrivals and self._arrivals[0] < now - _RATE_WINDOW:
+            self._arrivals.popleft()
+
+    def _read(self, worker: _KeyWorker):
+        """Riceve le chiavi di un worker finché il processo vive"""
+        stream = worker.process.stdout
+        while True:
+            header = stream.read(HEADER.size)
+            if len(header) < HEADER.size:
+                break
+            public_length, private_length = HEADER.unpack(header)
+            public_key = stream.read(public_length).decode()
+            private_key = stream.read(private_length).decode()
+            with self._lock:
+                self._ready.append((public_key, private_key))
+                worker.in_flight -= 1
+                self.generated += 1
+                now = time.monotonic()
+                self._arrivals.append(now)
+                self._trim_arrivals(now)
+                if len(self._ready) >= self.low_watermark:
+                    self._low = False
+                self._arrived.notify()
+                self._refill()
+
+        stream.close()
+        with self._lock:
+            if worker in self._workers:
+                # Uscita inattesa: le sue richieste passano agli altri worker
+                logger.error("Key worker exited with code %s", worker.process.poll())
+                self._workers.remove(worker)
+                self._refill()
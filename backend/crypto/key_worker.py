@@ -0,0 +1,25 @@
+"""
+Key Worker - Processo che genera coppie RSA per KeyPool
+
+Avviato da KeyPool con `python -m crypto.key_worker <bit>`: per ogni riga
+letta da stdin genera una coppia e la scrive su stdout come
+[lunghezze][public PEM][private PEM]. Termina quando stdin si chiude.
+"""
+import sys
+
+from crypto.crypto_engine import CryptoEngine
+from crypto.key_pool import HEADER
+
+
+def main():
+    key_size = int(sys.argv[1]) if len(sys.argv) > 1 else 2048
+    requests = sys.stdin.buffer
+    out = sys.stdout.buffer
+    while requests.readline():
+        public_key, private_key = (pem.encode() for pem in CryptoEngine.generate_keypair(key_size))
+        out.write(HEADER.pack(len(public_key), len(private_key)) + public_key + private_key)
+        out.flush()
+
+
+if __name__ == "__main__":
+    main()
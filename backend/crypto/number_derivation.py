@@ -2,7 +2,12 @@
 Number Derivation - Deriva numeri deterministici da seed
 """
 import hashlib
-from typing import List
+from typing import List, Sequence
+
+import numpy as np
+
+# Oltre questo valore la somma dei prodotti ridotti può superare int64
+_INT64_MAX = np.iinfo(np.int64).max
 
 
 def derive_numbers_from_seed(seed_player: str, count: int = 10, max_value: int = 1000) -> List[int]:
@@ -100,3 +105,72 @@ def calculate_validation_function(numbers: List[int], coefficients: List[int], b
         result += num * coeff
 
     return result % modulo
+
+
+def calculate_validation_function_batch(
+    states: List[List[int]],
+    coefficients: List[int],
+    bias: int,
+    modulo: int = 10000
+) -> List[int]:
+    """
+    Calcola F su più stati (es. le k variazioni di una richiesta batch)
+
+    Per pochi stati la funzione scalare su ogni stato è la via più rapida;
+    per milioni di stati usare calculate_validation_function_array.
+
+    Args:
+        states: Liste di 10 numeri
+        coefficients: Lista di 10 coefficienti
+        bias: Termine costante
+        modulo: Modulo finale (default 10000)
+
+    Returns:
+        Output della funzione per ogni stato, nello stesso ordine
+    """
+    return [calculate_validation_function(numbers, coefficients, bias, modulo) for numbers in states]
+
+
+def calculate_validation_function_array(
+    states: np.ndarray,
+    coefficients: Sequence[int],
+    bias: int,
+    modulo: int = 10000
+) -> np.ndarray:
+    """
+    Calcola F su N stati con NumPy (prodotto matrice-vettore int64)
+
+    Numeri, coefficienti e bias sono ridotti mod `modulo` prima del prodotto:
+    il risultato non cambia e nessuna somma esce da int64, quindi gli output
+    sono identici a calculate_validation_function (anche con numeri negativi).
+
+    Args:
+        states: Matrice (N x 10) di interi
+        coefficients: Lista di 10 coefficienti
+        bias: Termine costante
+        modulo: Modulo finale (default 10000)
+
+    Returns:
+        Array int64 di N output (0-9999)
+    """
+    states = np.asarray(states, dtype=np.int64)
+    coeffs = np.asarray(coefficients, dtype=np.int64)
+    if states.ndim != 2 or states.shape[1] != len(coeffs):
+        raise ValueError("Numbers and coefficients must have same length")
+
+    reduced_states = states % modulo
+    reduced_coeffs = coeffs % modulo
+    reduced_bias = bias % modulo
+    limit = modulo - 1
+
+    if len(coeffs) * limit * limit + limit <= _INT64_MAX:
+        totals = reduced_states @ reduced_coeffs + reduced_bias
+    elif limit * limit + limit <= _INT64_MAX:
+        # Modulo grande: riduzione dopo ogni colonna
+        totals = np.full(len(states), reduced_bias, dtype=np.int64)
+        for coeff, column in zip(reduced_coeffs, reduced_states.T):
+            totals = (totals + column * coeff) % modulo
+    else:
+        raise ValueError("Modulo too large for int64 evaluation")
+
+    return totals % modulo
@@ -0,0 +1,216 @@
+"""
+Paillier - Cifratura additivamente omomorfa
+
+Con g = n + 1:
+- Enc(m) = (1 + m·n) · r^n mod n²
+- Enc(a) · Enc(b) = Enc(a + b)        (somma di cifrati)
+- Enc(a) · (1 + k·n) = Enc(a + k)     (somma di un intero in chiaro)
+- Enc(a)^k = Enc(k·a)                 (prodotto per scalare in chiaro)
+
+Bastano per F(X) = sum(c[i]·X[i]) + bias sui numeri cifrati. La parte costosa
+della cifratura è r^n mod n² (~150ms a 2048 bit): i valori sono precalcolati
+in un pool per chiave, riempito in background. La decifratura usa il CRT su
+p² e q² con le costanti precalcolate.
+"""
+import logging
+import math
+import queue
+import secrets
+import threading
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from Crypto.Util.number import getPrime
+
+logger = logging.getLogger(__name__)
+
+_PUBLIC_PREFIX = "paillier:"
+_PRIVATE_PREFIX = "paillier-private:"
+KEY_SIZE = 2048  # Bit di n delle chiavi accettate
+
+
+class PaillierPublicKey:
+    """Chiave pubblica (n); serializzata come `paillier:<n esadecimale>`"""
+
+    def __init__(self, n: int, pool_size: int = 32):
+        self.n = n
+        self.n_square = n * n
+        self.max_int = n // 3  # Oltre, il segno del risultato non è più ricostruibile
+        self.randomness = RandomnessPool(self, target=pool_size)
+
+    def export(self) -> str:
+        return f"{_PUBLIC_PREFIX}{self.n:x}"
+
+    @classmethod
+    def load(cls, data: str, key_size: int = KEY_SIZE) -> "PaillierPublicKey":
+        """Chiave da `export()`; rifiuta n della dimensione sbagliata (chiavi deboli o enormi)"""
+        if not data.startswith(_PUBLIC_PREFIX):
+            raise ValueError("Not a Paillier public key")
+        n = int(data[len(_PUBLIC_PREFIX):], 16)
+        if n.bit_length() != key_size or n % 2 == 0:
+            raise ValueError(f"Paillier public key must be an odd {key_size}-bit modulus")
+        return cls(n)
+
+    def random_factor(self) -> int:
+        """r^n mod n² con r casuale in Z*_n (calcolo completo, senza pool)"""
+        while True:
+            r = secrets.randbelow(self.n)
+            if r > 1 and math.gcd(r, self.n) == 1:
+                return pow(r, self.n, self.n_square)
+
+    def check_ciphertext(self, ciphertext: int) -> int:
+        """Ciphertext ricevuto da un client: deve stare in Z*_{n²}"""
+        if not 0 < ciphertext < self.n_square or math.gcd(ciphertext, self.n) != 1:
+            raise ValueError("Ciphertext out of range for this public key")
+        return ciphertext
+
+    def encode(self, value: int) -> int:
+        """Intero con segno -> residuo mod n"""
+        if abs(value) > self.max_int:
+            raise ValueError("Value out of Paillier range")
+        return value % self.n
+
+    def decode(self, residue: int) -> int:
+        """Residuo mod n -> intero con segno"""
+        return residue - self.n if residue > self.n // 2 else residue
+
+    def encrypt(self, value: int, random_factor: Optional[int] = None) -> int:
+        if random_factor is None:
+            random_factor = self.randomness.take()
+        return (1 + self.encode(value) * self.n) * random_factor % self.n_square
+
+    def add(self, ciphertext_a: int, ciphertext_b: int) -> int:
+        """Enc(a) ⊕ Enc(b) = Enc(a + b)"""
+        return ciphertext_a * ciphertext_b % self.n_square
+
+    def add_plain(self, ciphertext: int, value: int) -> int:
+        """Enc(a) ⊕ k = Enc(a + k), senza nuova casualità"""
+        return ciphertext * (1 + self.encode(value) * self.n) % self.n_square
+
+    def multiply_plain(self, ciphertext: int, scalar: int) -> int:
+        """Enc(a) ⊗ k = Enc(k·a)"""
+        if scalar < 0:
+            ciphertext = pow(ciphertext, -1, self.n_square)
+            scalar = -scalar
+        return pow(ciphertext, scalar, self.n_square)
+
+    def rerandomize(self, ciphertext: int) -> int:
+        """Stesso messaggio, ciphertext non collegabile all'originale"""
+        return ciphertext * self.randomness.take() % self.n_square
+
+
+class PaillierPrivateKey:
+    """Chiave privata (p, q) con le costanti CRT; serializzata come `paillier-private:<p>:<q>`"""
+
+    def __init__(self, p: int, q: int):
+        if p == q:
+            raise ValueError("p and q must differ")
+        self.p, self.q = p, q
+        self.public_key = PaillierPublicKey(p * q)
+        self.p_square = p * p
+        self.q_square = q * q
+        self.hp = self._h(p, self.p_square)
+        self.hq = self._h(q, self.q_square)
+        self.q_inverse = pow(q, -1, p)
+
+    def _h(self, prime: int, prime_square: int) -> int:
+        # h = L_p(g^(p-1) mod p²)^-1 mod p
+        return pow((pow(self.public_key.n + 1, prime - 1, prime_square) - 1) // prime, -1, prime)
+
+    def export(self) -> str:
+        return f"{_PRIVATE_PREFIX}{self.p:x}:{self.q:x}"
+
+    @classmethod
+    def load(cls, data: str) -> "PaillierPrivateKey":
+        if not data.startswith(_PRIVATE_PREFIX):
+            raise ValueError("Not a Paillier private key")
+        p, q = data[len(_PRIVATE_PREFIX):].split(":")
+        return cls(int(p, 16), int(q, 16))
+
+    def decrypt(self, ciphertext: int) -> int:
+        """Intero con segno; due esponenziazioni mod p² e q² invece di una mod n²"""
+        mp = (pow(ciphertext, self.p - 1, self.p_square) - 1) // self.p * self.hp % self.p
+        mq = (pow(ciphertext, self.q - 1, self.q_square) - 1) // self.q * self.hq % self.q
+        # Ricombinazione di Garner
+        residue = mq + (mp - mq) * self.q_inverse % self.p * self.q
+        return self.public_key.decode(residue)
+
+
+def generate_paillier_keypair(key_size: int = KEY_SIZE) -> Tuple[PaillierPublicKey, PaillierPrivateKey]:
+    """Coppia di chiavi con n di `key_size` bit"""
+    while True:
+        p = getPrime(key_size // 2)
+        q = getPrime(key_size // 2)
+        if p != q and (p * q).bit_length() == key_size:
+            private_key = PaillierPrivateKey(p, q)
+            return private_key.public_key, private_key
+
+
+# ==================== POOL DI CASUALITÀ ====================
+
+class RandomnessPool:
+    """
+    Valori r^n mod n² pronti per una chiave pubblica
+
+    take() prende un valore precalcolato; se il pool è vuoto lo calcola al
+    momento (miss). Sotto metà di `target` il pool si mette in coda per il
+    thread di riempimento condiviso da tutte le chiavi.
+    """
+
+    def __init__(self, public_key: PaillierPublicKey, target: int = 32):
+        self.public_key = public_key
+        self.target = target
+        self._values: Deque[int] = deque()
+        self._queued = threading.Event()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def take(self) -> int:
+        try:
+            value = self._values.popleft()
+            self.hits += 1
+        except IndexError:
+            value = self.public_key.random_factor()
+            self.misses += 1
+        if len(self._values) < self.target // 2 and not self._queued.is_set():
+            self._queued.set()
+            _filler.submit(self)
+        return value
+
+    def fill(self, count: Optional[int] = None):
+        """Calcola valori fino a `count` (default: target) pronti"""
+        goal = self.target if count is None else count
+        while len(self._values) < goal:
+            self._values.append(self.public_key.random_factor())
+
+
+class _PoolFiller:
+    """Thread unico che riempie i pool rimasti sotto soglia"""
+
+    def __init__(self):
+        self._pools: "queue.Queue[RandomnessPool]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def submit(self, pool: RandomnessPool):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="paillier-randomness", daemon=True)
+                self._thread.start()
+        self._pools.put(pool)
+
+    def _run(self):
+        while True:
+            pool = self._pools.get()
+            try:
+                pool.fill()
+            except Exception:
+                logger.exception("Paillier randomness refill failed")
+            finally:
+                pool._queued.clear()
+
+
+_filler = _PoolFiller()
@@ -0,0 +1,186 @@
+"""
+Threshold - Shamir secret sharing t-di-n su Z_p (docs/Solution.MD, fase 5)
+
+La chiave sk è divisa in `shares` quote, ne bastano `threshold` per usarla.
+I cifrati sono lineari: Enc(m) = (a, m + a·sk) mod p, quindi F(X) si calcola
+sui cifrati come combinazione lineare. Ogni detentore di una quota produce
+la decifratura parziale a·sk_i; l'interpolazione di Lagrange in 0 ricostruisce
+a·sk e quindi m. I pesi di Lagrange dipendono solo dagli indici delle quote
+usate: sono calcolati una volta per sottoinsieme e riusati per tutti gli output.
+"""
+import secrets
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+PRIME = 2**31 - 1  # Primo di Mersenne
+_INT64_MAX = np.iinfo(np.int64).max
+DEFAULT_SHARES = 5
+DEFAULT_THRESHOLD = 4
+
+Share = Tuple[int, int]  # (indice x, valore del polinomio in x)
+Ciphertext = Tuple[int, int]  # (a, m + a·sk)
+
+
+def generate_shared_key(
+    shares: int = DEFAULT_SHARES,
+    threshold: int = DEFAULT_THRESHOLD,
+    prime: int = PRIME
+) -> Tuple[int, List[Share]]:
+    """
+    Chiave casuale e sue quote
+
+    Returns:
+        (sk, quote): sk serve solo a cifrare lo stato iniziale, poi va distrutta
+    """
+    secret = secrets.randbelow(prime - 1) + 1
+    return secret, split_secret(secret, shares, threshold, prime)
+
+
+def split_secret(
+    secret: int,
+    shares: int = DEFAULT_SHARES,
+    threshold: int = DEFAULT_THRESHOLD,
+    prime: int = PRIME
+) -> List[Share]:
+    """
+    Divide `secret` in `shares` quote (x = 1..shares) di un polinomio casuale di grado threshold-1
+
+    Args:
+        secret: Valore in Z_p
+        shares: Quote totali
+        threshold: Quote necessarie alla ricostruzione
+        prime: Modulo del campo
+
+    Returns:
+        Lista di (indice, valore)
+    """
+    if not 1 <= threshold <= shares < prime:
+        raise ValueError("Invalid threshold parameters")
+    if not 0 <= secret < prime:
+        raise ValueError("Secret out of field")
+
+    polynomial = [secret] + [secrets.randbelow(prime) for _ in range(threshold - 1)]
+    result = []
+    for x in range(1, shares + 1):
+        # Horner
+        value = 0
+        for coeff in reversed(polynomial):
+            value = (value * x + coeff) % prime
+        result.append((x, value))
+    return result
+
+
+@lru_cache(maxsize=256)
+def lagrange_weights(indices: Tuple[int, ...], prime: int = PRIME) -> Tuple[int, ...]:
+    """
+    Pesi λ_i dell'interpolazione in 0 per le quote con questi indici (stesso ordine)
+
+    λ_i = Π_{j≠i} x_j / (x_j - x_i) mod p; in cache per sottoinsieme di indici.
+    """
+    if len(set(indices)) != len(indices):
+        raise ValueError("Duplicate share index")
+
+    weights = []
+    for i, xi in enumerate(indices):
+        numerator, denominator = 1, 1
+        for j, xj in enumerate(indices):
+            if i != j:
+                numerator = numerator * xj % prime
+                denominator = denominator * (xj - xi) % prime
+        weights.append(numerator * pow(denominator, -1, prime) % prime)
+    return tuple(weights)
+
+
+def reconstruct_secret(shares: Sequence[Share], prime: int = PRIME) -> int:
+    """Segreto dalle quote (almeno threshold, altrimenti il risultato è casuale)"""
+    weights = lagrange_weights(tuple(x for x, _ in shares), prime)
+    return sum(weight * value for weight, (_, value) in zip(weights, shares)) % prime
+
+
+def reconstruct_batch(partials: Dict[int, Sequence[int]], prime: int = PRIME) -> List[int]:
+    """
+    Ricostruisce molti valori condivisi dalle stesse quote con NumPy
+
+    Una riga per quota (N valori): ogni riga pesata con il suo λ_i si somma al
+    totale con la riduzione mod p dopo ogni riga, come il ramo a colonne di
+    calculate_validation_function_array. Con p < 2^31 tutto resta in int64;
+    primi più grandi usano array di interi Python (dtype object).
+
+    Args:
+        partials: indice della quota -> valori parziali, uno per output (stesso ordine)
+
+    Returns:
+        Valore ricostruito per ogni output
+    """
+    indices = tuple(partials)
+    if not indices:
+        return []
+    if len({len(partials[index]) for index in indices}) > 1:
+        raise ValueError("Partials must have same length")
+
+    weights = lagrange_weights(indices, prime)
+    dtype = np.int64 if (prime - 1) * (prime - 1) + prime - 1 <= _INT64_MAX else object
+    rows = np.array([partials[index] for index in indices], dtype=dtype) % prime
+    totals = np.zeros(rows.shape[1], dtype=dtype)
+    for weight, row in zip(weights, rows):
+        totals = (totals + row * weight) % prime
+    return totals.tolist()
+
+
+# ==================== CIFRATI LINEARI ====================
+
+def encrypt(value: int, secret: int, prime: int = PRIME) -> Ciphertext:
+    """Enc(m) = (a, m + a·sk) con a casuale"""
+    a = secrets.randbelow(prime)
+    return a, (value + a * secret) % prime
+
+
+def add_plain(ciphertext: Ciphertext, value: int, prime: int = PRIME) -> Ciphertext:
+    """Enc(m) ⊕ k = Enc(m + k)"""
+    a, b = ciphertext
+    return a, (b + value) % prime
+
+
+def linear_combination(
+    ciphertexts: Sequence[Ciphertext],
+    coefficients: Sequence[int],
+    bias: int,
+    prime: int = PRIME
+) -> Ciphertext:
+    """Enc(sum(c[i] * X[i]) + bias), cioè F(X) senza il modulo finale"""
+    if len(ciphertexts) != len(coefficients):
+        raise ValueError("Numbers and coefficients must have same length")
+    a_total, b_total = 0, bias
+    for (a, b), coeff in zip(ciphertexts, coefficients):
+        a_total += a * coeff
+        b_total += b * coeff
+    return a_total % prime, b_total % prime
+
+
+def partial_decrypt(ciphertexts: Sequence[Ciphertext], share: Share, prime: int = PRIME) -> List[int]:
+    """Decifrature parziali a·sk_i di un detentore di quota per tutti i cifrati"""
+    _, value = share
+    return [a * value % prime for a, _ in ciphertexts]
+
+
+def combine(
+    ciphertexts: Sequence[Ciphertext],
+    partials: Dict[int, Sequence[int]],
+    prime: int = PRIME
+) -> List[int]:
+    """
+    Messaggi in chiaro da `threshold` decifrature parziali
+
+    Args:
+        ciphertexts: Cifrati (es. output di tutte le variazioni di un gioco)
+        partials: indice della quota -> partial_decrypt dei cifrati
+
+    Returns:
+        Valori in [0, p-1], nello stesso ordine dei cifrati
+    """
+    masks = reconstruct_batch(partials, prime)
+    if len(masks) != len(ciphertexts):
+        raise ValueError("Partials must cover every ciphertext")
+    return [(b - mask) % prime for (_, b), mask in zip(ciphertexts, masks)]
@@ -1,6 +1,7 @@
 """
 FastAPI Application - Entry Point
 """
+import asyncio
 import sys
 from pathlib import Path
 
@@ -10,7 +11,7 @@ sys.path.insert(0, str(backend_dir))
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from api.routes import router
+from api.routes import router, game_manager, async_manager, key_pool
 from api.websocket import manager
 import uvicorn
 
@@ -34,6 +35,24 @@ app.add_middleware(
 app.include_router(router, prefix="/api", tags=["game"])
 
 
+@app.on_event("startup")
+async def startup():
+    """Avvia il pool di chiavi e inoltra ai client WebSocket gli eventi in background (es. VRF evaso)"""
+    key_pool.start()
+    loop = asyncio.get_running_loop()
+    game_manager.subscribe(
+        lambda game_id, event: asyncio.run_coroutine_threadsafe(manager.broadcast(game_id, event), loop)
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Completa le richieste in corso, evade i VRF, sigilla le tx pending e chiude la chain"""
+    key_pool.close()
+    async_manager.close()
+    game_manager.close()
+
+
 # WebSocket endpoint
 @app.websocket("/ws/{game_id}")
 async def websocket_endpoint(websocket: WebSocket, game_id: str):
@@ -4,6 +4,9 @@ from .game_models import (
     Player,
     Game,
     Transaction,
+    EventLog,
+    TransactionReceipt,
+    InclusionProof,
     VRFResult,
     Commitment,
     Variation,
@@ -16,6 +19,9 @@ __all__ = [
     "Player",
     "Game",
     "Transaction",
+    "EventLog",
+    "TransactionReceipt",
+    "InclusionProof",
     "VRFResult",
     "Commitment",
     "Variation",
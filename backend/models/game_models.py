@@ -2,6 +2,7 @@ from enum import Enum
 from typing import List, Optional, Dict
 from pydantic import BaseModel, Field
 from datetime import datetime
+from utils.clock import now
 
 
 class GameState(str, Enum):
@@ -27,6 +28,23 @@ class PlayerStatus(str, Enum):
     TIMED_OUT = "TIMED_OUT"
 
 
+class MatchStatus(str, Enum):
+    QUEUED = "QUEUED"
+    MATCHED = "MATCHED"
+    FAILED = "FAILED"        # Registrazione rifiutata (es. XPF insufficienti)
+    CANCELLED = "CANCELLED"
+
+
+class EventLog(BaseModel):
+    address: str
+    topics: List[str]  # [function_name, game_id, player]
+    data: Dict = Field(default_factory=dict)
+    # Valorizzati nei risultati di get_logs
+    tx_hash: Optional[str] = None
+    block_number: Optional[int] = None
+    log_index: Optional[int] = None
+
+
 class Transaction(BaseModel):
     tx_hash: str
     from_address: str
@@ -34,9 +52,31 @@ class Transaction(BaseModel):
     function_name: str
     params: Dict
     gas_used: int
+    gas_price: int = 20  # Gwei offerti, determinano la priorità in mempool
     block_number: int
     timestamp: datetime
     status: str = "success"
+    logs: List[EventLog] = Field(default_factory=list)
+
+
+class TransactionReceipt(BaseModel):
+    tx_hash: str
+    block_number: int
+    block_hash: str
+    transaction_index: int  # Posizione della tx nel blocco
+    gas_used: int
+    cumulative_gas_used: int  # Gas del blocco fino a questa tx inclusa
+    status: str = "success"
+
+
+class InclusionProof(BaseModel):
+    tx_hash: str
+    block_number: int
+    block_hash: str
+    merkle_root: str
+    transaction_index: int
+    transaction_count: int  # Foglie del tree: serve a verificare la proof
+    proof: List[str]  # Fratelli dal livello foglia alla radice
 
 
 class VRFResult(BaseModel):
@@ -45,6 +85,11 @@ class VRFResult(BaseModel):
     request_id: str
     timestamp: datetime
     block_number: int
+    # Fulfillment a batch: il seed è la foglia batch_index del Merkle tree firmato dalla proof
+    batch_root: Optional[str] = None
+    batch_index: Optional[int] = None
+    batch_size: Optional[int] = None
+    batch_path: Optional[List[str]] = None
 
 
 class Commitment(BaseModel):
@@ -82,8 +127,9 @@ class Player(BaseModel):
     seed_player: Optional[str] = None
     commitment: Optional[Commitment] = None
     variations: List[Variation] = Field(default_factory=list)
+    variations_requested: int = 0  # Variazioni pagate (quelle calcolate sono in `variations`)
     final_submission: Optional[FinalSubmission] = None
-    registered_at: datetime = Field(default_factory=datetime.now)
+    registered_at: datetime = Field(default_factory=now)
 
 
 class Game(BaseModel):
@@ -91,16 +137,18 @@ class Game(BaseModel):
     status: GameState = GameState.REGISTERING
     players: List[Player] = Field(default_factory=list)
     max_players: int = 3
+    vrf_request_id: Optional[str] = None  # Richiesta VRF in attesa (ripresa al riavvio)
     vrf_result: Optional[VRFResult] = None
+    phase_deadline: Optional[datetime] = None  # Scadenza della fase corrente (None = nessuna)
     seed_function: Optional[str] = None
     function_coefficients: Optional[List[int]] = None
     function_bias: Optional[int] = None
     winner: Optional[str] = None
     winning_output: Optional[int] = None
-    created_at: datetime = Field(default_factory=datetime.now)
+    created_at: datetime = Field(default_factory=now)
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
-    transactions: List[Transaction] = Field(default_factory=list)
+    tx_hashes: List[str] = Field(default_factory=list)  # Dettagli via blockchain.get_transaction
 
     def get_player(self, address: str) -> Optional[Player]:
         for player in self.players:
@@ -111,8 +159,23 @@ class Game(BaseModel):
     def is_full(self) -> bool:
         return len(self.players) >= self.max_players
 
+    def active_players(self) -> List[Player]:
+        """Giocatori non esclusi per timeout"""
+        return [p for p in self.players if p.status != PlayerStatus.TIMED_OUT]
+
     def all_committed(self) -> bool:
-        return all(p.commitment is not None for p in self.players)
+        return all(p.commitment is not None for p in self.active_players())
 
     def all_submitted(self) -> bool:
-        return all(p.final_submission is not None for p in self.players)
+        return all(p.final_submission is not None for p in self.active_players())
+
+
+class MatchTicket(BaseModel):
+    """Posto in coda di matchmaking di un giocatore"""
+    player_address: str
+    status: MatchStatus = MatchStatus.QUEUED
+    bucket: str = ""
+    game_id: Optional[str] = None
+    error: Optional[str] = None
+    queued_at: datetime = Field(default_factory=now)
+    matched_at: Optional[datetime] = None
@@ -0,0 +1,4 @@
+from .game_store import GameStore
+from .game_archive import GameArchive
+
+__all__ = ["GameStore", "GameArchive"]
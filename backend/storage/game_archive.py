@@ -0,0 +1,121 @@
+"""
+Game Archive - Archivio cold compresso dei giochi conclusi
+
+I giochi COMPLETED oltre il TTL lasciano la memoria e finiscono qui: un file
+append-only di record compressi (uno per gioco) con indice in memoria
+game_id -> posizione. Le letture recenti passano da una cache LRU.
+"""
+import os
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from models.game_models import Game
+
+# Header del record: lunghezza game_id, lunghezza dati compressi
+_HEADER = struct.Struct("<HI")
+
+
+class GameArchive:
+    """
+    File `games.archive`: record [header][game_id][JSON zlib]
+
+    L'indice si ricostruisce all'avvio leggendo solo gli header. Un gioco
+    archiviato due volte (es. crash prima che lo store lo dimentichi) vale
+    per l'ultimo record.
+    """
+
+    def __init__(self, directory: str, cache_size: int = 256, compression_level: int = 6):
+        self.directory = directory
+        self.cache_size = cache_size
+        self.compression_level = compression_level
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = os.path.join(directory, "games.archive")
+        self._file = open(self.path, "ab+")
+        self._write_lock = threading.Lock()
+        self._index: Dict[str, Tuple[int, int]] = {}  # game_id -> (offset dati, lunghezza)
+        self._load_index()
+
+        self._cache: "OrderedDict[str, Game]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self.bytes_written = 0
+        self.bytes_raw = 0
+
+    def _load_index(self):
+        size = os.path.getsize(self.path)
+        fd = self._file.fileno()
+        offset = 0
+        while offset + _HEADER.size <= size:
+            id_length, data_length = _HEADER.unpack(os.pread(fd, _HEADER.size, offset))
+            end = offset + _HEADER.size + id_length + data_length
+            if end > size:
+                break  # Record troncato da un crash: verrà sovrascritto dal prossimo append
+            game_id = os.pread(fd, id_length, offset + _HEADER.size).decode()
+            self._index[game_id] = (offset + _HEADER.size + id_length, data_length)
+            offset = end
+        if offset < size:
+            self._file.truncate(offset)
+
+    def __contains__(self, game_id: str) -> bool:
+        return game_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def write(self, records: List[Tuple[str, str]]):
+        """Archivia (game_id, JSON del gioco) e sincronizza su disco prima di ritornare"""
+        if not records:
+            return
+        compressed = [
+            (game_id.encode(), zlib.compress(data.encode(), self.compression_level), len(data))
+            for game_id, data in records
+        ]
+        with self._write_lock:
+            offset = self._file.seek(0, os.SEEK_END)
+            chunks = []
+            positions = []
+            for game_id, data, _ in compressed:
+                chunks.append(_HEADER.pack(len(game_id), len(data)) + game_id + data)
+                positions.append((game_id.decode(), offset + _HEADER.size + len(game_id), len(data)))
+                offset += len(chunks[-1])
+            self._file.write(b"".join(chunks))
+            self._file.flush()
+            # Il chiamante toglie i giochi da memoria e store solo dopo questo punto
+            os.fsync(self._file.fileno())
+            for game_id, position, length in positions:
+                self._index[game_id] = (position, length)
+            self.bytes_written += sum(len(chunk) for chunk in chunks)
+            self.bytes_raw += sum(raw for _, _, raw in compressed)
+
+    def get_cached(self, game_id: str) -> Optional[Game]:
+        """Gioco archiviato solo se già nella cache LRU (nessuna lettura da disco)"""
+        with self._cache_lock:
+            game = self._cache.get(game_id)
+            if game is not None:
+                self._cache.move_to_end(game_id)
+            return game
+
+    def get(self, game_id: str) -> Optional[Game]:
+        """Gioco archiviato (dalla cache LRU se letto di recente)"""
+        game = self.get_cached(game_id)
+        if game is not None:
+            return game
+
+        position = self._index.get(game_id)
+        if position is None:
+            return None
+        offset, length = position
+        game = Game.model_validate_json(zlib.decompress(os.pread(self._file.fileno(), length, offset)))
+
+        with self._cache_lock:
+            self._cache[game_id] = game
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return game
+
+    def close(self):
+        self._file.close()
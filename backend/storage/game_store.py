@@ -0,0 +1,245 @@
+"""
+Game Store - Persistenza SQLite (WAL) di giochi e balance XPF
+
+I giochi caldi restano nel dict in memoria di GameManager; le mutazioni
+segnano solo l'id come "sporco" e un thread write-behind scrive a batch,
+in una sola transazione, l'ultimo stato di tutto ciò che è cambiato.
+Le richieste non aspettano mai il disco.
+"""
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Callable, ContextManager, Dict, Iterable, List, Optional, Tuple
+
+from models.game_models import Game, GameState
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_status ON games(status);
+CREATE TABLE IF NOT EXISTS balances (
+    address TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class GameStore:
+    """
+    Store SQLite con cache write-behind
+
+    Ogni gioco è un documento JSON (Game con Player, Commitment, Variation,
+    FinalSubmission annidati) più la colonna `status` per trovare i giochi
+    in corso al riavvio. Le scritture dello stesso gioco tra due flush si
+    riducono a una sola riga.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.05, max_batch: int = 512):
+        """
+        Args:
+            path: File del database (creato se manca)
+            flush_interval: Attesa massima tra una mutazione e la sua scrittura
+            max_batch: Oggetti sporchi che anticipano il flush
+        """
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # In WAL basta sincronizzare ai checkpoint: un crash perde al più l'ultimo flush
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        # Letture su richiesta (giochi conclusi non caricati) su una connessione propria:
+        # in WAL non aspettano il flush in corso
+        self._read_conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._read_lock = threading.Lock()
+
+        self._dirty_lock = threading.Lock()
+        self._dirty_games: set = set()
+        self._dirty_balances: set = set()
+        self._dirty_meta: Dict[str, Optional[str]] = {}
+        self._forgotten: set = set()
+        # Serializza i flush (thread write-behind e flush espliciti)
+        self._write_lock = threading.Lock()
+
+        self._games: Dict[str, Game] = {}
+        self._balances: Dict[str, int] = {}
+        self._lock_for: Optional[Callable[[str], ContextManager]] = None
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.flushes = 0
+        self.rows_written = 0
+
+    # ==================== LETTURA ====================
+
+    def load_games(self, statuses: Optional[Iterable[GameState]] = None) -> List[Game]:
+        """Giochi salvati, opzionalmente solo quelli negli stati indicati"""
+        if statuses is None:
+            rows = self._conn.execute("SELECT data FROM games")
+        else:
+            values = [status.value for status in statuses]
+            rows = self._conn.execute(
+                f"SELECT data FROM games WHERE status IN ({','.join('?' * len(values))})", values
+            )
+        return [Game.model_validate_json(data) for (data,) in rows]
+
+    def load_game(self, game_id: str) -> Optional[Game]:
+        """Un gioco salvato, letto su richiesta (es. un concluso non caricato all'avvio)"""
+        with self._read_lock:
+            row = self._read_conn.execute("SELECT data FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return Game.model_validate_json(row[0]) if row else None
+
+    def load_completed(self) -> List[Tuple[float, str]]:
+        """(completed_at, game_id) dei giochi conclusi in ordine di completamento, senza decodificarli"""
+        rows = self._conn.execute(
+            "SELECT json_extract(data, '$.completed_at') AS completed_at, game_id FROM games "
+            "WHERE status = ? ORDER BY completed_at",
+            (GameState.COMPLETED.value,)
+        )
+        return [
+            (datetime.fromisoformat(completed_at).timestamp() if completed_at else 0.0, game_id)
+            for completed_at, game_id in rows
+        ]
+
+    def get_status(self, game_id: str) -> Optional[GameState]:
+        """Stato di un gioco salvato senza decodificarlo"""
+        with self._read_lock:
+            row = self._read_conn.execute("SELECT status FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return GameState(row[0]) if row else None
+
+    def load_balances(self) -> Dict[str, int]:
+        return dict(self._conn.execute("SELECT address, balance FROM balances"))
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    # ==================== WRITE-BEHIND ====================
+
+    def start(
+        self,
+        games: Dict[str, Game],
+        balances: Dict[str, int],
+        lock_for: Callable[[str], ContextManager]
+    ):
+        """
+        Avvia il thread write-behind
+
+        Args:
+            games: Dict vivo dei giochi (la cache calda)
+            balances: Dict vivo dei balance XPF
+            lock_for: Lock del gioco, preso durante la serializzazione
+        """
+        self._games = games
+        self._balances = balances
+        self._lock_for = lock_for
+        self._thread = threading.Thread(target=self._run, name="game-store", daemon=True)
+        self._thread.start()
+
+    def mark_game(self, game_id: str, addresses: Iterable[str] = ()):
+        """Segna un gioco (e i balance dei suoi giocatori) da riscrivere"""
+        with self._dirty_lock:
+            self._dirty_games.add(game_id)
+            self._dirty_balances.update(addresses)
+            pending = len(self._dirty_games) + len(self._dirty_balances)
+        if pending >= self.max_batch:
+            self._wake.set()
+
+    def mark_balances(self, addresses: Iterable[str]):
+        """Segna balance cambiati fuori da un gioco locale (es. richieste di altri shard)"""
+        with self._dirty_lock:
+            self._dirty_balances.update(addresses)
+
+    def forget_games(self, game_ids: Iterable[str]):
+        """Cancella giochi spostati altrove (es. nell'archivio cold) al prossimo flush"""
+        with self._dirty_lock:
+            self._forgotten.update(game_ids)
+
+    def set_meta(self, key: str, value: Optional[str]):
+        with self._dirty_lock:
+            self._dirty_meta[key] = value
+
+    @property
+    def pending(self) -> int:
+        with self._dirty_lock:
+            return (len(self._dirty_games) + len(self._dirty_balances)
+                    + len(self._dirty_meta) + len(self._forgotten))
+
+    def flush(self):
+        """Scrive subito tutto ciò che è sporco, in una transazione"""
+        with self._write_lock:
+            with self._dirty_lock:
+                game_ids, self._dirty_games = self._dirty_games, set()
+                addresses, self._dirty_balances = self._dirty_balances, set()
+                meta, self._dirty_meta = self._dirty_meta, {}
+                forgotten, self._forgotten = self._forgotten, set()
+            if not (game_ids or addresses or meta or forgotten):
+                return
+
+            # Serializzazione fuori dal lock dei dirty: le mutazioni proseguono;
+            # una mutazione successiva ri-segna il gioco per il flush seguente
+            game_rows = []
+            for game_id in game_ids:
+                game = self._games.get(game_id)
+                if game is None:
+                    continue
+                with self._lock_for(game_id):
+                    game_rows.append((game_id, game.status.value, game.model_dump_json()))
+            balance_rows = [
+                (address, self._balances[address])
+                for address in addresses if address in self._balances
+            ]
+
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany("INSERT OR REPLACE INTO games VALUES (?, ?, ?)", game_rows)
+                self._conn.executemany("INSERT OR REPLACE INTO balances VALUES (?, ?)", balance_rows)
+                self._conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", meta.items())
+                # Dopo gli upsert: un gioco appena archiviato non deve ricomparire
+                self._conn.executemany("DELETE FROM games WHERE game_id = ?", [(g,) for g in forgotten])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                # Rimette in coda: il prossimo flush ritenta
+                with self._dirty_lock:
+                    self._dirty_games |= game_ids
+                    self._dirty_balances |= addresses
+                    self._dirty_meta = {**meta, **self._dirty_meta}
+                    self._forgotten |= forgotten
+                raise
+
+            self.flushes += 1
+            self.rows_written += len(game_rows) + len(balance_rows) + len(meta) + len(forgotten)
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Game store flush failed")
+
+    def close(self):
+        """Ferma il thread, scrive le ultime mutazioni e chiude il database"""
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+        self._conn.close()
+        self._read_conn.close()
@@ -15,6 +15,16 @@ def print_section(title):
     print("=" * 60)
 
 
+def wait_for_status(game_id, statuses, timeout=10.0):
+    """Polling dello stato del gioco (niente attese fisse)"""
+    deadline = time.time() + timeout
+    while True:
+        game = requests.get(f"{BASE_URL}/game/{game_id}").json()
+        if game["status"] in statuses or time.time() > deadline:
+            return game
+        time.sleep(0.05)
+
+
 def test_full_game():
     """Testa flusso completo di un gioco"""
 
@@ -38,11 +48,8 @@ def test_full_game():
         print(f"Giocatore {i+1} registrato: {player_address}")
         print(f"  XPF Balance: {player['xpf_balance']}")
 
-    time.sleep(1)  # Aspetta VRF fulfillment
-
     print_section("3. STATO DOPO REGISTRAZIONE")
-    response = requests.get(f"{BASE_URL}/game/{game_id}")
-    game = response.json()
+    game = wait_for_status(game_id, ["RANDOMNESS_FULFILLED"])  # Aspetta VRF fulfillment
     print(f"Status gioco: {game['status']}")
     print(f"Seed funzione: {game['seed_function'][:20]}..." if game['seed_function'] else "Non ancora generato")
 
@@ -101,11 +108,8 @@ def test_full_game():
         result = response.json()
         print(f"  Commitment submitted: {result['tx_hash'][:20]}...")
 
-    time.sleep(0.5)
-
     print_section("6. FUNZIONE DI VALIDAZIONE GENERATA")
-    response = requests.get(f"{BASE_URL}/game/{game_id}")
-    game = response.json()
+    game = wait_for_status(game_id, ["PLAYING"])
     print(f"Status: {game['status']}")
     print(f"Coefficienti: {game['function_coefficients']}")
     print(f"Bias: {game['function_bias']}")
@@ -192,11 +196,8 @@ def test_full_game():
         print(f"  Variazioni usate: {variations_count}")
         print(f"  TX: {result['tx_hash'][:20]}...")
 
-    time.sleep(0.5)
-
     print_section("9. RISULTATI FINALI")
-    response = requests.get(f"{BASE_URL}/game/{game_id}")
-    game = response.json()
+    game = wait_for_status(game_id, ["COMPLETED"])
 
     print(f"\nStatus gioco: {game['status']}")
     print(f"\nVINCITORE: {game['winner']}")
@@ -0,0 +1,8 @@
+"""
+Configurazione pytest: i moduli del backend si importano come dal server
+Esegui dalla cartella backend: python -m pytest tests
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
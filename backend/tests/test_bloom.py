@@ -0,0 +1,35 @@
+"""
+Log Bloom - Nessun falso negativo, nemmeno per i topic vuoti
+"""
+from blockchain.bloom import LogBloom
+from blockchain.mock_blockchain import MockBlockchain
+from blockchain.tx_record import TxRecord
+
+
+def test_add_all_includes_empty_topics():
+    bloom = LogBloom()
+    bloom.add_all(("createGame", "", "0xSystem"))
+    assert bloom.might_contain("createGame")
+    assert bloom.might_contain("")
+    assert bloom.might_contain("0xSystem")
+
+
+def test_get_logs_finds_empty_game_id():
+    chain = MockBlockchain(mining_delay=0)
+    tx = TxRecord.create(
+        from_address="0xPlayer",
+        function_name="deposit",
+        params={"amount": 10},
+        to_address="0xContract",
+        gas_used=21_000,
+        gas_price=20,
+        timestamp=1_700_000_000.0,
+        nonce=0
+    )
+    assert tx.game_id == ""
+    chain.submit_transaction(tx)
+    chain.mine_block()
+
+    logs = chain.get_logs(topics=["deposit", ""])
+    assert [log.tx_hash for log in logs] == [tx.tx_hash]
+    chain.close()
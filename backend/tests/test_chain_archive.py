@@ -0,0 +1,86 @@
+"""
+Chain archive - Riavvio senza BlockStore con blocchi già archiviati
+"""
+from blockchain.chain_archive import ChainArchive
+from blockchain.mock_blockchain import MockBlockchain
+
+
+def _archiving_chain(directory) -> MockBlockchain:
+    chain = MockBlockchain(mining_delay=0, prune_depth=2, archive=ChainArchive(str(directory)))
+    # Come il GameManager, ma ripassando ogni volta tutti gli header: i già scritti vengono saltati
+    chain.prune_listeners.append(
+        lambda _: chain.archive.append_headers([header.to_dict() for header in chain.headers])
+    )
+    return chain
+
+
+def _mine(chain: MockBlockchain, count: int):
+    hashes = []
+    for i in range(count):
+        tx = chain.create_transaction("0xArchived", "registerPlayer", {"round": i})
+        chain.mine_block()
+        chain.prune()
+        hashes.append(tx.tx_hash)
+    return hashes
+
+
+def test_restart_continues_after_archived_blocks(tmp_path):
+    chain = _archiving_chain(tmp_path)
+    first_run = _mine(chain, 10)
+    height, tip_hash = chain.current_block_number, chain.chain[-1].hash
+    archived = chain.archive.height
+
+    restarted = _archiving_chain(tmp_path)
+    # I blocchi ancora residenti al momento dello stop sono persi: si riparte dall'archivio
+    assert restarted.current_block_number == archived <= height
+    assert restarted.get_header(archived - 2).hash == chain.get_header(archived - 2).hash
+
+    second_run = _mine(restarted, 10)
+    assert restarted.archive.height > archived
+    for block_number in range(1, restarted.archive.height):
+        block = restarted.get_block(block_number)
+        assert block.block_number == block_number
+        assert block.previous_hash == restarted.get_block(block_number - 1).hash
+    assert tip_hash != restarted.chain[-1].hash
+
+    for tx_hash in first_run[:archived - 1] + second_run:
+        assert restarted.get_transaction(tx_hash).tx_hash == tx_hash
+
+    # headers.jsonl resta contiguo, senza header ripetuti
+    headers = restarted.archive.load_headers()
+    assert [h["block_number"] for h in headers] == list(range(len(headers)))
+    assert len(headers) == len(restarted.headers)
+
+
+def test_restart_rebuilds_missing_headers(tmp_path):
+    chain = MockBlockchain(mining_delay=0, prune_depth=2, archive=ChainArchive(str(tmp_path)))
+    _mine(chain, 6)
+    # Nessun listener ha scritto gli header (crash prima di append_headers)
+    assert chain.archive.load_headers() == []
+
+    restarted = MockBlockchain(mining_delay=0, prune_depth=2, archive=ChainArchive(str(tmp_path)))
+    headers = restarted.archive.load_headers()
+    assert [h["block_number"] for h in headers] == list(range(restarted.archive.height))
+    assert restarted.get_header(0).hash == chain.get_header(0).hash
+
+
+def test_tx_index_grows_and_is_rebuilt(tmp_path):
+    chain = MockBlockchain(mining_delay=0, prune_depth=1, archive=ChainArchive(str(tmp_path)))
+    hashes = []
+    # Oltre metà della capacità iniziale di tx.hash: almeno un raddoppio
+    for block in range(12):
+        for i in range(100):
+            hashes.append(chain.create_transaction("0xArchived", "registerPlayer", {"i": i}).tx_hash)
+        chain.mine_block()
+        chain.prune()
+    chain.close()
+
+    archive = ChainArchive(str(tmp_path))
+    assert all(archive.find_transaction(tx_hash) is not None for tx_hash in hashes[:1100])
+    archive.close()
+
+    (tmp_path / "tx.hash").unlink()
+    restarted = MockBlockchain(mining_delay=0, prune_depth=1, archive=ChainArchive(str(tmp_path)))
+    for tx_hash in hashes[:1100:37]:
+        assert restarted.get_transaction(tx_hash).tx_hash == tx_hash
+    assert restarted.archive.find_transaction("0x" + "ab" * 32) is None
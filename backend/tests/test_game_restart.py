@@ -0,0 +1,51 @@
+"""
+Riavvio del GameManager da SQLite - I giochi conclusi restano da archiviare
+"""
+import time
+
+from core.game_manager import GameManager
+from models.game_models import GameState
+from utils.clock import VirtualClock
+
+
+def _manager(tmp_path, clock: VirtualClock) -> GameManager:
+    return GameManager(
+        clock=clock,
+        db_path=str(tmp_path / "games.db"),
+        game_archive_dir=str(tmp_path / "archive"),
+        completed_ttl=600,
+        registration_timeout=10,
+        timeout_tick=5
+    )
+
+
+def _eventually(predicate, timeout: float = 5.0) -> bool:
+    """Il thread di pulizia reagisce al tempo virtuale con un breve ritardo reale"""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_completed_games_are_archived_after_restart(tmp_path):
+    clock = VirtualClock()
+    manager = _manager(tmp_path, clock)
+    game_ids = [manager.create_game().game_id for _ in range(3)]
+    # Nessun iscritto: alla scadenza della registrazione il thread di pulizia chiude il gioco
+    clock.advance(15)
+    assert _eventually(lambda: all(manager.get_game_status(game_id) == GameState.COMPLETED for game_id in game_ids))
+    manager.close()
+
+    restarted = _manager(tmp_path, clock)
+    # Non caricati in memoria, ma in coda per l'archivio
+    assert not any(game_id in restarted.games for game_id in game_ids)
+    assert restarted.evict_completed() == 0
+
+    clock.advance(600)
+    assert _eventually(lambda: all(game_id in restarted.game_archive for game_id in game_ids))
+    restarted.store.flush()
+    assert all(restarted.store.get_status(game_id) is None for game_id in game_ids)
+    assert restarted.get_game(game_ids[0]).status == GameState.COMPLETED
+    restarted.close()
@@ -0,0 +1,53 @@
+"""
+Matchmaking - Posti liberati da registrazioni fallite
+"""
+import time
+
+from core.game_manager import GameManager
+from core.matchmaking import Matchmaker
+from models.game_models import GameState, MatchStatus
+from utils.clock import VirtualClock
+
+
+def _broke(manager: GameManager, address: str) -> str:
+    manager.contract.xpf_balances[address] = 0
+    return address
+
+
+def test_failed_registration_frees_the_seat():
+    manager = GameManager(clock=VirtualClock())
+    matchmaker = Matchmaker(manager, max_players=3, clock=manager.clock)
+    matchmaker.enqueue("0xA")
+    matchmaker.enqueue(_broke(manager, "0xBroke"))
+    ticket = matchmaker.enqueue("0xB")
+
+    failed = matchmaker.get_ticket("0xBroke")
+    assert failed.status == MatchStatus.FAILED and failed.error == "Insufficient XPF"
+    assert len(manager.get_game(ticket.game_id).players) == 2
+
+    late = matchmaker.enqueue("0xC")
+    assert late.status == MatchStatus.MATCHED and late.game_id == ticket.game_id
+    assert matchmaker.games_formed == 1
+
+
+def test_stale_open_game_is_dropped():
+    clock = VirtualClock()
+    manager = GameManager(clock=clock, registration_timeout=10, timeout_tick=5)
+    matchmaker = Matchmaker(manager, max_players=3, clock=clock)
+    matchmaker.enqueue("0xA")
+    matchmaker.enqueue(_broke(manager, "0xBroke"))
+    game_id = matchmaker.enqueue("0xB").game_id
+
+    # La registrazione scade (thread di pulizia, sul tempo virtuale): il gioco parte con i due presenti
+    clock.advance(15)
+    deadline = time.monotonic() + 5
+    while manager.get_game_status(game_id) == GameState.REGISTERING and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert manager.get_game_status(game_id) != GameState.REGISTERING
+
+    late = matchmaker.enqueue("0xC")
+    assert late.status == MatchStatus.QUEUED
+    matchmaker.enqueue("0xD")
+    formed = matchmaker.enqueue("0xE")
+    assert formed.status == MatchStatus.MATCHED and formed.game_id != game_id
+    assert matchmaker.get_ticket("0xC").game_id == formed.game_id
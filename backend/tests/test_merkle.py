@@ -0,0 +1,50 @@
+"""
+Merkle tree - Radici con foglie dispari e verifica delle proof
+"""
+import hashlib
+
+import pytest
+
+from blockchain.merkle import EMPTY_ROOT, MerkleTree, verify_inclusion_proof
+
+
+def _hashes(count: int):
+    return ["0x" + hashlib.sha256(str(i).encode()).hexdigest() for i in range(count)]
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 5, 7, 8, 9, 16, 17, 33])
+def test_every_proof_verifies(count):
+    hashes = _hashes(count)
+    tree = MerkleTree(hashes)
+    for index, tx_hash in enumerate(hashes):
+        proof = tree.get_proof(index)
+        assert verify_inclusion_proof(tx_hash, index, count, proof, tree.root)
+
+
+@pytest.mark.parametrize("count", [3, 5, 9])
+def test_wrong_proofs_fail(count):
+    hashes = _hashes(count)
+    tree = MerkleTree(hashes)
+    proof = tree.get_proof(count - 1)
+    other = _hashes(count + 1)[-1]
+
+    assert not verify_inclusion_proof(other, count - 1, count, proof, tree.root)
+    assert not verify_inclusion_proof(hashes[-1], count - 2, count, proof, tree.root)
+    assert not verify_inclusion_proof(hashes[-1], count - 1, count + 1, proof, tree.root)
+    assert not verify_inclusion_proof(hashes[-1], count - 1, count, proof + proof[:1], tree.root)
+    assert not verify_inclusion_proof(hashes[-1], count, count, proof, tree.root)
+
+
+def test_odd_leaf_is_not_duplicated():
+    # CVE-2012-2459: [a, b, c] non deve avere la radice di [a, b, c, c]
+    hashes = _hashes(3)
+    assert MerkleTree(hashes).root != MerkleTree(hashes + hashes[-1:]).root
+
+
+def test_incremental_append_matches_bulk_build():
+    hashes = _hashes(21)
+    tree = MerkleTree()
+    for count, tx_hash in enumerate(hashes, start=1):
+        tree.append(tx_hash)
+        assert tree.root == MerkleTree(hashes[:count]).root
+    assert MerkleTree().root == EMPTY_ROOT
@@ -0,0 +1,44 @@
+"""
+Funzione di validazione - La versione NumPy coincide con quella scalare
+"""
+import random
+
+import numpy as np
+import pytest
+
+from crypto.number_derivation import (
+    calculate_validation_function,
+    calculate_validation_function_array,
+    calculate_validation_function_batch,
+)
+
+
+def _case(rng: random.Random, rows: int, low: int, high: int):
+    states = [[rng.randint(low, high) for _ in range(10)] for _ in range(rows)]
+    coefficients = [rng.randint(-100, 100) for _ in range(10)]
+    return states, coefficients, rng.randint(-1000, 1000)
+
+
+@pytest.mark.parametrize("low,high", [(0, 1000), (-1000, 1000), (-(10 ** 12), 10 ** 12)])
+def test_array_is_bit_identical_to_scalar(low, high):
+    states, coefficients, bias = _case(random.Random(low), 2000, low, high)
+    expected = [calculate_validation_function(state, coefficients, bias) for state in states]
+
+    outputs = calculate_validation_function_array(np.array(states), coefficients, bias)
+    assert outputs.dtype == np.int64
+    assert outputs.tolist() == expected
+    assert calculate_validation_function_batch(states, coefficients, bias) == expected
+
+
+def test_large_modulus_takes_the_column_path():
+    states, coefficients, bias = _case(random.Random(1), 500, 0, 10 ** 9)
+    modulo = 2 ** 31 - 1
+    expected = [calculate_validation_function(state, coefficients, bias, modulo) for state in states]
+    assert calculate_validation_function_array(np.array(states), coefficients, bias, modulo).tolist() == expected
+
+
+def test_shape_and_modulus_errors():
+    with pytest.raises(ValueError):
+        calculate_validation_function_array(np.zeros((3, 9), dtype=np.int64), [1] * 10, 0)
+    with pytest.raises(ValueError):
+        calculate_validation_function_array(np.zeros((3, 10), dtype=np.int64), [1] * 10, 0, modulo=2 ** 40)
@@ -0,0 +1,86 @@
+"""
+Paillier e HomomorphicEngine - Operazioni omomorfiche e pool di casualità
+"""
+import pytest
+
+from crypto.homomorphic import HomomorphicEngine
+from crypto.number_derivation import calculate_validation_function
+from crypto.paillier import PaillierPublicKey, RandomnessPool, generate_paillier_keypair
+
+
+@pytest.fixture(scope="module")
+def small_keypair():
+    # Chiave piccola: le proprietà algebriche non dipendono dalla dimensione
+    return generate_paillier_keypair(512)
+
+
+@pytest.fixture(scope="module")
+def engine_keys():
+    return HomomorphicEngine.generate_keypair()
+
+
+def test_encrypt_add_scalar_mul_decrypt(small_keypair):
+    public_key, private_key = small_keypair
+    a, b = public_key.encrypt(1234), public_key.encrypt(-56)
+
+    assert private_key.decrypt(a) == 1234
+    assert private_key.decrypt(public_key.add(a, b)) == 1178
+    assert private_key.decrypt(public_key.add_plain(a, -2000)) == -766
+    assert private_key.decrypt(public_key.multiply_plain(a, 7)) == 8638
+    assert private_key.decrypt(public_key.multiply_plain(b, -3)) == 168
+    assert private_key.decrypt(public_key.multiply_plain(a, 0)) == 0
+
+
+def test_rerandomize_keeps_plaintext(small_keypair):
+    public_key, private_key = small_keypair
+    ciphertext = public_key.encrypt(42)
+    fresh = public_key.rerandomize(ciphertext)
+    assert fresh != ciphertext
+    assert private_key.decrypt(fresh) == 42
+
+
+def test_pooled_random_factors_encrypt_correctly(small_keypair):
+    public_key, private_key = small_keypair
+    pool = RandomnessPool(public_key, target=8)
+    pool.fill(4)
+    assert len(pool) == 4
+
+    factors = [pool.take() for _ in range(4)]
+    assert pool.hits == 4
+    assert len(set(factors)) == 4
+    for value, factor in zip((0, 1, -1, 999), factors):
+        assert private_key.decrypt(public_key.encrypt(value, random_factor=factor)) == value
+
+
+def test_check_ciphertext_rejects_out_of_range(small_keypair):
+    public_key, _ = small_keypair
+    n = public_key.n
+    assert public_key.check_ciphertext(public_key.encrypt(5))
+    for bad in (0, -1, n * n, n * n + 1, n, 2 * n):
+        with pytest.raises(ValueError):
+            public_key.check_ciphertext(bad)
+
+
+def test_engine_output_matches_scalar_function(engine_keys):
+    public_key, private_key = engine_keys
+    numbers = [5, 999, 0, 17, 500, 3, 250, 1000, 42, 7]
+    coefficients = [3, -8, 100, 0, -1, 55, 2, -99, 10, 1]
+    deltas = [-20, 20, 0, -5, 13, -3, 7, -20, 1, -7]
+    bias = -321
+
+    state = HomomorphicEngine.encrypt_numbers(numbers, public_key)
+    state = HomomorphicEngine.apply_delta_to_encrypted(state, deltas, public_key)
+    new_numbers = [number + delta for number, delta in zip(numbers, deltas)]
+    assert HomomorphicEngine.decrypt_numbers(state, private_key) == new_numbers
+
+    output = HomomorphicEngine.compute_output_on_encrypted(state, coefficients, bias, public_key)
+    assert HomomorphicEngine.decrypt_output(output, private_key) == \
+        calculate_validation_function(new_numbers, coefficients, bias)
+
+
+def test_engine_rejects_foreign_ciphertexts(engine_keys):
+    public_key, _ = engine_keys
+    n = PaillierPublicKey.load(public_key).n
+    for bad in ("0", f"{n:x}", f"{n * n:x}", "not-hex"):
+        with pytest.raises(ValueError):
+            HomomorphicEngine.apply_delta_to_encrypted([bad], [1], public_key)
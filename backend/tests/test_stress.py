@@ -0,0 +1,103 @@
+"""
+Stress concorrente - Gli invarianti di XPF e variazioni reggono sotto contesa
+
+Ogni round apre più partite che condividono un giocatore (stesso ledger XPF);
+per ogni giocatore partono insieme molte request_variation e compute_variation,
+poi submit_final_choice duplicate.
+"""
+import asyncio
+
+from blockchain.smart_contract import SmartContract
+from core.async_game_manager import AsyncGameManager
+from core.game_manager import GameManager
+from crypto.number_derivation import derive_numbers_from_seed
+from utils.clock import VirtualClock
+
+ROUNDS = 30
+GAMES = 4
+CALLS = 24
+WORKERS = 32
+
+
+def _setup(manager: GameManager, round_index: int):
+    shared = f"0xShared_{round_index}"
+    lobby = []
+    for g in range(GAMES):
+        game_id = manager.create_game(max_players=3).game_id
+        players = [shared, f"0xStress{g}a_{round_index}", f"0xStress{g}b_{round_index}"]
+        for address in players:
+            manager.register_player(game_id, address)
+        lobby.append((game_id, players))
+    manager.oracle.join()
+    for game_id, players in lobby:
+        game = manager.get_game(game_id)
+        for address in players:
+            numbers = derive_numbers_from_seed(game.get_player(address).seed_player)
+            manager.submit_commitment(
+                game_id, address,
+                public_key="stress_public_key",
+                encrypted_numbers=[f"enc_{n}" for n in numbers],
+                zk_proof="0x" + "0" * 64
+            )
+    return lobby
+
+
+async def _hammer(manager: GameManager, facade: AsyncGameManager, lobby):
+    variations = []
+    for game_id, players in lobby:
+        for address in players:
+            numbers = derive_numbers_from_seed(manager.get_game(game_id).get_player(address).seed_player)
+            for _ in range(CALLS):
+                variations.append(facade.request_variation(game_id, address))
+                variations.append(facade.compute_variation(game_id, address, numbers))
+    await asyncio.gather(*variations, return_exceptions=True)
+
+    finals = [
+        facade.submit_final_choice(game_id, address, 0, "0xstress", 0, "0x" + "1" * 64)
+        for game_id, players in lobby for address in players for _ in range(3)
+    ]
+    await asyncio.gather(*finals, return_exceptions=True)
+
+
+def _violations(manager: GameManager, lobby):
+    violations = []
+    spent = {}
+    rewards = {}
+    for game_id, players in lobby:
+        game = manager.get_game(game_id)
+        # Il giocatore condiviso può finire gli XPF: la partita resta aperta
+        if game.all_submitted() != (game.status.value == "COMPLETED"):
+            violations.append(f"{game_id}: stato {game.status.value}")
+        for address in players:
+            player = game.get_player(address)
+            if player.variations_requested > SmartContract.MAX_VARIATIONS:
+                violations.append(f"{game_id}/{address}: {player.variations_requested} variazioni pagate")
+            if len(player.variations) > player.variations_requested:
+                violations.append(f"{game_id}/{address}: variazioni calcolate senza pagamento")
+            if [v.variation_index for v in player.variations] != list(range(len(player.variations))):
+                violations.append(f"{game_id}/{address}: indici di variazione duplicati")
+            spent[address] = spent.get(address, 0) + player.xpf_spent
+        if game.winner:
+            rewards[game.winner] = rewards.get(game.winner, 0) + SmartContract.WINNER_REWARD
+    for address, total in spent.items():
+        balance = manager.get_player_xpf(address)
+        expected = SmartContract.XPF_INITIAL - total + rewards.get(address, 0)
+        if balance < 0 or balance != expected:
+            violations.append(f"{address}: balance {balance}, atteso {expected}")
+    return violations
+
+
+def test_concurrent_variations_keep_invariants():
+    manager = GameManager(clock=VirtualClock())
+    facade = AsyncGameManager(manager, max_workers=WORKERS, max_pending=WORKERS * 4)
+    violations = []
+    try:
+        for round_index in range(ROUNDS):
+            lobby = _setup(manager, round_index)
+            asyncio.run(_hammer(manager, facade, lobby))
+            violations.extend(_violations(manager, lobby))
+    finally:
+        facade.close()
+        manager.close()
+
+    assert violations == []
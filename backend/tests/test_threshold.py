@@ -0,0 +1,31 @@
+"""
+Threshold - Ricostruzione batch delle quote di Shamir
+"""
+import random
+
+import pytest
+
+from crypto import threshold
+
+
+@pytest.mark.parametrize("prime", [threshold.PRIME, 2**61 - 1, 2**127 - 1])
+def test_combine_recovers_every_value(prime):
+    rng = random.Random(prime)
+    secret, shares = threshold.generate_shared_key(prime=prime)
+    values = [rng.randrange(prime) for _ in range(200)]
+    ciphertexts = [threshold.encrypt(value, secret, prime) for value in values]
+
+    # Qualunque sottoinsieme di `threshold` quote basta
+    for subset in (shares[:4], shares[1:], [shares[0], shares[2], shares[3], shares[4]]):
+        partials = {x: threshold.partial_decrypt(ciphertexts, (x, y), prime) for x, y in subset}
+        assert threshold.combine(ciphertexts, partials, prime) == values
+
+
+def test_batch_matches_single_reconstruction():
+    secret, shares = threshold.generate_shared_key()
+    batch = threshold.reconstruct_batch({x: [y, y * 2 % threshold.PRIME] for x, y in shares[:4]})
+    assert batch == [secret, secret * 2 % threshold.PRIME]
+    assert threshold.reconstruct_secret(shares[:4]) == secret
+    assert threshold.reconstruct_batch({}) == []
+    with pytest.raises(ValueError):
+        threshold.reconstruct_batch({1: [1, 2], 2: [1]})
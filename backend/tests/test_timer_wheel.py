@@ -0,0 +1,64 @@
+"""
+Timer wheel - Scadenze esatte anche quando scendono tra i livelli
+"""
+from utils.clock import VirtualClock
+from utils.timer_wheel import TimerWheel
+
+
+def _wheel(clock: VirtualClock) -> TimerWheel:
+    # 4 slot x 3 livelli: il livello 2 copre fino a 64 tick, oltre si ridistribuisce
+    return TimerWheel(tick=1.0, slots=4, levels=3, clock=clock)
+
+
+def test_deadlines_fire_on_their_tick_across_levels():
+    clock = VirtualClock(start=1000.0)
+    wheel = _wheel(clock)
+    offsets = [1, 3, 4, 5, 15, 16, 17, 63, 64, 65, 200]
+    for offset in offsets:
+        wheel.schedule(f"t{offset}", clock.time() + offset, offset)
+
+    fired = {}
+    for step in range(1, 202):
+        clock.advance(1)
+        for key, value in wheel.advance():
+            fired[key] = step
+            assert value == step
+
+    assert fired == {f"t{offset}": offset for offset in offsets}
+    assert len(wheel) == 0
+
+
+def test_large_jump_fires_everything_due():
+    clock = VirtualClock(start=0.0)
+    wheel = _wheel(clock)
+    for offset in (2, 30, 90):
+        wheel.schedule(offset, offset)
+    clock.advance(50)
+    assert sorted(key for key, _ in wheel.advance()) == [2, 30]
+    clock.advance(50)
+    assert [key for key, _ in wheel.advance()] == [90]
+
+
+def test_reschedule_and_cancel():
+    clock = VirtualClock(start=0.0)
+    wheel = _wheel(clock)
+    wheel.schedule("a", 5)
+    wheel.schedule("b", 5)
+    wheel.schedule("a", 40)  # Sostituisce la scadenza precedente
+    assert wheel.cancel("b")
+    assert not wheel.cancel("b")
+
+    clock.advance(39)
+    assert wheel.advance() == []
+    clock.advance(1)
+    assert wheel.advance() == [("a", None)]
+
+
+def test_fractional_deadline_never_fires_early():
+    clock = VirtualClock(start=0.0)
+    wheel = TimerWheel(tick=1.0, clock=clock)
+    wheel.schedule("x", 10.2)
+    clock.advance(10.5)
+    assert wheel.advance() == []
+    clock.advance(0.5)
+    assert wheel.advance() == [("x", None)]
@@ -0,0 +1,69 @@
+"""
+TxRecord - Codifica canonica e round trip
+"""
+from blockchain.tx_record import TxRecord, decode_params, encode_params
+
+
+def _record(params, **overrides):
+    fields = dict(
+        from_address="0xPlayer",
+        function_name="submitFinalChoice",
+        params=params,
+        to_address="0xContract",
+        gas_used=80_000,
+        gas_price=20,
+        timestamp=1_700_000_000.123456,
+        nonce=7
+    )
+    fields.update(overrides)
+    return TxRecord.create(**fields)
+
+
+def test_round_trip_keeps_every_field():
+    params = {
+        "game_id": "game_1",
+        "none": None,
+        "flag": True,
+        "small": -5,
+        "huge": 1 << 70,
+        "text": "àèì",
+        "nested": {"a": [1, 2]},
+    }
+    tx = _record(params)
+    data = tx.encode()
+    decoded, end = TxRecord.decode(data, 0, block_number=12)
+
+    assert end == len(data)
+    assert decoded.tx_hash == tx.tx_hash == decoded.compute_hash()
+    assert decoded.params == params
+    assert decoded.game_id == "game_1"
+    assert decoded.block_number == 12
+    for field in ("from_address", "to_address", "function_name", "gas_used", "gas_price",
+                  "timestamp_us", "nonce", "status"):
+        assert getattr(decoded, field) == getattr(tx, field)
+
+
+def test_records_decode_back_to_back():
+    txs = [_record({"game_id": f"game_{i}", "i": i}, nonce=i) for i in range(5)]
+    data = b"".join(tx.encode() for tx in txs)
+    pos = 0
+    for tx in txs:
+        decoded, pos = TxRecord.decode(data, pos, 0)
+        assert decoded.tx_hash == tx.tx_hash
+    assert pos == len(data)
+
+
+def test_params_encoding_is_canonical():
+    assert encode_params({"b": 1, "a": "x"}) == encode_params({"a": "x", "b": 1})
+    assert decode_params(encode_params({}))[0] == {}
+
+
+def test_large_fields_round_trip():
+    # Oltre i vecchi limiti u16/u32 di lunghezze e gas
+    params = {"k" * 70_000: 1, **{f"p{i}": i for i in range(70_000)}}
+    tx = _record(params, from_address="0x" + "a" * 70_000, gas_price=1 << 40)
+    decoded, end = TxRecord.decode(tx.encode(), 0, 0)
+    assert end == len(tx.encode())
+    assert decoded.tx_hash == tx.tx_hash
+    assert decoded.gas_price == 1 << 40
+    assert len(decoded.params) == 70_001
@@ -0,0 +1,4 @@
+from .clock import Clock, SystemClock, VirtualClock, get_clock, set_clock
+from .locks import StripedLock
+
+__all__ = ["Clock", "SystemClock", "VirtualClock", "get_clock", "set_clock", "StripedLock"]
@@ -0,0 +1,116 @@
+"""
+Clock - Astrazione del tempo per blockchain, VRF, contratto e modelli
+
+SystemClock usa il tempo reale. VirtualClock avanza solo quando qualcuno
+chiama sleep()/advance(): le attese simulate (mining, latenza VRF) diventano
+istantanee e deterministiche, utile per CI e test di capacità.
+
+sleep() è per chi guida il tempo (il thread della richiesta, il test). I loop
+in background aspettano con wait()/wait_for(): con un VirtualClock si svegliano
+quando il tempo virtuale raggiunge la scadenza, senza mai farlo avanzare.
+"""
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Callable
+
+# Con un VirtualClock advance() non sa chi è in attesa: i loop ricontrollano il tempo a questo intervallo reale
+_VIRTUAL_POLL = 0.01
+
+
+class Clock(ABC):
+    """Interfaccia comune dei clock"""
+
+    @abstractmethod
+    def time(self) -> float:
+        """Secondi dall'epoch"""
+
+    def now(self) -> datetime:
+        return datetime.fromtimestamp(self.time())
+
+    @abstractmethod
+    def sleep(self, seconds: float):
+        """Attende `seconds` secondi (o li fa passare, per un clock virtuale)"""
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        """Attende `event` al più `timeout` secondi di questo clock; True se impostato"""
+        return event.wait(max(0.0, timeout))
+
+    def wait_for(self, condition: threading.Condition, predicate: Callable[[], bool], timeout: float) -> bool:
+        """condition.wait_for con il timeout misurato su questo clock (chiamare con il lock di condition)"""
+        return condition.wait_for(predicate, max(0.0, timeout))
+
+
+class SystemClock(Clock):
+    """Tempo reale (default)"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """Tempo simulato: sleep() avanza il clock senza attendere"""
+
+    def __init__(self, start: float = 1_700_000_000.0):
+        self._time = start
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._time
+
+    def sleep(self, seconds: float):
+        self.advance(seconds)
+
+    def wait(self, event: threading.Event, timeout: float) -> bool:
+        deadline = self._time + timeout
+        while not event.is_set() and self._time < deadline:
+            event.wait(_VIRTUAL_POLL)
+        return event.is_set()
+
+    def wait_for(self, condition: threading.Condition, predicate: Callable[[], bool], timeout: float) -> bool:
+        deadline = self._time + timeout
+        result = predicate()
+        while not result and self._time < deadline:
+            condition.wait(_VIRTUAL_POLL)
+            result = predicate()
+        return result
+
+    def __getstate__(self):
+        # Serializzabile per i processi shard: ognuno prosegue con la propria copia
+        return {"_time": self._time}
+
+    def __setstate__(self, state):
+        self._time = state["_time"]
+        self._lock = threading.Lock()
+
+    def advance(self, seconds: float):
+        if seconds < 0:
+            raise ValueError("Cannot move virtual time backwards")
+        with self._lock:
+            self._time += seconds
+
+
+_clock: Clock = SystemClock()
+
+
+def get_clock() -> Clock:
+    """Clock globale usato dai componenti creati senza clock esplicito"""
+    return _clock
+
+
+def set_clock(clock: Clock):
+    """Sostituisce il clock globale (es. VirtualClock in CI)"""
+    global _clock
+    _clock = clock
+
+
+def now() -> datetime:
+    """datetime corrente secondo il clock globale"""
+    return _clock.now()
@@ -0,0 +1,40 @@
+"""
+Striped Locks - Lock per chiave con un numero fisso di RLock
+
+Chiavi diverse finiscono quasi sempre su strisce diverse e procedono in
+parallelo; la memoria resta costante anche con milioni di giochi/indirizzi.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Iterable
+
+
+class StripedLock:
+    """Insieme di RLock indicizzati per hash della chiave"""
+
+    def __init__(self, stripes: int = 64):
+        self._locks = [threading.RLock() for _ in range(stripes)]
+
+    def _index(self, key: str) -> int:
+        return hash(key) % len(self._locks)
+
+    def __call__(self, key: str) -> threading.RLock:
+        """Lock della striscia di `key` (da usare con `with`)"""
+        return self._locks[self._index(key)]
+
+    @contextmanager
+    def many(self, keys: Iterable[str]):
+        """
+        Acquisisce le strisce di più chiavi
+
+        Le strisce sono prese in ordine di indice, quindi due chiamanti con
+        insiemi di chiavi sovrapposti non possono andare in deadlock.
+        """
+        locks = [self._locks[i] for i in sorted({self._index(key) for key in keys})]
+        for lock in locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(locks):
+                lock.release()
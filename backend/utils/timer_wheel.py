@@ -0,0 +1,120 @@
+"""
+Timer Wheel - Scadenze gerarchiche a costo costante
+
+Ruota gerarchica (Varghese & Lauck): `levels` livelli da `slots` slot, il
+livello L copre scadenze fino a slots^(L+1) tick nel futuro. Inserimento e
+cancellazione sono O(1); avanzare di un tick svuota uno slot del livello 0 e,
+ai confini, ridistribuisce uno slot dei livelli superiori. Centinaia di
+migliaia di scadenze pendenti costano solo un dict e un set per slot.
+"""
+import math
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+from utils.clock import Clock, get_clock
+
+
+class TimerWheel:
+    """
+    Scadenze (chiave -> valore) risolte a granularità di un tick
+
+    Una scadenza non scatta mai prima del suo istante e al più un tick dopo.
+    Rischedulare una chiave sostituisce la scadenza precedente.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 64, levels: int = 4, clock: Optional[Clock] = None):
+        """
+        Args:
+            tick: Granularità in secondi
+            slots: Slot per livello (potenza di 2)
+            levels: Livelli; oltre slots^levels tick le scadenze vengono
+                ridistribuite finché non rientrano nella ruota
+            clock: Clock di riferimento per il tick corrente
+        """
+        if slots < 2 or slots & (slots - 1):
+            raise ValueError("slots must be a power of 2")
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock or get_clock()
+
+        self._bits = slots.bit_length() - 1
+        self._mask = slots - 1
+        self._wheel: List[List[Set[Hashable]]] = [[set() for _ in range(slots)] for _ in range(levels)]
+        # chiave -> (tick di scadenza, livello, slot, valore)
+        self._timers: Dict[Hashable, Tuple[int, int, int, Any]] = {}
+        self._current = math.floor(self.clock.time() / tick)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def schedule(self, key: Hashable, deadline: float, value: Any = None):
+        """Scadenza assoluta (secondi dall'epoch, come clock.time())"""
+        with self._lock:
+            self._remove(key)
+            self._place(key, math.ceil(deadline / self.tick), value)
+
+    def cancel(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._remove(key)
+
+    def advance(self, now: Optional[float] = None) -> List[Tuple[Hashable, Any]]:
+        """Porta la ruota a `now` e ritorna le scadenze superate (chiave, valore)"""
+        target = math.floor((self.clock.time() if now is None else now) / self.tick)
+        expired = []
+        with self._lock:
+            while self._current < target:
+                if not self._timers:
+                    # Ruota vuota: nessuno slot da visitare
+                    self._current = target
+                    break
+                self._current += 1
+                self._cascade()
+                slot = self._wheel[0][self._current & self._mask]
+                for key in list(slot):
+                    deadline, _, _, value = self._timers[key]
+                    if deadline > self._current:
+                        continue  # Giro successivo della ruota
+                    slot.discard(key)
+                    del self._timers[key]
+                    expired.append((key, value))
+        return expired
+
+    # ==================== INTERNI (sotto _lock) ====================
+
+    def _place(self, key: Hashable, deadline: int, value: Any, earliest: Optional[int] = None):
+        # Le scadenze già passate scattano al prossimo tick (o in questo, durante il cascade)
+        earliest = self._current + 1 if earliest is None else earliest
+        target = max(deadline, earliest)
+        delta = target - self._current
+        level = 0
+        while level < self.levels - 1 and delta >= 1 << (self._bits * (level + 1)):
+            level += 1
+        slot = (target >> (self._bits * level)) & self._mask
+        self._wheel[level][slot].add(key)
+        self._timers[key] = (deadline, level, slot, value)
+
+    def _remove(self, key: Hashable) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        _, level, slot, _ = timer
+        self._wheel[level][slot].discard(key)
+        return True
+
+    def _cascade(self):
+        """Ai confini di periodo ridistribuisce gli slot dei livelli superiori, dall'alto"""
+        level = 0
+        while level < self.levels - 1 and (self._current >> (self._bits * level)) & self._mask == 0:
+            level += 1
+        for upper in range(level, 0, -1):
+            slot = self._wheel[upper][(self._current >> (self._bits * upper)) & self._mask]
+            keys = list(slot)
+            slot.clear()
+            for key in keys:
+                deadline, _, _, value = self._timers.pop(key)
+                self._place(key, deadline, value, earliest=self._current)